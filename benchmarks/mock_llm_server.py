@@ -0,0 +1,414 @@
+"""
+离线的 OpenAI / Gemini 兼容模拟 LLM 服务，用于压测与基准测试，不产生任何真实调用费用
+
+根据提示词内容返回对应阶段的固定结果：大纲 JSON、布局规划 JSON、图片理解列表和幻灯片 HTML，
+并可配置延迟分布、错误率与输出速度。
+
+用法:
+    python -m benchmarks.mock_llm_server --port 8001 --latency 2 --latency-dist lognormal --tokens-per-second 80
+
+然后将模型配置指向该服务:
+    OpenAI 格式: API_TYPE=openai, API_URL=http://127.0.0.1:8001/v1
+    Gemini 格式: API_TYPE=gemini, API_URL=http://127.0.0.1:8001
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import sys
+import threading
+from collections import Counter
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# 流式输出时每个分片的字符数
+STREAM_CHUNK_CHARS = 40
+SLIDES_PER_CHAPTER = 4
+LAYOUTS = (
+    "经典垂直列表 + 图标增强",
+    "分栏布局 + 非对称排列优化",
+    "水平流程布局 + 平衡分组优化",
+    "建筑/支柱布局 + 图标增强",
+    "中心辐射布局 + 非对称排列优化",
+)
+PALETTES = (
+    ("#0f172a", "#e2e8f0", "#38bdf8", "#1e293b"),
+    ("#1c1917", "#fafaf9", "#f59e0b", "#292524"),
+    ("#052e16", "#f0fdf4", "#4ade80", "#14532d"),
+)
+
+
+@dataclass
+class MockSettings:
+    # 首字节延迟（秒）的中位数，fixed 分布下即为固定延迟
+    latency: float = 0.5
+    # fixed / uniform / lognormal / exponential
+    latency_dist: str = "fixed"
+    # lognormal 分布的 sigma，uniform 分布的范围为 latency * (1 ± latency_spread)
+    latency_spread: float = 0.5
+    # 输出速度（token/秒），0 表示一次性输出
+    tokens_per_second: float = 0
+    # 返回 500 的概率
+    error_rate: float = 0.0
+    # 返回 429（携带 Retry-After）的概率
+    rate_limit_rate: float = 0.0
+    retry_after: int = 1
+    seed: int | None = None
+
+
+def estimate_tokens(text: str) -> int:
+    return max(len(text) // 2, 1)
+
+
+class MockLLM:
+    def __init__(self, settings: MockSettings):
+        self.settings = settings
+        self.random = random.Random(settings.seed)
+        self.counters: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def sample_latency(self) -> float:
+        s = self.settings
+        if s.latency <= 0:
+            return 0.0
+        if s.latency_dist == "uniform":
+            return self.random.uniform(
+                s.latency * max(1 - s.latency_spread, 0), s.latency * (1 + s.latency_spread)
+            )
+        if s.latency_dist == "lognormal":
+            return self.random.lognormvariate(math.log(s.latency), s.latency_spread)
+        if s.latency_dist == "exponential":
+            return self.random.expovariate(1 / s.latency)
+        return s.latency
+
+    def injected_error(self):
+        """按配置的概率返回 (状态码, 响应头) 或 None"""
+        roll = self.random.random()
+        if roll < self.settings.rate_limit_rate:
+            self.count("rate_limited")
+            return 429, {"Retry-After": str(self.settings.retry_after)}
+        if roll < self.settings.rate_limit_rate + self.settings.error_rate:
+            self.count("errors")
+            return 500, {}
+        return None
+
+    def generation_seconds(self, text: str) -> float:
+        if self.settings.tokens_per_second <= 0:
+            return 0.0
+        return estimate_tokens(text) / self.settings.tokens_per_second
+
+    def answer(self, prompt: str, image_count: int) -> str:
+        """按提示词判断所属阶段并返回对应的固定结果"""
+        if "Layout Directive" in prompt and "target_id" in prompt:
+            self.count("html")
+            return slide_html(prompt)
+        if "img_description" in prompt:
+            self.count("vision")
+            return vision_json(prompt, image_count)
+        if "布局指导文字描述" in prompt:
+            self.count("layout")
+            return layout_json(prompt)
+        if "main_title" in prompt:
+            self.count("outline")
+            return outline_json(prompt)
+        self.count("other")
+        return "ok"
+
+
+def outline_json(prompt: str) -> str:
+    match = re.search(r"预计总页数[^\n]*?。\s*(\d+)", prompt)
+    page_num = max(int(match.group(1)) if match else 10, 5)
+    with_image = "global_visual_suggestion" in prompt
+    # 开篇和结尾各 2 页，其余平均分配到内容章节
+    content_pages = page_num - 4
+    chapter_sizes = [SLIDES_PER_CHAPTER] * (content_pages // SLIDES_PER_CHAPTER)
+    if content_pages % SLIDES_PER_CHAPTER:
+        chapter_sizes.append(content_pages % SLIDES_PER_CHAPTER)
+    chapters = [
+        {
+            "chapter_id": "1",
+            "chapter_topic": "序幕",
+            "page_count_suggestion": 2,
+            "slides": [
+                {"slide_id": "1.1", "slide_topic": "封面", "slide_content": ["主标题：基准测试", "副标题：模拟数据"]},
+                {"slide_id": "1.2", "slide_topic": "议程", "slide_content": ["背景", "现状", "展望"]},
+            ],
+        }
+    ]
+    for index, size in enumerate(chapter_sizes):
+        chapter_id = str(index + 2)
+        slides = []
+        for slide_index in range(1, size + 1):
+            slide_id = f"{chapter_id}.{slide_index}"
+            slide = {
+                "slide_id": slide_id,
+                "slide_topic": f"内容页 {slide_id}",
+                "slide_content": [f"要点 {n}：用于基准测试的模拟内容 {slide_id}" for n in range(1, 4)],
+            }
+            if with_image:
+                slide["visual_suggestion"] = {
+                    "search_keywords": f"benchmark {chapter_id}",
+                    "image_description": f"第 {slide_id} 页的示意图",
+                }
+            slides.append(slide)
+        chapters.append(
+            {
+                "chapter_id": chapter_id,
+                "chapter_topic": f"第 {chapter_id} 章",
+                "page_count_suggestion": size,
+                "slides": slides,
+            }
+        )
+    last_id = str(len(chapters) + 1)
+    chapters.append(
+        {
+            "chapter_id": last_id,
+            "chapter_topic": "总结",
+            "page_count_suggestion": 2,
+            "slides": [
+                {"slide_id": f"{last_id}.1", "slide_topic": "回顾", "slide_content": ["要点回顾"]},
+                {"slide_id": f"{last_id}.2", "slide_topic": "致谢", "slide_content": ["谢谢"]},
+            ],
+        }
+    )
+    outline = {"main_title": "基准测试", "subtitle": "模拟数据", "chapters": chapters}
+    if with_image:
+        outline["global_visual_suggestion"] = {
+            "search_keywords": "benchmark background",
+            "image_description": "简洁的科技感背景图",
+        }
+    return "```json\n" + json.dumps(outline, ensure_ascii=False, indent=2) + "\n```"
+
+
+def layout_json(prompt: str) -> str:
+    slide_ids = re.findall(r"幻灯片 (\d+\.\d+):", prompt)
+    chapter_ids = {slide_id.split(".")[0] for slide_id in slide_ids}
+    last_chapter = max(chapter_ids, key=int) if chapter_ids else ""
+    layout = {
+        slide_id: LAYOUTS[index % len(LAYOUTS)]
+        for index, slide_id in enumerate(slide_ids)
+        if slide_id.split(".")[0] not in ("1", last_chapter)
+    }
+    return "```json\n" + json.dumps(layout, ensure_ascii=False, indent=2) + "\n```"
+
+
+def vision_json(prompt: str, image_count: int) -> str:
+    image_ids = re.findall(r"图片编号 (\d+)", prompt) or [str(i + 1) for i in range(image_count)]
+    # 与真实模型一样只挑选部分图片
+    selected = image_ids[: max(len(image_ids) // 2, 1)]
+    result = [
+        {"img_id": image_id, "img_description": f"模拟的图片描述 {image_id}"}
+        for image_id in selected
+    ]
+    return "```json\n" + json.dumps(result, ensure_ascii=False, indent=2) + "\n```"
+
+
+def slide_html(prompt: str) -> str:
+    match = re.search(r"target_id\)\*\*:\s*`([^`]+)`", prompt)
+    slide_id = match.group(1) if match else "0.0"
+    background, text, accent, card = PALETTES[int(slide_id.split(".")[0]) % len(PALETTES)]
+    images = re.findall(r"图片路径: (\S+)", prompt)
+    cards = "\n".join(
+        f"""            <div class="card">
+                <i class="fa-solid fa-circle-check icon"></i>
+                <p class="card-text">要点 {n}：用于基准测试的模拟内容 {slide_id}</p>
+            </div>"""
+        for n in range(1, 4)
+    )
+    image_html = (
+        f'\n        <img class="figure" src="{images[0]}" alt="配图">' if images else ""
+    )
+    return f"""以下是第 {slide_id} 页的 HTML：
+
+```html
+<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <title>{slide_id}</title>
+    <style>
+        :root {{ --bg: {background}; --text: {text}; --accent: {accent}; --card: {card}; }}
+        body {{ margin: 0; font-family: 'Noto Sans SC', sans-serif; }}
+        #canvas {{ width: 1280px; height: 720px; background: var(--bg); color: var(--text); padding: 64px; box-sizing: border-box; }}
+        .title {{ font-size: 44px; font-weight: 700; color: var(--accent); margin: 0 0 32px; }}
+        .grid {{ display: grid; grid-template-columns: repeat(3, 1fr); gap: 24px; }}
+        .card {{ background: var(--card); border-radius: 12px; padding: 24px; }}
+        .icon {{ color: var(--accent); font-size: 28px; }}
+        .card-text {{ font-size: 20px; line-height: 1.6; }}
+        .figure {{ max-height: 240px; border-radius: 12px; margin-top: 24px; }}
+    </style>
+</head>
+<body>
+    <div id="canvas">
+        <h1 class="title">内容页 {slide_id}</h1>
+        <div class="grid">
+{cards}
+        </div>{image_html}
+    </div>
+</body>
+</html>
+```"""
+
+
+def _openai_prompt(body: dict) -> tuple[str, int]:
+    content = body["messages"][-1]["content"]
+    if isinstance(content, str):
+        return content, 0
+    text = "".join(part.get("text", "") for part in content if part.get("type") == "text")
+    images = sum(1 for part in content if part.get("type") == "image_url")
+    return text, images
+
+
+def _gemini_prompt(body: dict) -> tuple[str, int]:
+    parts = body["contents"][-1]["parts"]
+    text = "".join(part.get("text", "") for part in parts)
+    images = sum(1 for part in parts if "inline_data" in part or "inlineData" in part)
+    return text, images
+
+
+def _chunks(text: str):
+    for start in range(0, len(text), STREAM_CHUNK_CHARS):
+        yield text[start:start + STREAM_CHUNK_CHARS]
+
+
+def create_app(settings: MockSettings | None = None) -> FastAPI:
+    mock = MockLLM(settings or MockSettings())
+    app = FastAPI(title="Mock LLM Server")
+    app.state.mock = mock
+
+    async def prepare(prompt: str, images: int):
+        """等待首字节延迟并决定本次请求是否注入错误，返回 (回复, 错误响应)"""
+        mock.count("requests")
+        await asyncio.sleep(mock.sample_latency())
+        error = mock.injected_error()
+        if error:
+            status, headers = error
+            return None, JSONResponse(
+                {"error": {"message": "mock injected error", "code": status}},
+                status_code=status,
+                headers=headers,
+            )
+        return mock.answer(prompt, images), None
+
+    @app.post("/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def openai_chat(request: Request):
+        body = await request.json()
+        prompt, images = _openai_prompt(body)
+        text, error = await prepare(prompt, images)
+        if error:
+            return error
+        usage = {
+            "prompt_tokens": estimate_tokens(prompt),
+            "completion_tokens": estimate_tokens(text),
+            "prompt_tokens_details": {"cached_tokens": 0},
+        }
+        if not body.get("stream"):
+            await asyncio.sleep(mock.generation_seconds(text))
+            return {
+                "model": body.get("model", ""),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        async def events():
+            for chunk in _chunks(text):
+                await asyncio.sleep(mock.generation_seconds(chunk))
+                data = {"choices": [{"index": 0, "delta": {"content": chunk}}]}
+                yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+            if body.get("stream_options", {}).get("include_usage"):
+                yield f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1beta/models/{model_action:path}")
+    async def gemini_generate(model_action: str, request: Request):
+        body = await request.json()
+        prompt, images = _gemini_prompt(body)
+        text, error = await prepare(prompt, images)
+        if error:
+            return error
+
+        def payload(chunk: str, completion_text: str) -> dict:
+            return {
+                "candidates": [{"content": {"parts": [{"text": chunk}], "role": "model"}}],
+                "usageMetadata": {
+                    "promptTokenCount": estimate_tokens(prompt),
+                    "candidatesTokenCount": estimate_tokens(completion_text),
+                    "cachedContentTokenCount": 0,
+                },
+            }
+
+        if not model_action.endswith(":streamGenerateContent"):
+            await asyncio.sleep(mock.generation_seconds(text))
+            return payload(text, text)
+
+        async def events():
+            generated = ""
+            for chunk in _chunks(text):
+                await asyncio.sleep(mock.generation_seconds(chunk))
+                generated += chunk
+                yield f"data: {json.dumps(payload(chunk, generated), ensure_ascii=False)}\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def stats():
+        return {"settings": asdict(mock.settings), "counters": dict(mock.counters)}
+
+    return app
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="OpenAI / Gemini 兼容的模拟 LLM 服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=MockSettings.latency, help="首字节延迟中位数（秒）")
+    parser.add_argument(
+        "--latency-dist",
+        choices=("fixed", "uniform", "lognormal", "exponential"),
+        default=MockSettings.latency_dist,
+    )
+    parser.add_argument("--latency-spread", type=float, default=MockSettings.latency_spread)
+    parser.add_argument(
+        "--tokens-per-second", type=float, default=MockSettings.tokens_per_second, help="0 表示一次性输出"
+    )
+    parser.add_argument("--error-rate", type=float, default=MockSettings.error_rate, help="返回 500 的概率")
+    parser.add_argument("--rate-limit-rate", type=float, default=MockSettings.rate_limit_rate, help="返回 429 的概率")
+    parser.add_argument("--retry-after", type=int, default=MockSettings.retry_after)
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    settings = MockSettings(
+        latency=args.latency,
+        latency_dist=args.latency_dist,
+        latency_spread=args.latency_spread,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(settings), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+离线的 SearXNG 替身，用于压测与基准测试：图片搜索返回指向本服务的图片地址，图片由 Pillow 现场生成
+
+用法:
+    python -m benchmarks.mock_searxng --port 8002 --latency 0.3
+
+然后配置 SEARXNG_URL=http://127.0.0.1:8002/search
+"""
+
+import argparse
+import asyncio
+import hashlib
+import sys
+import threading
+from collections import Counter
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+from PIL import Image, ImageDraw
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+RESULTS_PER_QUERY = 10
+IMAGE_SIZE = (800, 450)
+
+
+@lru_cache(maxsize=256)
+def render_image(name: str) -> bytes:
+    """按名称生成固定的 PNG 图片，相同名称总是得到相同内容"""
+    digest = hashlib.md5(name.encode("utf-8")).digest()
+    background = tuple(digest[:3])
+    accent = tuple(255 - channel for channel in background)
+    image = Image.new("RGB", IMAGE_SIZE, background)
+    draw = ImageDraw.Draw(image)
+    width, height = IMAGE_SIZE
+    draw.ellipse((width // 4, height // 4, width * 3 // 4, height * 3 // 4), fill=accent)
+    draw.text((20, 20), name, fill=accent)
+    buffered = BytesIO()
+    image.save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+def create_app(latency: float = 0.0, results_per_query: int = RESULTS_PER_QUERY) -> FastAPI:
+    app = FastAPI(title="Mock SearXNG")
+    counters: Counter = Counter()
+    lock = threading.Lock()
+
+    def count(name: str) -> None:
+        with lock:
+            counters[name] += 1
+
+    @app.get("/search")
+    @app.get("/")
+    async def search(request: Request):
+        count("searches")
+        await asyncio.sleep(latency)
+        query = request.query_params.get("q", "")
+        base_url = str(request.base_url).rstrip("/")
+        key = hashlib.md5(query.encode("utf-8")).hexdigest()[:8]
+        results = [
+            {
+                "title": f"{query} {index + 1}",
+                "content": f"与“{query}”相关的示例图片",
+                "img_src": f"{base_url}/images/{key}-{index}.png",
+                "thumbnail_src": f"{base_url}/images/{key}-{index}.png",
+                "score": round(1.0 - index / results_per_query, 3),
+            }
+            for index in range(results_per_query)
+        ]
+        return {"query": query, "results": results}
+
+    @app.get("/images/{name}")
+    async def image(name: str):
+        count("images")
+        return Response(render_image(name.rsplit(".", 1)[0]), media_type="image/png")
+
+    @app.get("/stats")
+    async def stats():
+        with lock:
+            return dict(counters)
+
+    return app
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="SearXNG 图片搜索的离线替身")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument("--latency", type=float, default=0.0, help="每次搜索的延迟（秒）")
+    parser.add_argument("--results", type=int, default=RESULTS_PER_QUERY, help="每次搜索返回的图片数")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    app = create_app(latency=args.latency, results_per_query=args.results)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
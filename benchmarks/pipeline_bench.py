@@ -0,0 +1,381 @@
+"""
+端到端流水线基准测试：在进程内启动模拟 LLM 与 SearXNG 替身，按不同页数依次执行
+add_project → 项目生成 → html2office，记录各阶段耗时、峰值内存、线程数和数据库耗时，结果写入 JSON
+
+用法:
+    python -m benchmarks.pipeline_bench --sizes 10 30 100 --latency 1 --latency-dist lognormal
+
+每轮结果包含:
+    stages      各阶段（outline / plan_layout / image_search / vision / html / pdf / pptx / db）的
+                次数、总耗时、最大耗时和跨度（第一次开始到最后一次结束）
+    wall_s      生成、导出和整轮的墙钟时间
+    resources   峰值 RSS、本轮 RSS 增长（即单份在途演示文稿占用的内存）、峰值线程数；
+                --trace-memory 时还包含 tracemalloc 统计的 Python 对象峰值内存
+    llm         模拟 LLM 收到的请求数
+    outline_render  大纲文本缓存的命中 / 渲染次数、渲染耗时和命中节省的时间（saved_s）
+
+基准测试会创建真实的项目记录与文件，默认在每轮结束后删除（--keep-projects 保留）。
+LLM 缓存会被关闭，模型端点、备用模型和 SearXNG 地址只在本进程内指向模拟服务，不会写入 .env。
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import requests
+import uvicorn
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import config.base_config as base_config
+from benchmarks import mock_searxng
+from benchmarks.mock_llm_server import MockSettings, create_app
+
+DEFAULT_SIZES = (10, 30, 100)
+RESULTS_DIR = project_root / "benchmarks" / "results"
+SAMPLE_INTERVAL = 0.1
+POLL_INTERVAL = 0.5
+MOCK_MODEL = "mock-model"
+
+
+class BackgroundServer:
+    """在后台线程中运行 uvicorn，随基准测试进程启动和退出"""
+
+    def __init__(self, app, host: str = "127.0.0.1"):
+        self.host = host
+        self.port = _free_port(host)
+        self.server = uvicorn.Server(
+            uvicorn.Config(app, host=host, port=self.port, log_level="warning")
+        )
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self, timeout: float = 10) -> "BackgroundServer":
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError(f"模拟服务 {self.url} 启动失败")
+            time.sleep(0.05)
+        return self
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+class ResourceSampler:
+    """定期采样当前进程的 RSS 和线程数，记录峰值"""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak_rss_mb = 0.0
+        self.start_rss_mb = 0.0
+        self.peak_threads = 0
+        self.peak_python_threads = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self) -> None:
+        rss_mb, threads = _process_status()
+        self.peak_rss_mb = max(self.peak_rss_mb, rss_mb)
+        self.peak_threads = max(self.peak_threads, threads)
+        self.peak_python_threads = max(self.peak_python_threads, threading.active_count())
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._sample()
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "ResourceSampler":
+        self.start_rss_mb = _process_status()[0]
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    def stats(self) -> dict:
+        return {
+            "peak_rss_mb": round(self.peak_rss_mb, 1),
+            "rss_growth_mb": round(self.peak_rss_mb - self.start_rss_mb, 1),
+            "peak_threads": self.peak_threads,
+            "peak_python_threads": self.peak_python_threads,
+        }
+
+
+def _free_port(host: str) -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def _process_status() -> tuple[float, int]:
+    """返回 (当前 RSS MB, 系统线程数)，非 Linux 平台退化为 ru_maxrss 与 Python 线程数"""
+    status_path = Path("/proc/self/status")
+    if status_path.exists():
+        rss_kb, threads = 0, 0
+        for line in status_path.read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                rss_kb = int(line.split()[1])
+            elif line.startswith("Threads:"):
+                threads = int(line.split()[1])
+        return rss_kb / 1024, threads
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 的单位为字节，Linux 为 KB
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return maxrss / divisor, threading.active_count()
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=project_root,
+            capture_output=True,
+            text=True,
+            timeout=10,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def configure(llm_url: str, searxng_url: str, engine: Optional[str], eager_pdf: bool = False) -> None:
+    """将所有模型和 SearXNG 指向模拟服务，关闭缓存，避免重复运行时直接命中缓存"""
+    overrides = {"SEARXNG_URL": f"{searxng_url}/search", "LLM_CACHE_ENABLED": 0}
+    for prefix in ("OUTLINE", "PPT", "PIC"):
+        overrides.update(
+            {
+                f"{prefix}_API_TYPE": "openai",
+                f"{prefix}_API_KEY": "mock",
+                f"{prefix}_API_URL": f"{llm_url}/v1",
+                f"{prefix}_MODEL": MOCK_MODEL,
+                f"{prefix}_ENDPOINTS": "",
+            }
+        )
+    overrides.update({"PPT_FALLBACK_API_URL": "", "PPT_FALLBACK_MODEL": ""})
+    if engine:
+        overrides["GENERATION_ENGINE"] = engine
+    if eager_pdf:
+        overrides["PDF_EAGER_RENDER"] = 1
+    base_config.apply_process_overrides(overrides)
+
+
+def _mock_counters(llm_url: str) -> dict:
+    try:
+        return requests.get(f"{llm_url}/stats", timeout=5).json().get("counters", {})
+    except (requests.RequestException, ValueError):
+        return {}
+
+
+def _counter_delta(before: dict, after: dict) -> dict:
+    return {key: value - before.get(key, 0) for key, value in after.items() if value - before.get(key, 0)}
+
+
+def _outline_render_delta(before: dict, after: dict) -> dict:
+    return {
+        key: round(after[key] - before.get(key, 0), 6)
+        for key in ("hits", "misses", "render_s", "saved_s")
+    }
+
+
+def _wait_for_project(project_id: str, timeout: float) -> str:
+    from src.models.project_model import Status
+    from src.repository import project_repo
+
+    deadline = time.monotonic() + timeout
+    while True:
+        status = project_repo.db_get_project_status(project_id)
+        if status in (Status.completed, Status.failed):
+            return status
+        if time.monotonic() > deadline:
+            return "timeout"
+        time.sleep(POLL_INTERVAL)
+
+
+def _cleanup(project_id: str, project_name: str) -> None:
+    from src.repository.transaction_manager import delete_project_with_related
+
+    delete_project_with_related(project_id)
+    shutil.rmtree(project_root / "data" / "projects" / project_name, ignore_errors=True)
+
+
+def run_deck(size: int, args: argparse.Namespace, llm_url: str) -> dict:
+    """生成并导出一份 size 页的演示文稿，返回本轮的统计结果"""
+    from src.api.projects import add_project
+    from src.html_convert_office.html2office import html2office
+    from src.models.project_model import ProjectIn
+    from src.repository import outline_repo, project_repo
+    from src.utils import outline_cache, profiling
+
+    profiling.reset()
+    counters_before = _mock_counters(llm_url)
+    outline_before = outline_cache.get_outline_cache_stats()
+    request = ProjectIn(
+        topic=f"基准测试 {size} 页 {datetime.now():%H%M%S}",
+        page_num=size,
+        enable_img_search=not args.no_img_search,
+    )
+    wall = {}
+    if args.trace_memory:
+        tracemalloc.start()
+        traced_before = tracemalloc.get_traced_memory()[0]
+    with ResourceSampler() as sampler:
+        start = time.perf_counter()
+        # 生成任务写入任务表，由 main() 中启动的 worker 认领执行
+        created = add_project(request)
+        project_id = created["project_id"]
+        status = _wait_for_project(project_id, args.timeout)
+        wall["generate_s"] = time.perf_counter() - start
+
+        if status == "completed" and not args.no_export:
+            export_start = time.perf_counter()
+            html2office(project_id=project_id, to_pdf=True, to_pptx=not args.no_pptx)
+            wall["export_s"] = time.perf_counter() - export_start
+        wall["total_s"] = time.perf_counter() - start
+    resources = sampler.stats()
+    if args.trace_memory:
+        resources["python_peak_mb"] = round((tracemalloc.get_traced_memory()[1] - traced_before) / 2**20, 1)
+        tracemalloc.stop()
+
+    project = project_repo.db_get_project(project_id)
+    result = {
+        "size": size,
+        "project_id": project_id,
+        "status": status,
+        "pdf_status": project.pdf_status if project else None,
+        "pptx_status": project.pptx_status if project else None,
+        "slides": outline_repo.db_get_slide_status(project_id),
+        "wall_s": {name: round(value, 3) for name, value in wall.items()},
+        "stages": profiling.get_stage_stats(),
+        "resources": resources,
+        "llm": _counter_delta(counters_before, _mock_counters(llm_url)),
+        "outline_render": _outline_render_delta(outline_before, outline_cache.get_outline_cache_stats()),
+    }
+    if not args.keep_projects:
+        _cleanup(project_id, created["project_name"])
+    return result
+
+
+def _print_summary(run: dict) -> None:
+    stages = ", ".join(
+        f"{name} {stats['span_s']:.2f}s/{stats['count']}"
+        for name, stats in run["stages"].items()
+    )
+    print(
+        f"[{run['size']} 页] {run['status']} 总耗时 {run['wall_s'].get('total_s', 0):.2f}s "
+        f"峰值 RSS {run['resources']['peak_rss_mb']}MB (+{run['resources']['rss_growth_mb']}MB) 峰值线程 {run['resources']['peak_threads']} | {stages} | "
+        f"大纲文本缓存命中 {run['outline_render']['hits']} 次，节省 {run['outline_render']['saved_s'] * 1000:.1f}ms"
+    )
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="EZPPT 端到端流水线基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="每轮的页数")
+    parser.add_argument("--engine", choices=("thread", "async"), default=None, help="默认沿用 GENERATION_ENGINE")
+    parser.add_argument("--latency", type=float, default=MockSettings.latency, help="LLM 首字节延迟中位数（秒）")
+    parser.add_argument(
+        "--latency-dist",
+        choices=("fixed", "uniform", "lognormal", "exponential"),
+        default=MockSettings.latency_dist,
+    )
+    parser.add_argument("--latency-spread", type=float, default=MockSettings.latency_spread)
+    parser.add_argument("--tokens-per-second", type=float, default=MockSettings.tokens_per_second)
+    parser.add_argument("--error-rate", type=float, default=MockSettings.error_rate)
+    parser.add_argument("--rate-limit-rate", type=float, default=MockSettings.rate_limit_rate)
+    parser.add_argument("--search-latency", type=float, default=0.0, help="图片搜索延迟（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-img-search", action="store_true", help="不启用图片搜索")
+    parser.add_argument("--no-export", action="store_true", help="跳过 PDF / PPTX 导出")
+    parser.add_argument("--no-pptx", action="store_true", help="只导出 PDF")
+    parser.add_argument(
+        "--eager-pdf", action="store_true", help="开启 PDF_EAGER_RENDER，生成期间提前渲染单页 PDF，对比 export_s"
+    )
+    parser.add_argument("--timeout", type=float, default=3600, help="每轮生成的超时时间（秒）")
+    parser.add_argument(
+        "--trace-memory", action="store_true", help="使用 tracemalloc 统计 Python 对象的峰值内存（会明显变慢）"
+    )
+    parser.add_argument("--keep-projects", action="store_true", help="保留生成的项目")
+    parser.add_argument("--output", type=Path, default=None, help="结果 JSON 路径")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> Path:
+    args = parse_args(argv)
+    settings = MockSettings(
+        latency=args.latency,
+        latency_dist=args.latency_dist,
+        latency_spread=args.latency_spread,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed,
+    )
+    llm_server = BackgroundServer(create_app(settings)).start()
+    searxng_server = BackgroundServer(mock_searxng.create_app(latency=args.search_latency)).start()
+    configure(llm_server.url, searxng_server.url, args.engine, args.eager_pdf)
+
+    from src.jobs.worker import JobWorker
+    from src.repository.db_utils import init_db
+
+    init_db()
+    worker = JobWorker(concurrency=1, worker_id="pipeline-bench")
+    worker.start()
+    report = {
+        "meta": {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "engine": base_config.GENERATION_ENGINE,
+            "ppt_api_limit": base_config.PPT_API_LIMIT,
+            "pdf_eager_render": bool(base_config.PDF_EAGER_RENDER),
+            "img_search": not args.no_img_search,
+            "mock": asdict(settings),
+            "search_latency": args.search_latency,
+        },
+        "runs": [],
+    }
+    try:
+        for size in args.sizes:
+            run = run_deck(size, args, llm_server.url)
+            report["runs"].append(run)
+            _print_summary(run)
+    finally:
+        worker.stop(timeout=5)
+        llm_server.stop()
+        searxng_server.stop()
+
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    report["meta"]["children_peak_rss_mb"] = round(children / 1024, 1)
+    output = args.output or RESULTS_DIR / f"pipeline-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"结果已写入 {output}")
+    return output
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import json
 import os
 import threading
 from pathlib import Path
@@ -57,17 +58,34 @@ OUTLINE_API_TYPE = ""
 OUTLINE_API_KEY = ""
 OUTLINE_API_URL = ""
 OUTLINE_MODEL = ""
+OUTLINE_ENDPOINTS = ""
 
 PPT_API_TYPE = ""
 PPT_API_KEY = ""
 PPT_API_URL = ""
 PPT_MODEL = ""
+PPT_ENDPOINTS = ""
 PPT_API_LIMIT = 4
+PPT_CONTINUITY_DEPTH = 1
+PPT_STYLE_ANCHOR_SLIDES = ""
+PPT_STREAM_ENABLED = 1
+PPT_STYLE_DIGEST_ENABLED = 1
+PPT_REFERENCE_TOKEN_LIMIT = 3000
+PPT_HEDGE_ENABLED = 0
+PPT_HEDGE_PERCENTILE = 90
+PPT_HEDGE_MIN_SAMPLES = 5
+PPT_HEDGE_MIN_DELAY = 30
+
+PPT_FALLBACK_API_TYPE = ""
+PPT_FALLBACK_API_KEY = ""
+PPT_FALLBACK_API_URL = ""
+PPT_FALLBACK_MODEL = ""
 
 PIC_API_TYPE = ""
 PIC_API_KEY = ""
 PIC_API_URL = ""
 PIC_MODEL = ""
+PIC_ENDPOINTS = ""
 PIC_NUM_LIMIT = 5
 
 APRYSE_LICENSE_KEY = ""
@@ -77,8 +95,37 @@ SEARXNG_URL = ""
 TAVILY_KEY = ""
 TAVILY_MAX_NUM = 20
 HTML2OFFICE_MAX_CONCURRENT_TASKS = 4
+PDF_EAGER_RENDER = 0
 IMAGE_DOWNLOAD_MAX_WORKERS = 15
 
+GENERATION_ENGINE = "thread"
+ASYNC_ENGINE_MAX_LLM_CALLS = 64
+TASK_POOL_WORKERS = 8
+LLM_BALANCE_STRATEGY = "least_outstanding"
+
+LLM_HTTP_POOL_SIZE = 0
+LLM_CONNECT_TIMEOUT = 10
+LLM_READ_TIMEOUT = 600
+
+LLM_RPM_LIMIT = 0
+LLM_TPM_LIMIT = 0
+LLM_MAX_IN_FLIGHT = 0
+
+LLM_CACHE_ENABLED = 0
+LLM_CACHE_MAX_MB = 256
+LLM_CACHE_TTL_HOURS = 168
+LLM_SINGLE_FLIGHT_ENABLED = 1
+
+RETRY_MAX_BACKOFF = 30
+CIRCUIT_BREAKER_THRESHOLD = 5
+CIRCUIT_BREAKER_COOLDOWN = 30
+
+JOB_WORKER_IN_PROCESS = 1
+JOB_WORKER_CONCURRENCY = 2
+JOB_LEASE_SECONDS = 60
+JOB_MAX_ATTEMPTS = 3
+JOB_RESUME_ON_STARTUP = 1
+
 # === 配置定义 ===
 CONFIG_ITEMS = [
     {
@@ -106,6 +153,14 @@ CONFIG_ITEMS = [
         "type": "text",
         "group": "大纲模型",
     },
+    {
+        "key": "OUTLINE_ENDPOINTS",
+        "label": "大纲 LLM 额外端点",
+        "type": "text",
+        "group": "大纲模型",
+        "description": '额外端点的 JSON 列表，未填写的字段沿用上面的配置，主配置权重为 1。例如 [{"api_key": "sk-xxx", "weight": 2}, {"api_url": "https://example.com/v1"}]',
+        "clearable": True,
+    },
     {
         "key": "PPT_API_TYPE",
         "label": "PPT LLM API 类型",
@@ -131,12 +186,110 @@ CONFIG_ITEMS = [
         "type": "text",
         "group": "PPT 模型",
     },
+    {
+        "key": "PPT_ENDPOINTS",
+        "label": "PPT LLM 额外端点",
+        "type": "text",
+        "group": "PPT 模型",
+        "description": '额外端点的 JSON 列表，未填写的字段沿用上面的配置，主配置权重为 1。例如 [{"api_key": "sk-xxx", "weight": 2}, {"api_url": "https://example.com/v1"}]',
+        "clearable": True,
+    },
     {
         "key": "PPT_API_LIMIT",
         "label": "PPT LLM API 并发限制",
         "type": "number",
         "group": "PPT 模型",
     },
+    {
+        "key": "PPT_CONTINUITY_DEPTH",
+        "label": "连贯性参考页数",
+        "type": "number",
+        "group": "PPT 模型",
+        "description": "每页参考同章节前几页的 HTML，需等这些页面生成后才能开始。0 表示同章节页面完全并行生成",
+    },
+    {
+        "key": "PPT_STYLE_ANCHOR_SLIDES",
+        "label": "风格锚点页",
+        "type": "text",
+        "group": "PPT 模型",
+        "description": "逗号分隔的页码，例如 1.1 或 1.1,1.2。锚点页先生成，其余页面（包括第一章剩余页面）随后并行生成并以锚点页作为风格参考。留空表示以整个第一章作为锚点",
+        "clearable": True,
+    },
+    {
+        "key": "PPT_STREAM_ENABLED",
+        "label": "PPT 流式生成",
+        "type": "number",
+        "group": "PPT 模型",
+        "description": "1 开启 0 关闭。开启后收到完整 HTML 即停止生成，并实时写入预览文件",
+    },
+    {
+        "key": "PPT_STYLE_DIGEST_ENABLED",
+        "label": "参考页使用风格摘要",
+        "type": "number",
+        "group": "PPT 模型",
+        "description": "1 开启 0 关闭。开启后提示词中只提供参考页的 CSS 变量、配色、字体、DOM 骨架和常用 class，而不是完整 HTML",
+    },
+    {
+        "key": "PPT_REFERENCE_TOKEN_LIMIT",
+        "label": "参考摘要 token 上限",
+        "type": "number",
+        "group": "PPT 模型",
+        "description": "全局风格参考和章内连贯性参考各自的估算 token 上限，0 表示不限制",
+    },
+    {
+        "key": "PPT_HEDGE_ENABLED",
+        "label": "PPT 对冲请求",
+        "type": "number",
+        "group": "PPT 模型",
+        "description": "1 开启 0 关闭。单页生成耗时超过近期耗时分位数时，再向备用模型（未配置则为同一模型）发起一次请求，先完成的结果生效",
+    },
+    {
+        "key": "PPT_HEDGE_PERCENTILE",
+        "label": "对冲触发分位数",
+        "type": "number",
+        "group": "PPT 模型",
+        "description": "例如 90 表示耗时超过最近成功请求的 p90 时发起对冲",
+    },
+    {
+        "key": "PPT_HEDGE_MIN_SAMPLES",
+        "label": "对冲最少样本数",
+        "type": "number",
+        "group": "PPT 模型",
+        "description": "成功请求数少于该值时不发起对冲",
+    },
+    {
+        "key": "PPT_HEDGE_MIN_DELAY",
+        "label": "对冲最短等待(秒)",
+        "type": "number",
+        "group": "PPT 模型",
+    },
+    {
+        "key": "PPT_FALLBACK_API_TYPE",
+        "label": "PPT 备用 LLM API 类型",
+        "type": "text",
+        "group": "PPT 模型",
+        "description": "仅支持 openai 或 gemini",
+    },
+    {
+        "key": "PPT_FALLBACK_API_KEY",
+        "label": "PPT 备用 LLM API Key",
+        "type": "text",
+        "group": "PPT 模型",
+        "description": "留空则使用 PPT 模型的 API Key",
+    },
+    {
+        "key": "PPT_FALLBACK_API_URL",
+        "label": "PPT 备用 LLM API 地址",
+        "type": "text",
+        "group": "PPT 模型",
+    },
+    {
+        "key": "PPT_FALLBACK_MODEL",
+        "label": "PPT 备用 LLM 模型名称",
+        "type": "text",
+        "group": "PPT 模型",
+        "description": "与 API 地址同时填写后生效：主模型失败时改用备用模型，开启对冲时对冲请求也发往备用模型",
+    },
     {
         "key": "PIC_API_TYPE",
         "label": "图片理解 LLM API 类型",
@@ -163,6 +316,14 @@ CONFIG_ITEMS = [
         "group": "图片模型",
         "description": "必须支持图片理解!",
     },
+    {
+        "key": "PIC_ENDPOINTS",
+        "label": "图片理解 LLM 额外端点",
+        "type": "text",
+        "group": "图片模型",
+        "description": '额外端点的 JSON 列表，未填写的字段沿用上面的配置，主配置权重为 1。例如 [{"api_key": "sk-xxx", "weight": 2}, {"api_url": "https://example.com/v1"}]',
+        "clearable": True,
+    },
     {
         "key": "PIC_NUM_LIMIT",
         "label": "图片数量限制",
@@ -192,6 +353,13 @@ CONFIG_ITEMS = [
         "group": "杂项",
         "description": "比较吃内存，不要设置太大，2g以内建议不超过4",
     },
+    {
+        "key": "PDF_EAGER_RENDER",
+        "label": "提前渲染单页PDF",
+        "type": "number",
+        "group": "杂项",
+        "description": "1 开启，0 关闭。每页生成完成后立即在后台渲染该页的 PDF 并缓存，导出时内容未变的页面直接合并，导出几乎无需等待；生成期间会额外占用一个浏览器进程",
+    },
     {
         "key": "APRYSE_LICENSE_KEY",
         "label": "Apryse License Key",
@@ -199,6 +367,158 @@ CONFIG_ITEMS = [
         "group": "杂项",
         "description": "Apryse SDK 所需的 License Key",
     },
+    {
+        "key": "GENERATION_ENGINE",
+        "label": "生成引擎",
+        "type": "text",
+        "group": "性能调优",
+        "description": "thread: 所有项目共用全局任务池; async: 所有项目共用一个事件循环，由全局请求上限控制并发",
+    },
+    {
+        "key": "LLM_BALANCE_STRATEGY",
+        "label": "多端点负载均衡策略",
+        "type": "text",
+        "group": "性能调优",
+        "description": "least_outstanding: 优先选择进行中请求最少的端点; weighted_round_robin: 按权重轮询。熔断中的端点会被自动摘除",
+    },
+    {
+        "key": "ASYNC_ENGINE_MAX_LLM_CALLS",
+        "label": "异步引擎最大并发请求数",
+        "type": "number",
+        "group": "性能调优",
+        "description": "async 引擎下全进程同时进行的 LLM/搜索请求上限。HTTP 请求本身仍是阻塞调用，每个进行中的请求占用一个线程（共享 I/O 线程池的大小即为该值，对冲请求在独立的 hedge 线程池中执行），实际并发受线程数限制，不宜设置过大",
+    },
+    {
+        "key": "TASK_POOL_WORKERS",
+        "label": "全局任务池线程数",
+        "type": "number",
+        "group": "性能调优",
+        "description": "thread 引擎下所有项目同时生成的幻灯片总数上限。按优先级调度（单页重新生成 > 新建演示文稿 > 批量续传），同一优先级内各项目公平分配",
+    },
+    {
+        "key": "LLM_HTTP_POOL_SIZE",
+        "label": "LLM 连接池大小",
+        "type": "number",
+        "group": "性能调优",
+        "description": "每个 LLM 地址保持的长连接数量，0 表示与 PPT LLM API 并发限制一致",
+    },
+    {
+        "key": "LLM_CONNECT_TIMEOUT",
+        "label": "LLM 连接超时(秒)",
+        "type": "number",
+        "group": "性能调优",
+    },
+    {
+        "key": "LLM_READ_TIMEOUT",
+        "label": "LLM 读取超时(秒)",
+        "type": "number",
+        "group": "性能调优",
+        "description": "等待模型返回内容的最长时间",
+    },
+    {
+        "key": "LLM_RPM_LIMIT",
+        "label": "LLM 每分钟请求数上限",
+        "type": "number",
+        "group": "性能调优",
+        "description": "按 API 地址 + 模型全进程共享，超出时排队等待，0 表示不限制",
+    },
+    {
+        "key": "LLM_TPM_LIMIT",
+        "label": "LLM 每分钟 Token 上限",
+        "type": "number",
+        "group": "性能调优",
+        "description": "按提示词长度估算，超出时排队等待，0 表示不限制",
+    },
+    {
+        "key": "LLM_MAX_IN_FLIGHT",
+        "label": "LLM 最大同时请求数",
+        "type": "number",
+        "group": "性能调优",
+        "description": "同一 API 地址 + 模型同时进行中的请求上限，0 表示不限制",
+    },
+    {
+        "key": "LLM_CACHE_ENABLED",
+        "label": "启用 LLM 结果缓存",
+        "type": "number",
+        "group": "性能调优",
+        "description": "1 开启，0 关闭。模型、提示词和图片完全相同时直接复用上次的回复，适合重跑与基准测试。额外端点使用了不同模型的角色不使用缓存",
+    },
+    {
+        "key": "LLM_CACHE_MAX_MB",
+        "label": "LLM 缓存大小上限(MB)",
+        "type": "number",
+        "group": "性能调优",
+        "description": "超出后按最近最少使用淘汰，0 表示不限制",
+    },
+    {
+        "key": "LLM_CACHE_TTL_HOURS",
+        "label": "LLM 缓存有效期(小时)",
+        "type": "number",
+        "group": "性能调优",
+        "description": "0 表示永不过期",
+    },
+    {
+        "key": "LLM_SINGLE_FLIGHT_ENABLED",
+        "label": "合并相同的并发请求",
+        "type": "number",
+        "group": "性能调优",
+        "description": "1 开启 0 关闭。相同提示词的 LLM 调用和相同关键词的图片搜索同时进行时只请求一次，结果共享",
+    },
+    {
+        "key": "RETRY_MAX_BACKOFF",
+        "label": "重试最大退避时间(秒)",
+        "type": "number",
+        "group": "性能调优",
+        "description": "LLM、搜索、图片下载失败后按指数退避重试，单次等待不超过该值",
+    },
+    {
+        "key": "CIRCUIT_BREAKER_THRESHOLD",
+        "label": "熔断阈值(连续失败次数)",
+        "type": "number",
+        "group": "性能调优",
+        "description": "同一端点连续失败达到该次数后暂停请求，0 表示不熔断",
+    },
+    {
+        "key": "CIRCUIT_BREAKER_COOLDOWN",
+        "label": "熔断冷却时间(秒)",
+        "type": "number",
+        "group": "性能调优",
+    },
+    {
+        "key": "JOB_WORKER_IN_PROCESS",
+        "label": "Web 服务内执行任务",
+        "type": "number",
+        "group": "任务队列",
+        "description": "1 在 Web 服务进程内启动任务 worker；0 只负责入队，需要另外运行 python -m src.jobs.worker（修改后需重启服务）",
+    },
+    {
+        "key": "JOB_WORKER_CONCURRENCY",
+        "label": "每个 worker 同时执行的任务数",
+        "type": "number",
+        "group": "任务队列",
+        "description": "项目生成、重新生成、导出等任务的并发数（修改后需重启 worker）",
+    },
+    {
+        "key": "JOB_LEASE_SECONDS",
+        "label": "任务租约时长(秒)",
+        "type": "number",
+        "group": "任务队列",
+        "description": "worker 每隔三分之一租约时长续租一次，超过租约未续租的任务会被重新排队",
+    },
+    {
+        "key": "JOB_MAX_ATTEMPTS",
+        "label": "任务最大尝试次数",
+        "type": "number",
+        "group": "任务队列",
+        "description": "任务失败或 worker 中断后的最大尝试次数（含第一次），超过后标记为失败",
+    },
+    {
+        "key": "JOB_RESUME_ON_STARTUP",
+        "label": "启动时续传中断的项目",
+        "type": "number",
+        "group": "任务队列",
+        "description": "1 服务启动时为停留在生成中且没有待执行任务的项目创建续传任务，只重新生成未完成的页面",
+    },
 ]
 
 CONFIG_ITEM_MAP = {item["key"]: item for item in CONFIG_ITEMS}
@@ -212,6 +532,14 @@ class LLMConfig:
         self.api_url = api_url
         self.api_type = api_type
 
+    @property
+    def endpoint_id(self) -> str:
+        """端点标识（API 地址 + 模型 + Key 末四位），用于限流、熔断和负载均衡统计"""
+        endpoint = f"{self.api_url.rstrip('/')}#{self.name}"
+        if self.api_key:
+            endpoint += f"#{self.api_key[-4:]}"
+        return endpoint
+
     def __repr__(self):
         return f"LLMConfig(name='{self.name}', api_key='{self.api_key[:10]}...', api_url='{self.api_url}', api_type='{self.api_type}')"
 
@@ -219,24 +547,61 @@ class LLMConfig:
 OUTLINE_LLM_CONFIG = LLMConfig("", "", "", "")
 PPT_LLM_CONFIG = LLMConfig("", "", "", "")
 PIC_LLM_CONFIG = LLMConfig("", "", "", "")
+PPT_FALLBACK_LLM_CONFIG = LLMConfig("", "", "", "")
 
 LLM_FIELD_SUFFIXES = ("API_TYPE", "API_KEY", "API_URL", "MODEL")
 LLM_CONFIG_OBJECTS = {
     "OUTLINE": OUTLINE_LLM_CONFIG,
     "PPT": PPT_LLM_CONFIG,
     "PIC": PIC_LLM_CONFIG,
+    "PPT_FALLBACK": PPT_FALLBACK_LLM_CONFIG,
 }
 NUMERIC_DEFAULTS = {
     "PIC_NUM_LIMIT": 5,
     "TAVILY_MAX_NUM": 20,
     "IMAGE_DOWNLOAD_MAX_WORKERS": 15,
     "PPT_API_LIMIT": 4,
+    "PPT_CONTINUITY_DEPTH": 1,
+    "PPT_STREAM_ENABLED": 1,
     "HTML2OFFICE_MAX_CONCURRENT_TASKS": 4,
+    "PDF_EAGER_RENDER": 0,
+    "ASYNC_ENGINE_MAX_LLM_CALLS": 64,
+    "TASK_POOL_WORKERS": 8,
+    "LLM_HTTP_POOL_SIZE": 0,
+    "LLM_CONNECT_TIMEOUT": 10,
+    "LLM_READ_TIMEOUT": 600,
+    "LLM_RPM_LIMIT": 0,
+    "LLM_TPM_LIMIT": 0,
+    "LLM_MAX_IN_FLIGHT": 0,
+    "LLM_CACHE_ENABLED": 0,
+    "LLM_CACHE_MAX_MB": 256,
+    "LLM_CACHE_TTL_HOURS": 168,
+    "LLM_SINGLE_FLIGHT_ENABLED": 1,
+    "RETRY_MAX_BACKOFF": 30,
+    "CIRCUIT_BREAKER_THRESHOLD": 5,
+    "CIRCUIT_BREAKER_COOLDOWN": 30,
+    "JOB_WORKER_IN_PROCESS": 1,
+    "JOB_WORKER_CONCURRENCY": 2,
+    "JOB_LEASE_SECONDS": 60,
+    "JOB_MAX_ATTEMPTS": 3,
+    "JOB_RESUME_ON_STARTUP": 1,
+    "PPT_STYLE_DIGEST_ENABLED": 1,
+    "PPT_REFERENCE_TOKEN_LIMIT": 3000,
+    "PPT_HEDGE_ENABLED": 0,
+    "PPT_HEDGE_PERCENTILE": 90,
+    "PPT_HEDGE_MIN_SAMPLES": 5,
+    "PPT_HEDGE_MIN_DELAY": 30,
 }
 STRING_DEFAULTS = {
     "SEARXNG_URL": "",
     "TAVILY_KEY": "",
     "APRYSE_LICENSE_KEY": "",
+    "GENERATION_ENGINE": "thread",
+    "LLM_BALANCE_STRATEGY": "least_outstanding",
+    "OUTLINE_ENDPOINTS": "",
+    "PPT_ENDPOINTS": "",
+    "PIC_ENDPOINTS": "",
+    "PPT_STYLE_ANCHOR_SLIDES": "",
 }
 
 
@@ -272,7 +637,11 @@ def _apply_config() -> None:
     outline_values = _apply_llm_config("OUTLINE", outline_defaults)
 
     ppt_defaults = outline_values.copy()
-    _apply_llm_config("PPT", ppt_defaults)
+    ppt_values = _apply_llm_config("PPT", ppt_defaults)
+
+    # 备用模型只继承 API 类型和 Key，地址和模型名称留空表示未配置
+    fallback_defaults = {**ppt_values, "API_URL": "", "MODEL": ""}
+    _apply_llm_config("PPT_FALLBACK", fallback_defaults)
 
     pic_defaults = outline_values.copy()
     _apply_llm_config("PIC", pic_defaults)
@@ -299,6 +668,13 @@ def _sanitize_value(key: str, value: Any) -> Any:
             return int(value)
         except (TypeError, ValueError) as exc:
             raise ValueError(f"{item['label']} 需要为整数") from exc
+    if key.endswith("_ENDPOINTS") and str(value).strip():
+        try:
+            endpoints = json.loads(value)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"{item['label']} 需要为 JSON 数组") from exc
+        if not isinstance(endpoints, list):
+            raise ValueError(f"{item['label']} 需要为 JSON 数组")
     return str(value)
 
 
@@ -329,7 +705,10 @@ def update_runtime_overrides(data: Dict[str, Any]) -> None:
         if key not in CONFIG_ITEM_MAP:
             continue
         sanitized_value = _sanitize_value(key, value)
-        if sanitized_value in (None, ""):
+        if sanitized_value is None:
+            continue
+        # 空值对可清空的配置项有意义（恢复为未配置），其余配置项留空表示不修改
+        if sanitized_value == "" and not CONFIG_ITEM_MAP[key].get("clearable"):
             continue
         sanitized[key] = sanitized_value
 
@@ -348,6 +727,19 @@ def update_runtime_overrides(data: Dict[str, Any]) -> None:
     reload_runtime_overrides()
 
 
+def apply_process_overrides(data: Dict[str, Any]) -> None:
+    """仅在当前进程内覆盖配置，不写入 .env（供基准测试等脚本使用），重新加载 .env 后失效"""
+    global _runtime_overrides
+    with _config_lock:
+        overrides = dict(_runtime_overrides)
+        for key, value in data.items():
+            if key not in CONFIG_ITEM_MAP:
+                raise KeyError(f"未知的配置项: {key}")
+            overrides[key] = _sanitize_value(key, value)
+        _runtime_overrides = overrides
+        _apply_config()
+
+
 def reload_runtime_overrides() -> None:
     global _runtime_overrides
     if env_path.exists():
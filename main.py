@@ -8,6 +8,9 @@ from src.api.projects import router
 import uvicorn
 from config.logging_config import logger
 from src.repository.db_utils import init_db
+import config.base_config as base_config
+from src.jobs.job_queue import resume_interrupted_projects
+from src.jobs.worker import start_in_process_worker, stop_in_process_worker
 import shutil
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -49,6 +52,21 @@ if WEBUI_DIR.exists():
         app.mount("/js", StaticFiles(directory=str(js_dir)), name="js")
 app.include_router(router)
 
+
+@app.on_event("startup")
+def start_job_worker():
+    """启动进程内任务 worker，上次退出时未完成（租约过期）的任务会被重新排队，中断的项目从断点续传"""
+    init_db()
+    if base_config.JOB_RESUME_ON_STARTUP:
+        resume_interrupted_projects()
+    start_in_process_worker()
+
+
+@app.on_event("shutdown")
+def stop_job_worker():
+    stop_in_process_worker()
+
+
 @app.get("/")
 async def root():
     """主页 - 项目列表"""
@@ -1,9 +1,9 @@
 import json
+import shutil
 import sys
-from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import traceback
-from copy import deepcopy
+from typing import Callable, Dict, Optional, Tuple
 
 project_root = Path(__file__).resolve().parent.parent.parent
 sys.path.insert(0, str(project_root))
@@ -14,9 +14,15 @@ from src.agents.step_01_create_outline import create_outline
 from src.agents.step_03_create_html import create_html
 from src.agents.step_02_plan_layout import plan_layout
 from src.agents.get_pic import get_pic
+from src.agents import slide_scheduler
+from src.html_convert_office import pdf_cache
 from src.models.outline_model import Outline
+from src.models.outline_snapshot import OutlineSnapshot
 from src.repository import outline_repo, project_repo
 from src.models.project_model import Status
+from src.services.chat.chat_response import get_usage
+from src.services.chat.call_context import llm_call_context
+from src.utils import cancellation, task_pool
 
 # 大纲及最终产物根目录
 PPT_OUTPUT_DIR = project_root / "data" / "projects"
@@ -38,125 +44,244 @@ def _get_project_dir(outline_config: Outline):
     return run_dir, html_save_dir, img_save_dir, outline_file
 
 
-def _update_outline_config_html_content(
-    outline_config: Outline, slide_id, html_content
-) -> Outline:
-    updated = False
-    for chapter in outline_config.outline_json["chapters"]:
-        for slide in chapter.get("slides", []):
-            if str(slide["slide_id"]) == str(slide_id):
-                slide["html_content"] = html_content
-                updated = True
-                break
-        if updated:
-            break
-    return outline_config
+def _partial_html_writer(
+    html_save_dir: Optional[Path], slide_id: str
+) -> Optional[Callable[[str], None]]:
+    """流式生成时把已生成的部分 HTML 写入预览文件，所属任务被取消后不再写入（文件可能已被恢复或项目已被重置）"""
+    if html_save_dir is None:
+        return None
+    target_path = html_save_dir / f"{slide_id}.html"
+    token = cancellation.current_token()
+
+    def _write(partial_html: str) -> None:
+        if token is not None and token.cancelled:
+            return
+        try:
+            target_path.write_text(partial_html, encoding="utf-8")
+        except OSError as e:
+            logger.warning(f"写入幻灯片 {slide_id} 的部分 HTML 失败: {e}")
+
+    return _write
+
+
+def _get_img_base_path(outline_config: OutlineSnapshot) -> Path:
+    project_name = project_repo.db_get_project(outline_config.project_id).project_name
+    return project_root / "data" / "projects" / project_name / "images"
+
+
+def _with_slide_images(
+    outline_config: OutlineSnapshot, target_id: str, img_result: dict
+) -> OutlineSnapshot:
+    """将图片路径转换为相对 html_files 的路径，返回只带有该页图片的大纲快照（共享的大纲不会被修改）"""
+    images_temp = {
+        Path("..", *(Path(k).parts[-2:])).as_posix(): v
+        for k, v in img_result.items()
+    }
+    return outline_config.with_slide_images(target_id, images_temp)
 
 
 def _create_html_with_image(
-    outline_config: Outline, visual_suggestions: dict, target_id: str
+    outline_config: OutlineSnapshot,
+    visual_suggestions: dict,
+    target_id: str,
+    on_partial: Optional[Callable[[str], None]] = None,
+    references: Optional[dict] = None,
 ) -> str:
-    project_name = project_repo.db_get_project(outline_config.project_id).project_name
-    img_base_path = project_root / "data" / "projects" / project_name / "images"
+    img_base_path = _get_img_base_path(outline_config)
     logger.info(visual_suggestions)
+    cancellation.check()
     try:
         if visual_suggestions != {}:
             q = visual_suggestions["search_keywords"]
             d = visual_suggestions["image_description"]
-            img_result = get_pic(
-                query=q, description=d, img_base_path=str(img_base_path)
-            )
-            images_temp = {
-                Path("..", *(Path(k).parts[-2:])).as_posix(): v
-                for k, v in img_result.items()
-            }
-            outline_config.images[target_id] = images_temp
-            # print(outline_config.images)
+            with llm_call_context(
+                project_id=outline_config.project_id, slide_id=target_id, stage="pic"
+            ):
+                img_result = get_pic(
+                    query=q, description=d, img_base_path=str(img_base_path)
+                )
+            outline_config = _with_slide_images(outline_config, target_id, img_result)
+    except cancellation.GenerationCancelled:
+        raise
     except Exception as e:
         logger.warning(f"图片搜索失败: {e} 回退至默认模式")
+    cancellation.check()
     html_content = create_html(
         outline_config=outline_config,
         target_id=target_id,
         llm_config=base_config.PPT_LLM_CONFIG,
+        on_partial=on_partial,
+        references=references,
     )
     return html_content
 
 
-def _generate_chapter_slide_html(outline_config: Outline, slide_id: str) -> str:
+def _get_slide_visual_suggestions(outline_config: OutlineSnapshot, slide_id: str) -> dict:
+    """查找幻灯片的配图建议，第一章统一使用全局视觉建议"""
+    entry = outline_config.deck.get(slide_id)
+    if entry is None:
+        return {}
+    if str(slide_id).split(".")[0] == "1":
+        return outline_config.global_visual_suggestion
+    return entry.data.get("visual_suggestion", {})
+
+
+def _generate_chapter_slide_html(
+    outline_config: OutlineSnapshot,
+    slide_id: str,
+    html_save_dir: Optional[Path] = None,
+    references: Optional[dict] = None,
+) -> str:
     """
-    生成单个幻灯片的 HTML 内容。outline_config需要自行添加参考html的内容
+    生成单个幻灯片的 HTML 内容，references 为调度器给出的参考页
+    传入 html_save_dir 时，流式生成过程中的部分 HTML 会实时写入 <slide_id>.html
     """
-    # 从 outline_config 中查找该 slide 的信息
-    visual_suggestions = {}
-    for chapter in outline_config.outline_json["chapters"]:
-        for slide in chapter.get("slides", []):
-            # logger.info(slide)
-            if str(slide["slide_id"]) == str(slide_id):
-                if slide_id.split(".")[0] == "1":
-                    visual_suggestions = outline_config.global_visual_suggestion
-                else:
-                    visual_suggestions = slide.get("visual_suggestion", {})
-                break
+    visual_suggestions = _get_slide_visual_suggestions(outline_config, slide_id)
+    on_partial = _partial_html_writer(html_save_dir, slide_id)
     if outline_config.enable_img_search and visual_suggestions != {}:
         html_content = _create_html_with_image(
             outline_config=outline_config,
             visual_suggestions=visual_suggestions,
             target_id=slide_id,
+            on_partial=on_partial,
+            references=references,
         )
     else:
         html_content = create_html(
             outline_config=outline_config,
             target_id=slide_id,
             llm_config=base_config.PPT_LLM_CONFIG,
+            on_partial=on_partial,
+            references=references,
         )
     return html_content
 
 
-def _generate_chapter_slides_html(
+def _save_slide_html(
+    outline_config: OutlineSnapshot, slide_id: str, html_save_dir: Path, html_content: str
+) -> None:
+    """写入生成完成的幻灯片文件并更新数据库，开启 PDF_EAGER_RENDER 时在后台渲染该页的 PDF"""
+    (html_save_dir / f"{slide_id}.html").write_text(html_content, encoding="utf-8")
+    logger.info(f"幻灯片 {slide_id}.html 已生成")
+    outline_repo.db_update_outline_slide(
+        project_id=outline_config.project_id,
+        slide_id=slide_id,
+        html_content=html_content,
+        new_status=Status.completed,
+        usage=get_usage(html_content),
+    )
+    pdf_cache.schedule_render(html_save_dir, slide_id)
+
+
+def _mark_slide_failed(outline_config: OutlineSnapshot, slide_id: str, html_save_dir: Path) -> None:
+    """清理流式生成过程中写入的不完整文件，并将幻灯片标记为失败"""
+    (html_save_dir / f"{slide_id}.html").unlink(missing_ok=True)
+    outline_repo.db_update_outline_slide(
+        project_id=outline_config.project_id,
+        slide_id=slide_id,
+        new_status=Status.failed,
+    )
+
+
+def _generate_and_save_slide(
+    outline_config: OutlineSnapshot, slide_id: str, html_save_dir: Path, references: dict
+) -> Optional[str]:
+    """
+    生成单页幻灯片并保存，失败时标记该页失败并返回 None，其余页面继续生成
+    任务被取消时直接抛出 GenerationCancelled，页面状态由发起取消的一方处理
+    """
+    try:
+        cancellation.check()
+        html_content = _generate_chapter_slide_html(
+            outline_config, slide_id, html_save_dir, references
+        )
+        cancellation.check()
+        _save_slide_html(outline_config, slide_id, html_save_dir, html_content)
+        return html_content
+    except cancellation.GenerationCancelled:
+        (html_save_dir / f"{slide_id}.html").unlink(missing_ok=True)
+        raise
+    except Exception as e:
+        logger.error(traceback.format_exc())
+        logger.error(f"在生成幻灯片 {slide_id} 时失败: {e}")
+        _mark_slide_failed(outline_config, slide_id, html_save_dir)
+        return None
+
+
+def _build_slide_graph(outline_config: OutlineSnapshot) -> slide_scheduler.SlideGraph:
+    return slide_scheduler.build_slide_graph(
+        outline_config.deck,
+        base_config.PPT_CONTINUITY_DEPTH,
+        base_config.PPT_STYLE_ANCHOR_SLIDES,
+    )
+
+
+def _generate_slides_html(
     outline_config: Outline,
-    chapter_order: int,
     html_save_dir: Path,
-) -> Outline:
+    completed: Optional[Dict[str, str]] = None,
+    priority: str = task_pool.PRIORITY_DECK,
+) -> dict:
     """
-    在一个独立的任务中，顺序生成一个完整章节的所有幻灯片。
+    按依赖关系调度生成所有幻灯片：风格锚点页（PPT_STYLE_ANCHOR_SLIDES）和同章节前序页面完成后立即派发到全局任务池，
+    本项目同时生成的页面数不超过 PPT_API_LIMIT；completed 中已完成的页面（续传）只作为参考，不再生成
+    所有页面任务共享同一份只读的大纲快照
     """
-    logger.info(f"开始顺序生成章节 {chapter_order} 的所有幻灯片html内容...")
-    slide_ids_for_chapter = outline_config.outline_json["chapters"][chapter_order - 1][
-        "slides"
-    ]
-    for slide in slide_ids_for_chapter:
-        slide_id = slide["slide_id"]
-        try:
-            html_content = _generate_chapter_slide_html(outline_config, slide_id)
-
-            (html_save_dir / f"{slide_id}.html").write_text(
-                html_content, encoding="utf-8"
-            )
-            logger.info(f"章节 {chapter_order} 内的幻灯片 {slide_id}.html 已生成")
-            outline_repo.db_update_outline_slide(
-                project_id=outline_config.project_id,
-                slide_id=slide_id,
-                html_content=html_content,
-                new_status=Status.completed,
-            )
-            # 更新本线程内的上下文，为生成本章的下一页做准备
-            outline_config = _update_outline_config_html_content(
-                outline_config, slide_id, html_content
-            )
-        except Exception as e:
-            logger.error(traceback.format_exc())
-            logger.error(f"在生成章节 {chapter_order} 的幻灯片 {slide_id} 时失败: {e}")
-            outline_repo.db_update_outline_slide(
-                project_id=outline_config.project_id,
-                slide_id=slide_id,
-                new_status=Status.failed,
-            )
-            # 即使单页失败，也继续尝试生成本章的下一页
-            continue
-    return outline_config
+    snapshot = OutlineSnapshot.from_outline(outline_config)
+    graph = _build_slide_graph(snapshot)
+    logger.info(
+        f"开始生成 {len(graph) - len(completed or {})} 页幻灯片（跳过已完成的 {len(completed or {})} 页），"
+        f"连贯性参考深度 {base_config.PPT_CONTINUITY_DEPTH}"
+    )
+    return slide_scheduler.run_slide_graph(
+        graph,
+        lambda slide_id, references: _generate_and_save_slide(
+            snapshot, slide_id, html_save_dir, references
+        ),
+        max_workers=base_config.PPT_API_LIMIT,
+        completed=completed,
+        project_id=outline_config.project_id,
+        priority=priority,
+    )
+
+
+def _save_outline_file(outline_config: Outline, outline_file: Path) -> None:
+    """保存大纲文件并提取全局视觉建议"""
+    outline_file.write_text(
+        json.dumps(outline_config.outline_json, ensure_ascii=False, indent=4),
+        encoding="utf-8",
+    )
+    global_visual_suggestion = outline_config.outline_json.get(
+        "global_visual_suggestion", {}
+    )
+    logger.info(f"全局视觉建议: {global_visual_suggestion}")
+    outline_config.global_visual_suggestion = global_visual_suggestion
 
 
-def create_project_execute(outline_config: Outline):
+def _persist_outline(outline_config: Outline) -> Outline:
+    """将大纲与幻灯片写入数据库，更新项目状态，并返回从数据库重新读取的大纲"""
+    project_id = outline_config.project_id
+    # 保存到数据库
+    if not outline_repo.db_add_outline(outline_config=outline_config):
+        raise Exception(f"无法将项目{project_id}大纲保存到数据库! 建议重建项目")
+
+    if not outline_repo.db_add_outline_slides(project_id=project_id):
+        raise Exception(f"无法将项目{project_id}幻灯片保存到数据库! 建议重建项目")
+
+    # 更新状态为生成中
+    project_repo.db_update_project(
+        project_id=project_id, new_status=Status.generating
+    )
+    logger.info(f"项目 {project_id} 的状态已更新为 '{Status.generating}'")
+
+    # 获取大纲配置
+    outline_config_tmp = outline_repo.db_get_outline(project_id=project_id)
+    if not outline_config_tmp:
+        raise Exception(f"无法从数据库中获取项目 {project_id} 的大纲")
+    return outline_config_tmp
+
+
+def create_project_execute(outline_config: Outline, priority: str = task_pool.PRIORITY_DECK):
     _, html_save_dir, img_save_dir, outline_file = _get_project_dir(outline_config)
     html_save_dir.mkdir(parents=True, exist_ok=True)
     img_save_dir.mkdir(parents=True, exist_ok=True)
@@ -171,70 +296,21 @@ def create_project_execute(outline_config: Outline):
             outline_config.enable_img_search = False
 
         # 生成大纲
+        cancellation.check()
         outline_config = create_outline(
             outline_config=outline_config, llm_config=base_config.OUTLINE_LLM_CONFIG
         )
+        _save_outline_file(outline_config, outline_file)
 
-        outline_file.write_text(
-            json.dumps(outline_config.outline_json, ensure_ascii=False, indent=4),
-            encoding="utf-8",
-        )
-        global_visual_suggestion = outline_config.outline_json.get(
-            "global_visual_suggestion", {}
-        )
-        logger.info(f"全局视觉建议: {global_visual_suggestion}")
-        outline_config.global_visual_suggestion = global_visual_suggestion
         # 制定布局规划
+        cancellation.check()
         outline_layout = plan_layout(outline_config=outline_config)
         outline_config.outline_layout = outline_layout
 
-        # 保存到数据库
-        if not outline_repo.db_add_outline(outline_config=outline_config):
-            raise Exception(f"无法将项目{project_id}大纲保存到数据库! 建议重建项目")
+        cancellation.check()
+        outline_config_tmp = _persist_outline(outline_config)
 
-        if not outline_repo.db_add_outline_slides(project_id=project_id):
-            raise Exception(f"无法将项目{project_id}幻灯片保存到数据库! 建议重建项目")
-
-        # 更新状态为生成中
-        project_repo.db_update_project(
-            project_id=project_id, new_status=Status.generating
-        )
-        logger.info(f"项目 {project_id} 的状态已更新为 '{Status.generating}'")
-
-        # 获取大纲配置
-        outline_config_tmp = outline_repo.db_get_outline(project_id=project_id)
-        if not outline_config_tmp:
-            raise Exception(f"无法从数据库中获取项目 {project_id} 的大纲")
-
-        # 生成第一章
-        outline_config_tmp = _generate_chapter_slides_html(
-            outline_config=outline_config_tmp,
-            chapter_order=1,
-            html_save_dir=html_save_dir,
-        )
-
-        # 并发生成其他章节
-        chapters_map = outline_config_tmp.outline_json["chapters"]
-        with ThreadPoolExecutor(max_workers=base_config.PPT_API_LIMIT) as pool:
-            futures = {
-                pool.submit(
-                    _generate_chapter_slides_html,
-                    outline_config=deepcopy(outline_config_tmp),
-                    chapter_order=int(chapter["chapter_id"]),
-                    html_save_dir=html_save_dir,
-                ): chapter["chapter_id"]
-                for chapter in chapters_map
-                if int(chapter["chapter_id"]) > 1
-            }
-
-            for fut in futures:
-                chapter_id = futures[fut]
-                try:
-                    fut.result()
-                    logger.info(f"章节 {chapter_id} 已全部生成完毕。")
-                except Exception as e:
-                    logger.error(f"生成章节 {chapter_id} 时发生错误: {e}")
-                    raise
+        _generate_slides_html(outline_config_tmp, html_save_dir, priority=priority)
 
         # 完成
         logger.info("所有幻灯片内容均已生成完毕。")
@@ -243,6 +319,9 @@ def create_project_execute(outline_config: Outline):
         )
         logger.info(f"项目 {project_id} 的状态已更新为 '{Status.completed}'")
 
+    except cancellation.GenerationCancelled as e:
+        logger.info(f"项目 {project_id} 的生成已取消: {e}")
+        raise
     except Exception as e:
         project_repo.db_update_project(project_id=project_id, new_status=Status.failed)
         logger.error(f"项目 {project_id} 生成失败: {e}")
@@ -250,7 +329,8 @@ def create_project_execute(outline_config: Outline):
         raise
 
 
-def restart_project_execute(project_id):
+def _reset_project(project_id) -> Outline:
+    """清理项目已生成的文件与大纲，返回用于重新生成的干净 Outline"""
     outline_config = outline_repo.db_get_outline(project_id)
     if outline_config is None:
         logger.error(f"未找到项目 {project_id} 的大纲")
@@ -273,6 +353,7 @@ def restart_project_execute(project_id):
     for file in run_dir.iterdir():
         if file.is_file() and file.suffix in [".pdf", ".pptx"]:
             file.unlink()
+    shutil.rmtree(pdf_cache.cache_dir(run_dir), ignore_errors=True)
     project_repo.db_update_project(
         project_id=project_id,
         new_status=Status.generating,
@@ -286,61 +367,202 @@ def restart_project_execute(project_id):
         new_pdf_status=Status.pending,
         new_pptx_status=Status.pending,
     )
-    create_project_execute(clean_outline_config)
+    return clean_outline_config
 
 
-def restart_slide_execute(project_id, slide_id):
+def restart_project_execute(project_id, priority: str = task_pool.PRIORITY_DECK):
+    clean_outline_config = _reset_project(project_id)
+    create_project_execute(clean_outline_config, priority)
+
+
+def _prepare_resume(project_id) -> Optional[Tuple[Outline, Dict[str, str]]]:
+    """
+    续传前的准备：复用数据库中的大纲与布局，收集状态为 completed 且有 HTML 的页面，
+    其余页面（pending、failed 以及中断时遗留的 generating）重置为 pending 并清理不完整的文件
+    大纲或布局不完整（在大纲阶段就中断）时返回 None，只能从头生成
+    """
+    outline_config = outline_repo.db_get_outline(project_id)
+    if (
+        outline_config is None
+        or not outline_config.outline_json.get("chapters")
+        or not outline_config.outline_layout
+    ):
+        return None
+    slides = outline_repo.db_list_outline_slides(project_id)
+    if not slides:
+        if not outline_repo.db_add_outline_slides(project_id=project_id):
+            return None
+        slides = outline_repo.db_list_outline_slides(project_id)
+
+    _, html_save_dir, img_save_dir, _ = _get_project_dir(outline_config)
+    html_save_dir.mkdir(parents=True, exist_ok=True)
+    img_save_dir.mkdir(parents=True, exist_ok=True)
+    completed = {}
+    for slide in slides:
+        html_path = html_save_dir / f"{slide.slide_id}.html"
+        if slide.status == Status.completed and slide.html_content:
+            completed[slide.slide_id] = slide.html_content
+            if not html_path.exists():
+                html_path.write_text(slide.html_content, encoding="utf-8")
+            continue
+        html_path.unlink(missing_ok=True)
+        outline_repo.db_update_outline_slide(
+            project_id=project_id, slide_id=slide.slide_id, new_status=Status.pending
+        )
+    project_repo.db_update_project(project_id=project_id, new_status=Status.generating)
+    logger.info(
+        f"项目 {project_id} 续传：{len(completed)} 页已完成，{len(slides) - len(completed)} 页需要重新生成"
+    )
+    return outline_config, completed
+
+
+def resume_project_execute(project_id, priority: str = task_pool.PRIORITY_DECK):
+    """续传项目，只生成未完成的页面；无法续传时从头重新生成"""
+    prepared = _prepare_resume(project_id)
+    if prepared is None:
+        logger.warning(f"项目 {project_id} 缺少大纲或布局，无法续传，将从头重新生成")
+        restart_project_execute(project_id, priority)
+        return
+    outline_config, completed = prepared
+    _, html_save_dir, _, _ = _get_project_dir(outline_config)
+    try:
+        _generate_slides_html(outline_config, html_save_dir, completed, priority)
+        logger.info("所有幻灯片内容均已生成完毕。")
+        project_repo.db_update_project(
+            project_id=project_id, new_status=Status.completed
+        )
+        logger.info(f"项目 {project_id} 的状态已更新为 '{Status.completed}'")
+    except cancellation.GenerationCancelled as e:
+        logger.info(f"项目 {project_id} 的续传已取消: {e}")
+        raise
+    except Exception as e:
+        project_repo.db_update_project(project_id=project_id, new_status=Status.failed)
+        logger.error(f"项目 {project_id} 续传失败: {e}")
+        logger.error(traceback.format_exc())
+        raise
+
+
+def _restore_slide_html_files(html_save_dir: Path, previous_html: Dict[str, str]) -> None:
+    """重新生成失败或取消时，用重新生成前的内容覆盖流式写入的不完整文件"""
+    for slide_id, html_content in previous_html.items():
+        html_path = html_save_dir / f"{slide_id}.html"
+        try:
+            if html_content:
+                html_path.write_text(html_content, encoding="utf-8")
+            else:
+                html_path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"恢复幻灯片 {slide_id} 的 HTML 文件失败: {e}")
+
+
+def restart_slides_execute(project_id: str, slide_ids: list) -> Dict[str, Optional[str]]:
+    """
+    重新生成项目中的多页幻灯片：大纲、幻灯片索引和所有页面的现有 HTML 只加载一次，
+    请求的页面按依赖关系调度（被请求的前序页面生成完成后才生成依赖它的页面，其余页面使用现有 HTML 作为参考），
+    本项目同时生成的页面数不超过 PPT_API_LIMIT；全部完成后在一个事务中写入结果，失败的页面标记为失败并恢复旧文件。
+    返回 {slide_id: 新 HTML 或 None}
+    """
+    requested = list(dict.fromkeys(str(slide_id) for slide_id in slide_ids))
+    results: Dict[str, Optional[str]] = {slide_id: None for slide_id in requested}
+    previous_html: Dict[str, str] = {}
+    html_save_dir: Optional[Path] = None
     try:
         outline_config = outline_repo.db_get_outline(project_id)
         if outline_config is None:
             logger.error(f"未找到项目 {project_id} 的大纲")
             raise ValueError(f"未找到项目 {project_id} 的大纲")
         _, html_save_dir, _, _ = _get_project_dir(outline_config)
-        chapter_id = str(slide_id.split(".")[0])
-        slide_order = int(slide_id.split(".")[1])
-        reference_slides_list = [f"{chapter_id}.{i}" for i in range(1, slide_order)]
-        logger.info(
-            f"重新生成幻灯片 {slide_id}，参考幻灯片id列表: {reference_slides_list}"
-        )
-        for reference_slide_id in reference_slides_list:
-            reference_slide = outline_repo.db_get_outline_slide(
-                project_id, reference_slide_id
-            )
-            if reference_slide is None:
-                continue
-            reference_slide_html_content = reference_slide.html_content
-            outline_config = _update_outline_config_html_content(
-                outline_config, reference_slide_id, reference_slide_html_content
-            )
-
-        slide_html_content = _generate_chapter_slide_html(outline_config, slide_id)
-        if slide_html_content is None:
-            logger.error(
-                f"重新生成生成项目 {project_id} 的幻灯片 {slide_id} 的 HTML 内容失败"
-            )
-            raise ValueError(
-                f"重新生成生成项目 {project_id} 的幻灯片 {slide_id} 的 HTML 内容失败"
-            )
-        (html_save_dir / f"{slide_id}.html").write_text(
-            slide_html_content, encoding="utf-8"
-        )
-        outline_repo.db_update_outline_slide(
+        snapshot = OutlineSnapshot.from_outline(outline_config)
+        graph = _build_slide_graph(snapshot)
+        html_by_slide = {
+            str(slide.slide_id): slide.html_content or ""
+            for slide in outline_repo.db_list_outline_slides(project_id)
+        }
+        # 大纲或数据库中不存在的页面直接忽略，不写入结果，避免一个无效的 ID 让整批结果回滚
+        missing = [
+            slide_id for slide_id in requested
+            if slide_id not in graph or slide_id not in html_by_slide
+        ]
+        if missing:
+            logger.error(f"项目 {project_id} 中不存在幻灯片 {missing}，已忽略")
+        targets = [slide_id for slide_id in requested if slide_id not in missing]
+        results = {slide_id: None for slide_id in targets}
+        previous_html = {slide_id: html_by_slide[slide_id] for slide_id in targets}
+        # 未请求的页面视为已完成，只作为参考；没有内容的页面不会出现在参考中
+        completed = {
+            slide_id: html_by_slide.get(slide_id, "")
+            for slide_id in graph
+            if slide_id not in targets
+        }
+        logger.info(f"重新生成项目 {project_id} 的 {len(targets)} 页幻灯片: {targets}")
+
+        def generate(slide_id: str, references: dict) -> Optional[str]:
+            try:
+                cancellation.check()
+                results[slide_id] = _generate_chapter_slide_html(
+                    snapshot, slide_id, html_save_dir, references
+                ) or None
+            except cancellation.GenerationCancelled:
+                raise
+            except Exception as e:
+                logger.error(traceback.format_exc())
+                logger.error(f"重新生成项目 {project_id} 的幻灯片 {slide_id} 失败: {e}")
+            # 生成失败时依赖它的页面仍以旧内容作为参考
+            return results[slide_id] or previous_html.get(slide_id) or None
+
+        # 重新生成是用户在等待的操作，以最高优先级进入全局任务池
+        slide_scheduler.run_slide_graph(
+            graph,
+            generate,
+            max_workers=base_config.PPT_API_LIMIT,
+            completed=completed,
             project_id=project_id,
-            slide_id=slide_id,
-            html_content=slide_html_content,
-            new_status=Status.completed,
-        )
-        logger.info(
-            f"重新生成生成项目 {project_id} 的幻灯片 {slide_id} 的 HTML 内容成功"
+            priority=task_pool.PRIORITY_INTERACTIVE,
         )
+        cancellation.check()
+    except cancellation.GenerationCancelled as e:
+        logger.info(f"项目 {project_id} 的幻灯片 {requested} 重新生成已取消: {e}")
+        if html_save_dir is not None:
+            _restore_slide_html_files(html_save_dir, previous_html)
+        raise
     except Exception as e:
-        logger.error(
-            f"重新生成生成项目 {project_id} 的幻灯片 {slide_id} 的 HTML 内容失败: {e}"
-        )
-        outline_repo.db_update_outline_slide(
-            project_id=project_id, slide_id=slide_id, new_status=Status.failed
-        )
+        logger.error(f"重新生成项目 {project_id} 的幻灯片 {requested} 失败: {e}")
         logger.error(traceback.format_exc())
+        results = {slide_id: None for slide_id in results}
+
+    updates = {}
+    for slide_id, html_content in results.items():
+        if html_content:
+            updates[slide_id] = {
+                "new_status": Status.completed,
+                "html_content": html_content,
+                "usage": get_usage(html_content),
+            }
+        else:
+            updates[slide_id] = {"new_status": Status.failed}
+    if not outline_repo.db_update_outline_slides(project_id, updates):
+        # 写入失败时数据库仍是旧内容，文件同样恢复为旧内容，由任务重试或最终失败处理
+        if html_save_dir is not None:
+            _restore_slide_html_files(html_save_dir, previous_html)
+        raise RuntimeError(f"保存项目 {project_id} 重新生成的幻灯片失败")
+
+    succeeded = [slide_id for slide_id, html_content in results.items() if html_content]
+    if html_save_dir is not None:
+        for slide_id in succeeded:
+            (html_save_dir / f"{slide_id}.html").write_text(results[slide_id], encoding="utf-8")
+            pdf_cache.schedule_render(html_save_dir, slide_id)
+        _restore_slide_html_files(
+            html_save_dir,
+            {slide_id: previous_html.get(slide_id, "") for slide_id in results if slide_id not in succeeded},
+        )
+    logger.info(
+        f"项目 {project_id} 重新生成完成: 成功 {len(succeeded)} 页，失败 {len(results) - len(succeeded)} 页"
+    )
+    return results
+
+
+def restart_slide_execute(project_id, slide_id):
+    restart_slides_execute(project_id, [slide_id])
 
 
 # if __name__ == "__main__":
@@ -0,0 +1,291 @@
+import asyncio
+import sys
+from concurrent.futures import CancelledError as FutureCancelledError
+import traceback
+from pathlib import Path
+from typing import Dict, Optional
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import config.base_config as base_config
+from config.logging_config import logger
+from src.agents import slide_scheduler
+from src.agents.create_project import (
+    _build_slide_graph,
+    _get_img_base_path,
+    _get_project_dir,
+    _get_slide_visual_suggestions,
+    _mark_slide_failed,
+    _partial_html_writer,
+    _persist_outline,
+    _prepare_resume,
+    _with_slide_images,
+    _reset_project,
+    _save_outline_file,
+    _save_slide_html,
+    create_project_execute,
+    restart_project_execute,
+    resume_project_execute,
+)
+from src.agents.get_pic import get_pic_async
+from src.agents.step_01_create_outline import create_outline_async
+from src.agents.step_02_plan_layout import plan_layout_async
+from src.agents.step_03_create_html import create_html_async
+from src.models.outline_model import Outline
+from src.models.outline_snapshot import OutlineSnapshot
+from src.services.chat.call_context import llm_call_context
+from src.models.project_model import Status
+from src.repository import project_repo
+from src.utils import cancellation, task_pool
+from src.utils.async_utils import submit_to_engine, to_thread_shielded
+
+
+# 取消后等待引擎中的协程完成清理的最长时间（秒），页面任务的退出等待见 slide_scheduler.DRAIN_TIMEOUT
+ENGINE_DRAIN_TIMEOUT = 60
+
+
+def _llm_slot(outline_config: OutlineSnapshot, priority: str):
+    """全进程共享的 LLM 请求名额（ASYNC_ENGINE_MAX_LLM_CALLS），按优先级和项目公平分配"""
+    return task_pool.get_async_gate().slot(outline_config.project_id, priority)
+
+
+async def _generate_slide_html_async(
+    outline_config: OutlineSnapshot,
+    slide_id: str,
+    html_save_dir: Path,
+    references: dict,
+    priority: str = task_pool.PRIORITY_DECK,
+) -> str:
+    """生成单个幻灯片的 HTML 内容（异步版本），图片搜索失败时回退为无图模式"""
+    visual_suggestions = _get_slide_visual_suggestions(outline_config, slide_id)
+    on_partial = _partial_html_writer(html_save_dir, slide_id)
+    if outline_config.enable_img_search and visual_suggestions != {}:
+        logger.info(visual_suggestions)
+        try:
+            img_base_path = await asyncio.to_thread(_get_img_base_path, outline_config)
+            async with _llm_slot(outline_config, priority):
+                with llm_call_context(
+                    project_id=outline_config.project_id, slide_id=slide_id, stage="pic"
+                ):
+                    img_result = await get_pic_async(
+                        query=visual_suggestions["search_keywords"],
+                        description=visual_suggestions["image_description"],
+                        img_base_path=str(img_base_path),
+                    )
+            outline_config = _with_slide_images(outline_config, slide_id, img_result)
+        except cancellation.GenerationCancelled:
+            raise
+        except Exception as e:
+            logger.warning(f"图片搜索失败: {e} 回退至默认模式")
+    async with _llm_slot(outline_config, priority):
+        return await create_html_async(
+            outline_config=outline_config,
+            target_id=slide_id,
+            llm_config=base_config.PPT_LLM_CONFIG,
+            on_partial=on_partial,
+            references=references,
+        )
+
+
+async def _generate_and_save_slide_async(
+    outline_config: OutlineSnapshot,
+    slide_id: str,
+    html_save_dir: Path,
+    references: dict,
+    priority: str = task_pool.PRIORITY_DECK,
+) -> Optional[str]:
+    """生成单页幻灯片并保存（异步版本），失败时标记该页失败并返回 None，任务被取消时抛出 GenerationCancelled"""
+    saving = False
+    try:
+        cancellation.check()
+        html_content = await _generate_slide_html_async(
+            outline_config, slide_id, html_save_dir, references, priority
+        )
+        cancellation.check()
+        saving = True
+        await to_thread_shielded(
+            _save_slide_html, outline_config, slide_id, html_save_dir, html_content
+        )
+        return html_content
+    except (cancellation.GenerationCancelled, asyncio.CancelledError):
+        # 保存开始后被取消时保存仍会完成（见 to_thread_shielded），此时保留已保存的文件
+        if not saving:
+            (html_save_dir / f"{slide_id}.html").unlink(missing_ok=True)
+        raise
+    except Exception as e:
+        logger.error(traceback.format_exc())
+        logger.error(f"在生成幻灯片 {slide_id} 时失败: {e}")
+        await to_thread_shielded(_mark_slide_failed, outline_config, slide_id, html_save_dir)
+        return None
+
+
+async def _generate_slides_html_async(
+    outline_config: Outline,
+    html_save_dir: Path,
+    completed: Optional[Dict[str, str]] = None,
+    priority: str = task_pool.PRIORITY_DECK,
+) -> dict:
+    """按依赖关系调度，每个项目同时生成的页面数由 PPT_API_LIMIT 控制；completed 中的页面不再生成"""
+    snapshot = OutlineSnapshot.from_outline(outline_config)
+    graph = _build_slide_graph(snapshot)
+    return await slide_scheduler.run_slide_graph_async(
+        graph,
+        lambda slide_id, references: _generate_and_save_slide_async(
+            snapshot, slide_id, html_save_dir, references, priority
+        ),
+        concurrency=base_config.PPT_API_LIMIT,
+        completed=completed,
+    )
+
+
+def _prepare_project_dirs(outline_config: Outline):
+    """确定项目目录并创建 HTML 与图片目录（文件系统操作，在线程中执行）"""
+    _, html_save_dir, img_save_dir, outline_file = _get_project_dir(outline_config)
+    html_save_dir.mkdir(parents=True, exist_ok=True)
+    img_save_dir.mkdir(parents=True, exist_ok=True)
+    return html_save_dir, img_save_dir, outline_file
+
+
+async def create_project_execute_async(
+    outline_config: Outline, priority: str = task_pool.PRIORITY_DECK
+):
+    """
+    create_project_execute 的异步版本：大纲、布局、图片搜索、图片理解与 HTML 生成均以协程运行，
+    每个项目同时生成的页面数由 PPT_API_LIMIT 控制，全局请求数由 ASYNC_ENGINE_MAX_LLM_CALLS 控制，
+    名额按优先级和项目公平分配。
+    """
+    html_save_dir, img_save_dir, outline_file = await asyncio.to_thread(
+        _prepare_project_dirs, outline_config
+    )
+    project_id = outline_config.project_id
+
+    try:
+        async with _llm_slot(outline_config, priority):
+            outline_config = await create_outline_async(
+                outline_config=outline_config, llm_config=base_config.OUTLINE_LLM_CONFIG
+            )
+        await to_thread_shielded(_save_outline_file, outline_config, outline_file)
+
+        async with _llm_slot(outline_config, priority):
+            outline_config.outline_layout = await plan_layout_async(
+                outline_config=outline_config
+            )
+
+        outline_config_tmp = await to_thread_shielded(_persist_outline, outline_config)
+        await _generate_slides_html_async(
+            outline_config_tmp, html_save_dir, priority=priority
+        )
+
+        logger.info("所有幻灯片内容均已生成完毕。")
+        await to_thread_shielded(
+            project_repo.db_update_project, project_id=project_id, new_status=Status.completed
+        )
+        logger.info(f"项目 {project_id} 的状态已更新为 '{Status.completed}'")
+    except cancellation.GenerationCancelled as e:
+        logger.info(f"项目 {project_id} 的生成已取消: {e}")
+        raise
+    except Exception as e:
+        await to_thread_shielded(
+            project_repo.db_update_project, project_id=project_id, new_status=Status.failed
+        )
+        logger.error(f"项目 {project_id} 生成失败: {e}")
+        logger.error(traceback.format_exc())
+        raise
+
+
+async def resume_project_execute_async(
+    outline_config: Outline, completed: Dict[str, str], priority: str = task_pool.PRIORITY_DECK
+):
+    """resume_project_execute 的异步版本，只生成 completed 以外的页面"""
+    project_id = outline_config.project_id
+    _, html_save_dir, _, _ = await asyncio.to_thread(_get_project_dir, outline_config)
+    try:
+        await _generate_slides_html_async(outline_config, html_save_dir, completed, priority)
+        logger.info("所有幻灯片内容均已生成完毕。")
+        await to_thread_shielded(
+            project_repo.db_update_project, project_id=project_id, new_status=Status.completed
+        )
+        logger.info(f"项目 {project_id} 的状态已更新为 '{Status.completed}'")
+    except cancellation.GenerationCancelled as e:
+        logger.info(f"项目 {project_id} 的续传已取消: {e}")
+        raise
+    except Exception as e:
+        await to_thread_shielded(
+            project_repo.db_update_project, project_id=project_id, new_status=Status.failed
+        )
+        logger.error(f"项目 {project_id} 续传失败: {e}")
+        logger.error(traceback.format_exc())
+        raise
+
+
+def submit_create_project(outline_config: Outline, priority: str = task_pool.PRIORITY_DECK):
+    """将项目生成提交到异步引擎后立即返回，不阻塞调用线程"""
+    return submit_to_engine(
+        create_project_execute_async(outline_config, priority),
+        description=f"项目 {outline_config.project_id} 生成",
+    )
+
+
+def submit_restart_project(project_id: str, priority: str = task_pool.PRIORITY_DECK):
+    """清理项目后提交到异步引擎重新生成"""
+    clean_outline_config = _reset_project(project_id)
+    return submit_create_project(clean_outline_config, priority)
+
+
+def submit_resume_project(project_id: str, priority: str = task_pool.PRIORITY_DECK):
+    """续传项目，无法续传（缺少大纲或布局）时清理后从头重新生成"""
+    prepared = _prepare_resume(project_id)
+    if prepared is None:
+        logger.warning(f"项目 {project_id} 缺少大纲或布局，无法续传，将从头重新生成")
+        return submit_restart_project(project_id, priority)
+    outline_config, completed = prepared
+    return submit_to_engine(
+        resume_project_execute_async(outline_config, completed, priority),
+        description=f"项目 {project_id} 续传",
+    )
+
+
+def _wait_engine(future) -> None:
+    """
+    等待引擎中的协程结束；当前任务被取消时同时取消引擎中的协程，并等待其完成清理（恢复文件、写入状态）后再返回，
+    保证任务退出后（删除、重新生成项目会等待任务退出）不会再有旧任务的写入
+    """
+    remove = cancellation.on_cancel(future.cancel)
+    try:
+        future.result()
+    except FutureCancelledError:
+        if not future.finished.wait(ENGINE_DRAIN_TIMEOUT):
+            logger.warning(f"引擎中的协程在取消 {ENGINE_DRAIN_TIMEOUT} 秒后仍未退出")
+        cancellation.check()
+        raise
+    finally:
+        remove()
+
+
+def _use_async_engine() -> bool:
+    return base_config.GENERATION_ENGINE.strip().lower() == "async"
+
+
+def run_create_project(outline_config: Outline, priority: str = task_pool.PRIORITY_DECK):
+    """按 GENERATION_ENGINE 配置选择生成引擎，阻塞直到生成结束，生成失败时抛出异常"""
+    if _use_async_engine():
+        _wait_engine(submit_create_project(outline_config, priority))
+    else:
+        create_project_execute(outline_config, priority)
+
+
+def run_restart_project(project_id: str, priority: str = task_pool.PRIORITY_DECK):
+    """按 GENERATION_ENGINE 配置选择生成引擎重新生成项目，阻塞直到生成结束"""
+    if _use_async_engine():
+        _wait_engine(submit_restart_project(project_id, priority))
+    else:
+        restart_project_execute(project_id, priority)
+
+
+def run_resume_project(project_id: str, priority: str = task_pool.PRIORITY_DECK):
+    """按 GENERATION_ENGINE 配置选择生成引擎续传项目，阻塞直到生成结束"""
+    if _use_async_engine():
+        _wait_engine(submit_resume_project(project_id, priority))
+    else:
+        resume_project_execute(project_id, priority)
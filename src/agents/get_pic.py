@@ -6,30 +6,17 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-from src.services.chat.chat import pic_understand
+from src.services.chat.chat import pic_understand, pic_understand_async
 from src.services.search.image_search import image_search
+from src.utils import profiling
 from src.utils.help_utils import get_prompt, response2list
+from src.utils.async_utils import run_blocking
 from config.logging_config import logger
 import config.base_config as base_config
 
 
-def get_pic(
-    query: str,
-    description: str,
-    pic_num_limit: int = base_config.PIC_NUM_LIMIT,
-    img_base_path: str = str(project_root / "data" / "images"),
-):
-    """获取与指定查询相关的图片，并进行理解分析。
-    Args:
-        query (str): 查询关键词
-        max_pic_num (int): 最大图片数量
-    """
-    results = {}
-    img_search_results = image_search(
-        query=query, pic_num_limit=pic_num_limit, img_base_path=img_base_path
-    )
-    # logger.info(f"图片搜索结果 {results.keys()}")
-    # logger.info(f"图片搜索结果 {results.values()}")
+def _build_pic_prompt(img_search_results: dict, description: str):
+    """构建图片理解提示词，返回 (提示词, 图片base64列表, 图片编号到图片键名的映射)"""
     base_prompt = get_prompt("pic_understand")
     imgs_info = ""
     for i, value in enumerate(img_search_results.values()):
@@ -43,8 +30,11 @@ def get_pic(
     images_base64 = [
         value.img_base64 for value in img_search_results.values() if value.img_base64
     ]
-    # logger.info(prompt)
-    pic_results = pic_understand(images_base64=images_base64, prompt=prompt)
+    return prompt, images_base64, id2key
+
+
+def _apply_pic_results(pic_results: str, img_search_results: dict, id2key: dict) -> dict:
+    results = {}
     pic_results = response2list(pic_results)
     for result in pic_results:
         img_id = int(result["img_id"])
@@ -62,6 +52,47 @@ def get_pic(
     return results
 
 
+def get_pic(
+    query: str,
+    description: str,
+    pic_num_limit: int = base_config.PIC_NUM_LIMIT,
+    img_base_path: str = str(project_root / "data" / "images"),
+):
+    """获取与指定查询相关的图片，并进行理解分析。
+    Args:
+        query (str): 查询关键词
+        max_pic_num (int): 最大图片数量
+    """
+    with profiling.stage(profiling.STAGE_IMAGE_SEARCH):
+        img_search_results = image_search(
+            query=query, pic_num_limit=pic_num_limit, img_base_path=img_base_path
+        )
+    # logger.info(f"图片搜索结果 {results.keys()}")
+    # logger.info(f"图片搜索结果 {results.values()}")
+    prompt, images_base64, id2key = _build_pic_prompt(img_search_results, description)
+    # logger.info(prompt)
+    with profiling.stage(profiling.STAGE_VISION):
+        pic_results = pic_understand(images_base64=images_base64, prompt=prompt)
+    return _apply_pic_results(pic_results, img_search_results, id2key)
+
+
+async def get_pic_async(
+    query: str,
+    description: str,
+    pic_num_limit: int = base_config.PIC_NUM_LIMIT,
+    img_base_path: str = str(project_root / "data" / "images"),
+):
+    """get_pic 的异步版本，图片搜索与下载在共享 I/O 线程池中执行"""
+    with profiling.stage(profiling.STAGE_IMAGE_SEARCH):
+        img_search_results = await run_blocking(
+            image_search, query=query, pic_num_limit=pic_num_limit, img_base_path=img_base_path
+        )
+    prompt, images_base64, id2key = _build_pic_prompt(img_search_results, description)
+    with profiling.stage(profiling.STAGE_VISION):
+        pic_results = await pic_understand_async(images_base64=images_base64, prompt=prompt)
+    return _apply_pic_results(pic_results, img_search_results, id2key)
+
+
 if __name__ == "__main__":
     query = "芯片 晶圆 半导体"
     description = "一张展示芯片制造过程的高清图片，用作科技类PPT的背景图"
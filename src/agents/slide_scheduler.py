@@ -0,0 +1,262 @@
+import asyncio
+import heapq
+import sys
+import traceback
+from concurrent.futures import FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from config.logging_config import logger
+from src.models.deck_index import DeckIndex
+from src.utils import cancellation, task_pool
+
+# 取消或出错后等待已开始的页面退出的最长时间（秒），页面在下一个取消检查点就会退出
+DRAIN_TIMEOUT = 30
+
+# 每个幻灯片节点的结构:
+# {"slide_id": "2.3", "style": [风格参考的 slide_id], "continuity": [连贯性参考的 slide_id], "order": 在演示文稿中的顺序}
+SlideGraph = Dict[str, dict]
+
+
+def parse_anchor_slides(raw: str) -> list[str]:
+    """解析 PPT_STYLE_ANCHOR_SLIDES，例如 "1.1, 1.2" -> ["1.1", "1.2"]"""
+    return list(dict.fromkeys(item.strip() for item in (raw or "").split(",") if item.strip()))
+
+
+def _resolve_anchors(deck: DeckIndex, anchor_slides: str) -> list[str]:
+    """配置的锚点页中不存在于大纲的会被忽略；未配置或全部无效时以第一章的全部页面作为锚点"""
+    configured = parse_anchor_slides(anchor_slides)
+    anchors = [slide_id for slide_id in configured if slide_id in deck]
+    missing = [slide_id for slide_id in configured if slide_id not in deck]
+    if missing:
+        logger.warning(f"风格锚点页 {missing} 不在大纲中，已忽略")
+    if anchors:
+        return anchors
+    return [entry.slide_id for entry in deck if entry.chapter_index == 0]
+
+
+def build_slide_graph(deck: DeckIndex, continuity_depth: int, anchor_slides: str = "") -> SlideGraph:
+    """
+    根据大纲声明每页幻灯片的依赖：
+    风格锚点页（anchor_slides，默认整个第一章）最先生成，其余每一页都以全部锚点页作为风格参考；
+    每一页以同一章节中前 continuity_depth 页作为连贯性参考，0 表示不依赖同章节的前序页面。
+    锚点页之间只参考更早的锚点页，避免与依赖锚点的页面形成循环
+    """
+    depth = max(int(continuity_depth), 0)
+    anchors = _resolve_anchors(deck, anchor_slides)
+    graph: SlideGraph = {}
+    for entry in deck:
+        continuity = deck.previous(entry.slide_id, depth)
+        if entry.slide_id in anchors:
+            style = []
+            continuity = [ref for ref in continuity if ref in anchors]
+        else:
+            style = list(anchors)
+        graph[entry.slide_id] = {
+            "slide_id": entry.slide_id,
+            "style": style,
+            "continuity": continuity,
+            "order": entry.order,
+        }
+    _check_acyclic(graph)
+    return graph
+
+
+def dependencies(node: dict) -> list[str]:
+    return list(dict.fromkeys(node["style"] + node["continuity"]))
+
+
+def _check_acyclic(graph: SlideGraph) -> None:
+    """依赖必须指向图中已存在的节点且不能成环，否则抛出 ValueError"""
+    state: Dict[str, int] = {}
+
+    def visit(slide_id: str) -> None:
+        if state.get(slide_id) == 2:
+            return
+        if state.get(slide_id) == 1:
+            raise ValueError(f"幻灯片 {slide_id} 的依赖存在循环")
+        state[slide_id] = 1
+        for dep in dependencies(graph[slide_id]):
+            if dep not in graph:
+                raise ValueError(f"幻灯片 {slide_id} 依赖了不存在的幻灯片 {dep}")
+            visit(dep)
+        state[slide_id] = 2
+
+    for slide_id in graph:
+        visit(slide_id)
+
+
+def critical_path_lengths(graph: SlideGraph) -> Dict[str, int]:
+    """每页幻灯片到最后一个依赖它的页面的最长链长度（含自身），用于优先调度关键路径上的页面"""
+    dependents: Dict[str, list[str]] = {slide_id: [] for slide_id in graph}
+    for slide_id, node in graph.items():
+        for dep in dependencies(node):
+            dependents[dep].append(slide_id)
+    lengths: Dict[str, int] = {}
+
+    def length(slide_id: str) -> int:
+        if slide_id not in lengths:
+            lengths[slide_id] = 1 + max((length(child) for child in dependents[slide_id]), default=0)
+        return lengths[slide_id]
+
+    for slide_id in graph:
+        length(slide_id)
+    return lengths
+
+
+def collect_references(node: dict, html_by_slide: Dict[str, Optional[str]]) -> dict:
+    """把节点声明的依赖转换为 create_html 需要的参考页列表，生成失败的页面会被跳过"""
+    return {
+        kind: [
+            {"slide_id": slide_id, "html_content": html_by_slide[slide_id]}
+            for slide_id in node[kind]
+            if html_by_slide.get(slide_id)
+        ]
+        for kind in ("style", "continuity")
+    }
+
+
+class _ReadyQueue:
+    """
+    记录每页剩余的依赖数，依赖全部完成的页面按关键路径长度、页面顺序出队
+    skip 中的页面（续传时已完成的页面）视为已经完成，不会出队
+    """
+
+    def __init__(self, graph: SlideGraph, skip: Iterable[str] = ()):
+        self.graph = graph
+        self.lengths = critical_path_lengths(graph)
+        self.remaining = {slide_id: len(dependencies(node)) for slide_id, node in graph.items()}
+        self.dependents: Dict[str, list[str]] = {slide_id: [] for slide_id in graph}
+        for slide_id, node in graph.items():
+            for dep in dependencies(node):
+                self.dependents[dep].append(slide_id)
+        self.skipped = {slide_id for slide_id in skip if slide_id in graph}
+        for slide_id in self.skipped:
+            for child in self.dependents[slide_id]:
+                self.remaining[child] -= 1
+        self._heap: list = []
+        for slide_id, count in self.remaining.items():
+            if count == 0 and slide_id not in self.skipped:
+                self._push(slide_id)
+
+    def _push(self, slide_id: str) -> None:
+        heapq.heappush(self._heap, (-self.lengths[slide_id], self.graph[slide_id]["order"], slide_id))
+
+    def pop(self) -> Optional[str]:
+        return heapq.heappop(self._heap)[2] if self._heap else None
+
+    def done(self, slide_id: str) -> None:
+        for child in self.dependents[slide_id]:
+            self.remaining[child] -= 1
+            if self.remaining[child] == 0 and child not in self.skipped:
+                self._push(child)
+
+
+def run_slide_graph(
+    graph: SlideGraph,
+    generate: Callable[[str, dict], Optional[str]],
+    max_workers: int,
+    completed: Optional[Dict[str, str]] = None,
+    *,
+    project_id: str = "",
+    priority: str = task_pool.PRIORITY_DECK,
+) -> Dict[str, Optional[str]]:
+    """
+    按依赖调度生成幻灯片，依赖全部完成的页面立即提交到全局任务池，本项目同时提交的页面数不超过 max_workers
+    generate(slide_id, references) 返回 HTML，失败时返回 None 或抛出异常；失败页面的依赖方仍会生成，只是缺少该参考页
+    completed 为已生成的 {slide_id: HTML}，这些页面不再生成，只作为其他页面的参考
+    任务被取消时抛出 GenerationCancelled，尚未开始的页面不再执行
+    返回 {slide_id: HTML 或 None}
+    """
+    completed = completed or {}
+    queue = _ReadyQueue(graph, skip=completed)
+    html_by_slide: Dict[str, Optional[str]] = dict(completed)
+    workers = max(int(max_workers), 1)
+    running = {}
+
+    def dispatch() -> None:
+        cancellation.check()
+        while len(running) < workers:
+            slide_id = queue.pop()
+            if slide_id is None:
+                return
+            references = collect_references(graph[slide_id], html_by_slide)
+            future = task_pool.submit(
+                generate, slide_id, references, project_id=project_id, priority=priority
+            )
+            running[future] = slide_id
+
+    try:
+        dispatch()
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                slide_id = running.pop(future)
+                try:
+                    html_by_slide[slide_id] = future.result()
+                except cancellation.GenerationCancelled:
+                    raise
+                except Exception as e:
+                    logger.error(traceback.format_exc())
+                    logger.error(f"生成幻灯片 {slide_id} 时失败: {e}")
+                    html_by_slide[slide_id] = None
+                queue.done(slide_id)
+            dispatch()
+    finally:
+        # 被取消时撤回还在全局任务池中排队的页面，已开始的页面会在下一个检查点退出；
+        # 等待它们完成清理后再返回，调用方（以及等待任务退出的删除、重新生成操作）之后不会再有页面写入文件
+        for future in running:
+            future.cancel()
+        if running:
+            wait(running, timeout=DRAIN_TIMEOUT)
+    return html_by_slide
+
+
+async def run_slide_graph_async(
+    graph: SlideGraph,
+    generate: Callable[[str, dict], Awaitable[Optional[str]]],
+    concurrency: int,
+    completed: Optional[Dict[str, str]] = None,
+) -> Dict[str, Optional[str]]:
+    """run_slide_graph 的异步版本，同时进行的页面数不超过 concurrency"""
+    completed = completed or {}
+    queue = _ReadyQueue(graph, skip=completed)
+    html_by_slide: Dict[str, Optional[str]] = dict(completed)
+    limit = max(int(concurrency), 1)
+    running: Dict[asyncio.Task, str] = {}
+
+    def dispatch() -> None:
+        cancellation.check()
+        while len(running) < limit:
+            slide_id = queue.pop()
+            if slide_id is None:
+                return
+            references = collect_references(graph[slide_id], html_by_slide)
+            running[asyncio.create_task(generate(slide_id, references))] = slide_id
+
+    try:
+        dispatch()
+        while running:
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                slide_id = running.pop(task)
+                try:
+                    html_by_slide[slide_id] = task.result()
+                except cancellation.GenerationCancelled:
+                    raise
+                except Exception as e:
+                    logger.error(traceback.format_exc())
+                    logger.error(f"生成幻灯片 {slide_id} 时失败: {e}")
+                    html_by_slide[slide_id] = None
+                queue.done(slide_id)
+            dispatch()
+    finally:
+        # asyncio.wait 被取消时不会取消子任务，这里统一取消并等待它们退出
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.wait(running, timeout=DRAIN_TIMEOUT)
+    return html_by_slide
@@ -7,7 +7,9 @@ sys.path.insert(0, str(project_root))
 
 import config.base_config as base_config
 from config.logging_config import logger
-from src.services.chat.chat import text_chat
+from src.services.chat.chat import text_chat, text_chat_async
+from src.services.chat.call_context import llm_call_context
+from src.utils import profiling
 from src.utils.help_utils import response2json, get_prompt
 from src.models.outline_model import Outline
 
@@ -15,8 +17,7 @@ standard_outline_prompt = get_prompt("outline_prompt")
 standard_outline_prompt_with_image = get_prompt("outline_prompt_with_image")
 
 
-def create_outline(outline_config: Outline, llm_config=base_config.OUTLINE_LLM_CONFIG) -> Outline:
-    logger.info("大纲生成中...")
+def _build_outline_prompt(outline_config: Outline) -> str:
     topic = outline_config.topic
     page_num = outline_config.page_num
     audience = outline_config.audience
@@ -30,18 +31,20 @@ def create_outline(outline_config: Outline, llm_config=base_config.OUTLINE_LLM_C
     else:
         logger.info("禁用图片搜索")
         outline_base_prompt = standard_outline_prompt
-    outline_prompt = outline_base_prompt.format(
+    return outline_base_prompt.format(
             topic=topic,
             page_num=page_num,
             reference_content=reference_content,
             audience=audience,
             style=style,
         )
-    outline_llm_rsp = text_chat(prompt=outline_prompt, llm_config=llm_config)
+
+
+def _apply_outline_response(outline_config: Outline, outline_llm_rsp: str) -> Outline:
     # print("大纲模型返回的原始内容：\n", outline_llm_rsp)
     outline_json = response2json(outline_llm_rsp)
-    outline_json["target_audience"] = audience
-    outline_json["style"] = style
+    outline_json["target_audience"] = outline_config.audience
+    outline_json["style"] = outline_config.style
 
     # with open(project_root.joinpath("response.json"),'w',encoding="utf-8") as fp:
     #     fp.write(json.dumps(outline_json,ensure_ascii=False,indent=4))
@@ -52,3 +55,26 @@ def create_outline(outline_config: Outline, llm_config=base_config.OUTLINE_LLM_C
 
     outline_config.outline_json = outline_json
     return outline_config
+
+
+def create_outline(outline_config: Outline, llm_config=base_config.OUTLINE_LLM_CONFIG) -> Outline:
+    logger.info("大纲生成中...")
+    outline_prompt = _build_outline_prompt(outline_config)
+    with profiling.stage(profiling.STAGE_OUTLINE), llm_call_context(
+        project_id=outline_config.project_id, stage="outline"
+    ):
+        outline_llm_rsp = text_chat(prompt=outline_prompt, llm_config=llm_config)
+    return _apply_outline_response(outline_config, outline_llm_rsp)
+
+
+async def create_outline_async(
+    outline_config: Outline, llm_config=base_config.OUTLINE_LLM_CONFIG
+) -> Outline:
+    """create_outline 的异步版本"""
+    logger.info("大纲生成中...")
+    outline_prompt = _build_outline_prompt(outline_config)
+    with profiling.stage(profiling.STAGE_OUTLINE), llm_call_context(
+        project_id=outline_config.project_id, stage="outline"
+    ):
+        outline_llm_rsp = await text_chat_async(prompt=outline_prompt, llm_config=llm_config)
+    return _apply_outline_response(outline_config, outline_llm_rsp)
@@ -6,16 +6,38 @@ project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 from config.logging_config import logger
-from src.services.chat.chat import text_chat
-from src.utils.help_utils import response2json, get_prompt, parse_outline
+from src.services.chat.chat import text_chat, text_chat_async
+from src.services.chat.call_context import llm_call_context
+from src.utils import profiling
+from src.utils.help_utils import response2json, get_prompt
+from src.utils.outline_cache import render_outline
 from src.models.outline_model import Outline
 
 plan_layout_prompt_template = get_prompt("plan_layout")
 
 
+def _build_plan_layout_prompt(outline_config: Outline) -> str:
+    # 按大纲内容哈希缓存，页面生成时复用同一份大纲文本
+    outline_md = render_outline(outline_config.outline_json)
+    return plan_layout_prompt_template.format(outline=outline_md)
+
+
 def plan_layout(outline_config: Outline):
     logger.info("制定布局规划...")
-    outline_md = parse_outline(outline_config.outline_json)
-    plan_layout_prompt = plan_layout_prompt_template.format(outline=outline_md)
-    response = text_chat(plan_layout_prompt)
+    plan_layout_prompt = _build_plan_layout_prompt(outline_config)
+    with profiling.stage(profiling.STAGE_LAYOUT), llm_call_context(
+        project_id=outline_config.project_id, stage="layout"
+    ):
+        response = text_chat(plan_layout_prompt)
+    return response2json(response)
+
+
+async def plan_layout_async(outline_config: Outline):
+    """plan_layout 的异步版本"""
+    logger.info("制定布局规划...")
+    plan_layout_prompt = _build_plan_layout_prompt(outline_config)
+    with profiling.stage(profiling.STAGE_LAYOUT), llm_call_context(
+        project_id=outline_config.project_id, stage="layout"
+    ):
+        response = await text_chat_async(plan_layout_prompt)
     return response2json(response)
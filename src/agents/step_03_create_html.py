@@ -1,21 +1,42 @@
 import sys
+import threading
 from pathlib import Path
+from typing import Callable, Optional
 
 # 将项目根目录添加到 Python 路径
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 from src.agents.step_01_create_outline import create_outline
-from src.services.chat.chat import text_chat
-from src.utils.help_utils import response2json, parse_outline, get_prompt, extract_html
+from src.services.chat import hedging
+from src.services.chat.chat import text_chat, text_chat_stream
+from src.services.chat.chat_response import ChatResponse, get_usage
+from src.services.chat.call_context import llm_call_context
+from src.utils import profiling
+from src.utils.async_utils import run_blocking
+from src.utils.style_digest import build_style_digest
+from src.utils.help_utils import (
+    HtmlStreamExtractor,
+    response2json,
+    get_prompt,
+    extract_html,
+)
 import config.base_config as base_config
 from config.logging_config import logger
 from src.models.outline_model import Outline
+from src.models.outline_snapshot import OutlineSnapshot
 
 create_html_ppt = get_prompt("create_html_ppt")
 create_html_ppt_with_image = get_prompt("create_html_ppt_with_image")
 
 
+def _format_reference(slides: list) -> str:
+    """开启 PPT_STYLE_DIGEST_ENABLED 时返回参考页的风格摘要，否则返回参考页的完整 HTML"""
+    if base_config.PPT_STYLE_DIGEST_ENABLED:
+        return build_style_digest(slides, token_limit=base_config.PPT_REFERENCE_TOKEN_LIMIT)
+    return _format_slides_as_reference_html(slides)
+
+
 def _format_slides_as_reference_html(slides: list) -> str:
     """
     一个辅助函数，用于将幻灯片列表格式化为带有标题和分隔符的参考字符串。
@@ -41,11 +62,15 @@ def _format_slides_as_reference_html(slides: list) -> str:
     return header + body
 
 
-def create_html(
-    outline_config: Outline, target_id: str, llm_config=base_config.PPT_LLM_CONFIG
+def _build_html_prompt(
+    outline_config: OutlineSnapshot, target_id: str, references: Optional[dict] = None
 ) -> str:
-    """根据大纲和目标ID生成HTML内容"""
-    chapters = outline_config.outline_json.get("chapters", [])
+    """
+    根据大纲、布局规划和已生成的参考页构建生成HTML的提示词
+    references 为调度器给出的参考页 {"style": [...], "continuity": [...]}，
+    未提供时从大纲中查找已写入 html_content 的第一章和同章节页面
+    """
+    deck = outline_config.deck
     # 布局提取
     outline_layout = outline_config.outline_layout
     slide_outline_layout = outline_layout.get(str(target_id), "无")
@@ -54,22 +79,20 @@ def create_html(
     style_reference_html = ""
     continuity_reference_html = ""
 
+    if references is not None:
+        style_reference_html = _format_reference(references.get("style", []))
+        continuity_reference_html = _format_reference(references.get("continuity", []))
+
     # 生成 style_reference_html (风格参考)
-    if chapters:
-        first_chapter = chapters[0]
-        style_reference_html = _format_slides_as_reference_html(
-            slides=first_chapter.get("slides", []),
-        )
+    elif deck.chapters:
+        first_chapter = deck.chapters[0]
+        style_reference_html = _format_reference(first_chapter.get("slides", []))
 
     # 生成 continuity_reference_html (布局参考)
-    if chapters:
-        target_chapter_id = target_id.split(".", maxsplit=1)[0]
-        for chapter in chapters:
-            if chapter.get("chapter_id") == target_chapter_id:
-                continuity_reference_html = _format_slides_as_reference_html(
-                    slides=chapter.get("slides", []),
-                )
-                break
+    if references is None:
+        target_chapter = deck.chapter(target_id.split(".", maxsplit=1)[0])
+        if target_chapter is not None:
+            continuity_reference_html = _format_reference(target_chapter.get("slides", []))
 
     if not style_reference_html:
         style_reference_html = "这是第一个界面,没有任何参考文件"
@@ -86,7 +109,7 @@ def create_html(
     imgs_info = ""
     if images == {}:
         html_prompt = create_html_ppt.format(
-            outline=parse_outline(outline_config.outline_json),
+            outline=outline_config.outline_text,
             target_id=target_id,
             slide_outline_layout=slide_outline_layout,
             style_reference_html=style_reference_html,
@@ -99,7 +122,7 @@ def create_html(
             """
             # logger.info(f"图片提示词:{imgs_info}")
         html_prompt = create_html_ppt_with_image.format(
-            outline=parse_outline(outline_config.outline_json),
+            outline=outline_config.outline_text,
             target_id=target_id,
             imgs_info=imgs_info,
             slide_outline_layout=slide_outline_layout,
@@ -107,9 +130,129 @@ def create_html(
             continuity_reference_html=continuity_reference_html,
         )
     # html_prompt = create_html_ppt.format(outline=parse_outline(outline_config.outline_json), target_id=target_id)
-    html_llm_rsp = text_chat(prompt=html_prompt, llm_config=llm_config)
+    return html_prompt
+
+
+def _request_html_once(
+    html_prompt: str,
+    llm_config=base_config.PPT_LLM_CONFIG,
+    on_partial: Optional[Callable[[str], None]] = None,
+    use_cache: bool = True,
+    cancelled: Optional[threading.Event] = None,
+) -> str:
+    """
+    调用模型生成HTML并提取结果，返回值保留模型回复中的用量信息
+    开启流式生成时，收到完整的 </html> 后立即结束生成，并通过 on_partial 回调已生成的部分 HTML
+    cancelled 被置位后流式请求会尽快结束（非流式请求无法中断，结果会被丢弃）
+    """
+    if base_config.PPT_STREAM_ENABLED:
+        extractor = HtmlStreamExtractor(on_partial=on_partial, cancelled=cancelled)
+        html_llm_rsp = text_chat_stream(
+            prompt=html_prompt,
+            llm_config=llm_config,
+            stream_handler=extractor,
+            use_cache=use_cache,
+        )
+        if extractor.done:
+            return ChatResponse(extractor.html, usage=get_usage(html_llm_rsp))
+    else:
+        html_llm_rsp = text_chat(prompt=html_prompt, llm_config=llm_config, use_cache=use_cache)
     html_content = extract_html(html_llm_rsp)
-    return html_content
+    return ChatResponse(html_content, usage=get_usage(html_llm_rsp))
+
+
+def _fallback_llm_config():
+    """已配置备用模型（地址和模型名称都不为空）时返回其配置，否则返回 None"""
+    fallback = base_config.PPT_FALLBACK_LLM_CONFIG
+    if fallback.api_url and fallback.name:
+        return fallback
+    return None
+
+
+def _hedge_plan(
+    html_prompt: str,
+    llm_config=base_config.PPT_LLM_CONFIG,
+    on_partial: Optional[Callable[[str], None]] = None,
+) -> Optional[dict]:
+    """未开启对冲且没有备用模型时返回 None，否则返回 run_hedged / run_hedged_async 的参数"""
+    fallback_config = _fallback_llm_config()
+    if not base_config.PPT_HEDGE_ENABLED and fallback_config is None:
+        return None
+
+    backup_config = fallback_config or llm_config
+    return dict(
+        primary_key=llm_config.endpoint_id,
+        primary=lambda cancelled: _request_html_once(
+            html_prompt, llm_config, on_partial, cancelled=cancelled
+        ),
+        backup_key=backup_config.endpoint_id,
+        # 对冲请求不走缓存，预览文件只由主请求写入
+        backup=lambda cancelled: _request_html_once(
+            html_prompt, backup_config, use_cache=False, cancelled=cancelled
+        ),
+        hedge=bool(base_config.PPT_HEDGE_ENABLED),
+        fallback_on_failure=fallback_config is not None,
+    )
+
+
+def _request_html(
+    html_prompt: str,
+    llm_config=base_config.PPT_LLM_CONFIG,
+    on_partial: Optional[Callable[[str], None]] = None,
+) -> str:
+    """
+    生成HTML，开启 PPT_HEDGE_ENABLED 时耗时超过近期分位数会向备用模型（未配置则为同一模型）发起对冲请求，
+    配置了备用模型时主模型失败会自动改用备用模型
+    """
+    plan = _hedge_plan(html_prompt, llm_config, on_partial)
+    if plan is None:
+        return _request_html_once(html_prompt, llm_config, on_partial)
+    return hedging.run_hedged(**plan)
+
+
+async def _request_html_async(
+    html_prompt: str,
+    llm_config=base_config.PPT_LLM_CONFIG,
+    on_partial: Optional[Callable[[str], None]] = None,
+) -> str:
+    """_request_html 的异步版本：单个请求在共享 I/O 线程池中执行，对冲时直接等待 hedge 线程池中的两个请求，不再额外占用 I/O 线程"""
+    plan = _hedge_plan(html_prompt, llm_config, on_partial)
+    if plan is None:
+        return await run_blocking(_request_html_once, html_prompt, llm_config, on_partial)
+    return await hedging.run_hedged_async(**plan)
+
+
+def create_html(
+    outline_config: OutlineSnapshot,
+    target_id: str,
+    llm_config=base_config.PPT_LLM_CONFIG,
+    on_partial: Optional[Callable[[str], None]] = None,
+    references: Optional[dict] = None,
+) -> str:
+    """
+    根据大纲和目标ID生成HTML内容，on_partial 用于流式生成时接收部分 HTML
+    references 为参考页列表，见 _build_html_prompt
+    """
+    html_prompt = _build_html_prompt(outline_config, target_id, references)
+    with profiling.stage(profiling.STAGE_HTML), llm_call_context(
+        project_id=outline_config.project_id, slide_id=target_id, stage="html"
+    ):
+        return _request_html(html_prompt, llm_config=llm_config, on_partial=on_partial)
+
+
+async def create_html_async(
+    outline_config: OutlineSnapshot,
+    target_id: str,
+    llm_config=base_config.PPT_LLM_CONFIG,
+    on_partial: Optional[Callable[[str], None]] = None,
+    references: Optional[dict] = None,
+) -> str:
+    """create_html 的异步版本，模型请求在共享 I/O 线程池中执行"""
+    html_prompt = _build_html_prompt(outline_config, target_id, references)
+    with profiling.stage(profiling.STAGE_HTML), llm_call_context(
+        project_id=outline_config.project_id, slide_id=target_id, stage="html"
+    ):
+        return await _request_html_async(html_prompt, llm_config=llm_config, on_partial=on_partial)
 
 
 if __name__ == "__main__":
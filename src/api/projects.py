@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Query
+from fastapi import APIRouter, HTTPException, Query
 from typing import Any
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
@@ -18,19 +18,29 @@ from config.base_config import (
     get_runtime_overrides,
     update_runtime_overrides,
 )
-from src.utils import settings_tester
+from src.utils import (
+    outline_cache,
+    profiling,
+    retry_policy,
+    settings_tester,
+    single_flight,
+    task_pool,
+)
+from src.services.chat import (
+    completion_cache,
+    hedging,
+    http_client,
+    load_balancer,
+    rate_limiter,
+)
 from src.utils.help_utils import time_name
 from src.models.project_model import Project, ProjectIn
 from src.models.outline_model import Outline
-from src.repository import project_repo, outline_repo
+from src.repository import job_repo, llm_call_repo, project_repo, outline_repo
 from src.repository.transaction_manager import delete_project_with_related
-from src.agents.create_project import (
-    create_project_execute,
-    restart_project_execute,
-    restart_slide_execute,
-)
 from src.models.project_model import Status
-from src.html_convert_office.html2office import html2office
+from src.html_convert_office import pdf_cache
+from src.jobs import job_queue, worker as job_worker
 
 router = APIRouter()
 
@@ -45,6 +55,10 @@ class ConfigUpdateRequest(BaseModel):
     updates: dict[str, Any]
 
 
+class RestartSlidesRequest(BaseModel):
+    slide_ids: list[str]
+
+
 PROJECTS_ROOT = Path(__file__).resolve().parent.parent.parent / "data" / "projects"
 
 
@@ -137,9 +151,17 @@ def list_project_files(project: str = Query(..., min_length=1)):
     return files
 
 
+def _enqueue_job(kind: str, project_id: str, payload: dict | None = None) -> int:
+    """写入持久化任务，由 worker 认领执行；写入失败时返回 500"""
+    job_id = job_queue.enqueue(kind, project_id, payload)
+    if job_id is None:
+        raise HTTPException(status_code=500, detail="任务入队失败")
+    return job_id
+
+
 # 创建新项目
 @router.post("/api/projects")
-def add_project(req: ProjectIn, background_tasks: BackgroundTasks):
+def add_project(req: ProjectIn):
     project_id = str(uuid.uuid4())
     now_time = datetime.now()
     project_name = req.topic.replace(" ", "_")[:30] + "_" + time_name()
@@ -179,12 +201,15 @@ def add_project(req: ProjectIn, background_tasks: BackgroundTasks):
     ok = project_repo.db_add_project(project=project)
     if ok:
         logger.info(f"项目 {pid} 写入数据库成功")
-        background_tasks.add_task(create_project_execute, outline_config)
+        job_id = _enqueue_job(
+            job_queue.KIND_CREATE_PROJECT, pid, outline_config.model_dump()
+        )
         return {
             "project_id": pid,
             "project_name": pname,
             "status": Status.pending,
             "enable_img_search": enable_img_search,
+            "job_id": job_id,
         }
     raise HTTPException(status_code=500, detail="创建项目失败")
 
@@ -192,6 +217,10 @@ def add_project(req: ProjectIn, background_tasks: BackgroundTasks):
 # 删除某个项目
 @router.delete("/api/projects/{project_id}")
 def delete_project(project_id: str):
+    # 先停止正在执行的生成和导出并等待其退出，避免删除后任务继续写入文件和数据库
+    stopped = job_queue.cancel_project(project_id, "项目已删除", update_status=False, wait=True)
+    if not stopped["stopped"]:
+        raise HTTPException(status_code=409, detail="项目的任务仍在停止中，请稍后重试")
     ok = delete_project_with_related(project_id)
     if not ok:
         raise HTTPException(status_code=404, detail="项目不存在或删除失败")
@@ -230,6 +259,7 @@ def get_config_items():
             "group": item.get("group") or "未分组",
             "description": item.get("description", ""),
             "placeholder": item.get("placeholder", ""),
+            "clearable": bool(item.get("clearable")),
         }
         for item in CONFIG_ITEMS
     ]
@@ -255,7 +285,9 @@ def update_config_items(payload: ConfigUpdateRequest):
             except (TypeError, ValueError):
                 errors.append(f"{item.get('label', key)} 必须为整数")
         else:
-            if value is None or value == "":
+            if value is None:
+                continue
+            if value == "" and not item.get("clearable"):
                 continue
             sanitized_updates[key] = str(value)
 
@@ -275,6 +307,7 @@ def update_config_items(payload: ConfigUpdateRequest):
                     "group": item.get("group") or "未分组",
                     "description": item.get("description", ""),
                     "placeholder": item.get("placeholder", ""),
+                    "clearable": bool(item.get("clearable")),
                 }
                 for item in CONFIG_ITEMS
             ],
@@ -293,6 +326,7 @@ def update_config_items(payload: ConfigUpdateRequest):
                 "group": item.get("group") or "未分组",
                 "description": item.get("description", ""),
                 "placeholder": item.get("placeholder", ""),
+                "clearable": bool(item.get("clearable")),
             }
             for item in CONFIG_ITEMS
         ],
@@ -316,6 +350,26 @@ def run_config_test(test_key: str):
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
+@router.get("/api/stats")
+def get_runtime_stats():
+    """运行时统计信息（连接池复用情况、限流排队情况、缓存命中情况、熔断状态、各端点负载、请求合并次数、各阶段耗时、任务队列等）"""
+    return {
+        "llm_http_pools": http_client.get_pool_stats(),
+        "llm_rate_limiters": rate_limiter.get_limiter_stats(),
+        "llm_cache": completion_cache.get_cache_stats(),
+        "circuit_breakers": retry_policy.get_breaker_stats(),
+        "html_hedging": hedging.get_hedge_stats(),
+        "llm_endpoints": load_balancer.get_endpoint_stats(),
+        "single_flight": single_flight.get_single_flight_stats(),
+        "stage_timings": profiling.get_stage_stats(),
+        "outline_render": outline_cache.get_outline_cache_stats(),
+        "pdf_eager_render": pdf_cache.get_eager_render_stats(),
+        "jobs": job_repo.db_count_jobs(),
+        "job_worker": job_worker.get_worker_stats(),
+        "task_pool": task_pool.get_pool_stats(),
+    }
+
+
 @router.get("/api/projects/{project_id}/status")
 def get_project_status(project_id: str):
     project_status = project_repo.db_get_project_status(project_id)
@@ -353,6 +407,7 @@ def get_project_detail(project_id: str):
         },
         "slide_stats": {**slide_stats, "percentage": percentage},
         "outline_ready": outline is not None,
+        "llm_usage": llm_call_repo.db_get_llm_usage(project_id),
     }
 
     if outline:
@@ -421,21 +476,70 @@ def get_project_slide_detail(project_id: str, slide_id: str):
 
 
 @router.post("/api/projects/{project_id}/restart")
-def restart_project(project_id: str, background_tasks: BackgroundTasks):
+def restart_project(project_id: str, resume: bool = False):
+    """resume=true 时复用已有大纲、布局和已完成的页面，只重新生成未完成的页面"""
     project = project_repo.db_get_project(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="项目不存在")
 
+    # 取消上一次仍在执行的生成并等待其退出，避免旧任务的清理覆盖新任务写入的文件
+    stopped = job_queue.cancel_project(project_id, "项目重新生成", update_status=False, wait=True)
+    if not stopped["stopped"]:
+        raise HTTPException(status_code=409, detail="项目的任务仍在停止中，请稍后重试")
     ok = project_repo.db_update_project(project_id, Status.generating)
     if not ok:
         raise HTTPException(status_code=500, detail="无法更新项目状态")
 
-    background_tasks.add_task(restart_project_execute, project_id)
-    return {"project_id": project_id, "status": Status.generating}
+    job_id = _enqueue_job(
+        job_queue.KIND_RESTART_PROJECT, project_id, {"resume": True} if resume else None
+    )
+    return {"project_id": project_id, "status": Status.generating, "job_id": job_id}
+
+
+@router.post("/api/projects/{project_id}/cancel")
+def cancel_project(project_id: str):
+    """取消项目排队中和执行中的生成、导出任务，已生成的页面保留，可以通过 restart?resume=true 续传"""
+    project = project_repo.db_get_project(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="项目不存在")
+
+    result = job_queue.cancel_project(project_id, "用户取消")
+    return {"project_id": project_id, **result}
+
+
+@router.post("/api/projects/{project_id}/slides/restart")
+def restart_slides(project_id: str, req: RestartSlidesRequest):
+    """批量重新生成多页幻灯片，所有页面在同一个任务中按依赖关系调度，结果在一个事务中写入"""
+    slide_ids = list(dict.fromkeys(req.slide_ids))
+    if not slide_ids:
+        raise HTTPException(status_code=400, detail="slide_ids 不能为空")
+    existing = {slide.slide_id for slide in outline_repo.db_list_outline_slides(project_id)}
+    missing = [slide_id for slide_id in slide_ids if slide_id not in existing]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"未找到指定幻灯片: {missing}")
+
+    ok_slides = outline_repo.db_update_outline_slides(
+        project_id, {slide_id: {"new_status": Status.generating} for slide_id in slide_ids}
+    )
+    if not ok_slides:
+        raise HTTPException(status_code=500, detail="无法更新幻灯片状态")
+
+    ok_project = project_repo.db_update_project(project_id, Status.generating)
+    if not ok_project:
+        raise HTTPException(status_code=500, detail="无法更新项目状态")
+    job_id = _enqueue_job(
+        job_queue.KIND_RESTART_SLIDES, project_id, {"slide_ids": slide_ids}
+    )
+    return {
+        "project_id": project_id,
+        "slide_ids": slide_ids,
+        "status": Status.generating,
+        "job_id": job_id,
+    }
 
 
 @router.post("/api/projects/{project_id}/slides/{slide_id}/restart")
-def restart_slide(project_id: str, slide_id: str, background_tasks: BackgroundTasks):
+def restart_slide(project_id: str, slide_id: str):
     slide = outline_repo.db_get_outline_slide(project_id, slide_id)
     if not slide:
         raise HTTPException(status_code=404, detail="未找到指定幻灯片")
@@ -449,16 +553,19 @@ def restart_slide(project_id: str, slide_id: str, background_tasks: BackgroundTa
     ok_project = project_repo.db_update_project(project_id, Status.generating)
     if not ok_project:
         raise HTTPException(status_code=500, detail="无法更新项目状态")
-    background_tasks.add_task(restart_slide_execute, project_id, slide_id)
+    job_id = _enqueue_job(
+        job_queue.KIND_RESTART_SLIDE, project_id, {"slide_id": slide_id}
+    )
     return {
         "project_id": project_id,
         "slide_id": slide_id,
         "status": Status.generating,
+        "job_id": job_id,
     }
 
 
 @router.get("/api/projects/{project_id}/export/pdf")
-def export_project_to_pdf(project_id: str, background_tasks: BackgroundTasks):
+def export_project_to_pdf(project_id: str):
     project = project_repo.db_get_project(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="项目不存在")
@@ -474,16 +581,14 @@ def export_project_to_pdf(project_id: str, background_tasks: BackgroundTasks):
         return {"project_id": project_id, "status": Status.generating}
 
     logger.info(f"开始导出项目 {project_id} 到 PDF")
-    background_tasks.add_task(
-        html2office, project_id=project_id, to_pdf=True, to_pptx=False
+    job_id = _enqueue_job(
+        job_queue.KIND_EXPORT, project_id, {"to_pdf": True, "to_pptx": False}
     )
-    return {"project_id": project_id, "status": Status.generating}
+    return {"project_id": project_id, "status": Status.generating, "job_id": job_id}
 
 
 @router.get("/api/projects/{project_id}/export/pptx")
-def export_project_to_pptx(
-    project_id: str, background_tasks: BackgroundTasks, force: bool = False
-):
+def export_project_to_pptx(project_id: str, force: bool = False):
     project = project_repo.db_get_project(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="项目不存在")
@@ -532,7 +637,7 @@ def export_project_to_pptx(
         if not started:
             return {"project_id": project_id, "status": Status.generating}
         logger.info(f"开始强制导出项目 {project_id} 到 PPTX（将同时重新生成 PDF）")
-    background_tasks.add_task(
-        html2office, project_id=project_id, to_pdf=True, to_pptx=True
+    job_id = _enqueue_job(
+        job_queue.KIND_EXPORT, project_id, {"to_pdf": True, "to_pptx": True}
     )
-    return {"project_id": project_id, "status": Status.generating}
+    return {"project_id": project_id, "status": Status.generating, "job_id": job_id}
@@ -2,6 +2,7 @@ import sys
 from pathlib import Path
 import asyncio
 import shutil
+import time
 import traceback
 import multiprocessing
 
@@ -14,7 +15,9 @@ from config.logging_config import logger
 import config.base_config as base_config
 from html_convert_office.html2pdf import generate_multiple_pdfs, merge_pdfs
 from html_convert_office.pdf2pptx import convert_pdf_to_pptx
+from src.html_convert_office import pdf_cache
 from src.repository import project_repo
+from src.utils import cancellation, profiling
 from src.models.project_model import Status
 
 
@@ -56,27 +59,51 @@ def html2office(
         logger.info(f"HTML文件列表: {html_file_names}")
         logger.info(f"PDF文件列表: {pdf_file_names}")
 
-        pdf_conversion_tasks = [
-            (str(html_files_dir_path / html_file), str(temp_pdf_path / pdf_file))
-            for html_file, pdf_file in zip(html_file_names, pdf_file_names)
-        ]
+        # 内容未变的页面直接使用单页 PDF 缓存（PDF_EAGER_RENDER），其余页面重新渲染
+        pages = []
+        pdf_conversion_tasks = []
+        for html_file, pdf_file in zip(html_file_names, pdf_file_names):
+            slide_id = html_file.rsplit(".", maxsplit=1)[0]
+            html_content = (html_files_dir_path / html_file).read_text(encoding="utf-8")
+            cached = pdf_cache.lookup(project_base_path, slide_id, html_content)
+            pages.append([slide_id, html_content, cached or temp_pdf_path / pdf_file, cached is None])
+            if cached is None:
+                pdf_conversion_tasks.append(
+                    (str(html_files_dir_path / html_file), str(temp_pdf_path / pdf_file))
+                )
+        logger.info(
+            f"单页 PDF 缓存命中 {len(pages) - len(pdf_conversion_tasks)} 页，需要渲染 {len(pdf_conversion_tasks)} 页"
+        )
 
         effective_limit = max_concurrent_tasks or base_config.HTML2OFFICE_MAX_CONCURRENT_TASKS
 
         if to_pdf or to_pptx:
             if not merged_pdf_path.exists():
-                ok = asyncio.run(
-                    generate_multiple_pdfs(
-                        pdf_conversion_tasks,
-                        max_concurrent_tasks=effective_limit,
-                        timeout=timeout,
-                    )
-                )
+                cancellation.check()
+                with profiling.stage(profiling.STAGE_PDF):
+                    ok = True
+                    if pdf_conversion_tasks:
+                        # 任务被取消时立即中止渲染
+                        ok = asyncio.run(
+                            cancellation.cancellable(
+                                generate_multiple_pdfs(
+                                    pdf_conversion_tasks,
+                                    max_concurrent_tasks=effective_limit,
+                                    timeout=timeout,
+                                )
+                            )
+                        )
+                    cancellation.check()
+                    if ok:
+                        if pdf_cache.is_enabled():
+                            for page in pages:
+                                slide_id, html_content, rendered_path, rendered = page
+                                if rendered and rendered_path.exists():
+                                    page[2] = pdf_cache.store(
+                                        project_base_path, slide_id, html_content, rendered_path
+                                    ) or rendered_path
+                        merge_pdfs([str(page[2]) for page in pages], str(merged_pdf_path))
                 if ok:
-                    merge_pdfs(
-                        [str(temp_pdf_path / pdf_file) for pdf_file in pdf_file_names],
-                        str(merged_pdf_path),
-                    )
                     project_repo.db_update_project(
                         project_id, new_pdf_status=Status.completed
                     )
@@ -97,6 +124,7 @@ def html2office(
         
         # ==================== to_pptx 逻辑块修改 ====================
         if to_pptx:
+            cancellation.check()
             if not merged_pdf_path.exists():
                 logger.error(f"无法进行PPTX转换，因为依赖的PDF文件不存在: {merged_pdf_path}")
                 project_repo.db_update_project(project_id, new_pptx_status=Status.failed)
@@ -109,9 +137,24 @@ def html2office(
                 args=(str(merged_pdf_path), str(output_pptx_path)),
                 name=f"PPTX-Converter-{project_id[:8]}"
             )
-            conversion_process.start()
             TIMEOUT_SECONDS = 300
-            conversion_process.join(timeout=TIMEOUT_SECONDS)
+            with profiling.stage(profiling.STAGE_PPTX):
+                conversion_process.start()
+                # 分段等待，以便任务被取消时及时终止子进程
+                deadline = time.monotonic() + TIMEOUT_SECONDS
+                token = cancellation.current_token()
+                while conversion_process.is_alive() and time.monotonic() < deadline:
+                    if token is not None and token.cancelled:
+                        break
+                    conversion_process.join(timeout=0.5)
+
+            if conversion_process.is_alive() and token is not None and token.cancelled:
+                conversion_process.terminate()
+                conversion_process.join(5)
+                if conversion_process.is_alive():
+                    conversion_process.kill()
+                output_pptx_path.unlink(missing_ok=True)
+                token.raise_if_cancelled()
 
             if conversion_process.is_alive():
                 logger.warning(f"子进程 {conversion_process.name} 超时({TIMEOUT_SECONDS}秒)，正在强制终止...")
@@ -146,6 +189,10 @@ def html2office(
                         project_id, new_pptx_status=Status.failed
                     )
 
+    except cancellation.GenerationCancelled as e:
+        # 导出状态由发起取消的一方处理
+        logger.info(f"项目 {project_id} 的导出已取消: {e}")
+        raise
     except Exception as e:
         if to_pptx:
             project_repo.db_update_project(project_id, new_pptx_status=Status.failed)
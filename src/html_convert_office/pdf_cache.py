@@ -0,0 +1,158 @@
+"""
+单页 PDF 的持久化缓存与提前渲染（PDF_EAGER_RENDER）
+
+开启后每页幻灯片生成完成时就在后台渲染该页的 PDF，保存到项目目录下的 pdf_cache/，
+文件名包含 HTML 内容的哈希，页面重新生成后旧的 PDF 不会再被使用。
+导出时内容未变的页面直接复用缓存，只渲染缺失的页面，全部命中时导出只需要合并 PDF。
+
+后台渲染在独立线程的事件循环中进行，复用同一个浏览器实例，并发数与 HTML2OFFICE_MAX_CONCURRENT_TASKS 一致；
+渲染失败只记录日志，导出时会重新渲染该页。
+"""
+
+import asyncio
+import hashlib
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Optional
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import config.base_config as base_config
+from config.logging_config import logger
+
+CACHE_DIR_NAME = "pdf_cache"
+RENDER_TIMEOUT = 60
+
+
+def is_enabled() -> bool:
+    return bool(base_config.PDF_EAGER_RENDER)
+
+
+def html_digest(html_content: str) -> str:
+    return hashlib.sha256(html_content.encode("utf-8")).hexdigest()[:16]
+
+
+def cache_dir(project_dir: Path) -> Path:
+    return project_dir / CACHE_DIR_NAME
+
+
+def cached_pdf_path(project_dir: Path, slide_id: str, html_content: str) -> Path:
+    """该页当前 HTML 对应的缓存 PDF 路径（不保证文件存在）"""
+    return cache_dir(project_dir) / f"{slide_id}.{html_digest(html_content)}.pdf"
+
+
+def lookup(project_dir: Path, slide_id: str, html_content: str) -> Optional[Path]:
+    """HTML 内容对应的缓存 PDF 存在时返回其路径"""
+    path = cached_pdf_path(project_dir, slide_id, html_content)
+    return path if path.is_file() and path.stat().st_size > 0 else None
+
+
+def store(project_dir: Path, slide_id: str, html_content: str, rendered_pdf: Path) -> Optional[Path]:
+    """把导出时渲染好的 PDF 移入缓存，并删除该页旧版本的缓存"""
+    target = cached_pdf_path(project_dir, slide_id, html_content)
+    try:
+        target.parent.mkdir(exist_ok=True)
+        os.replace(rendered_pdf, target)
+    except OSError as e:
+        logger.warning(f"写入幻灯片 {slide_id} 的 PDF 缓存失败: {e}")
+        return None
+    _remove_stale(target)
+    return target
+
+
+def _remove_stale(current: Path) -> None:
+    slide_id = current.name.rsplit(".", 2)[0]
+    for path in current.parent.glob(f"{slide_id}.*.pdf"):
+        if path != current and path.name.rsplit(".", 2)[0] == slide_id:
+            try:
+                path.unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning(f"删除过期的 PDF 缓存 {path} 失败: {e}")
+
+
+class _EagerRenderer:
+    """后台渲染线程：持有一个事件循环和一个浏览器实例，按提交顺序渲染页面"""
+
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+        self._browser = None
+        self._playwright = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._browser_lock: Optional[asyncio.Lock] = None
+        self.rendered = 0
+        self.failed = 0
+        threading.Thread(target=self._run, name="ezppt-pdf-eager", daemon=True).start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._semaphore = asyncio.Semaphore(max(int(base_config.HTML2OFFICE_MAX_CONCURRENT_TASKS), 1))
+        self._browser_lock = asyncio.Lock()
+        self._loop.run_forever()
+
+    def submit(self, html_path: Path, project_dir: Path, slide_id: str) -> None:
+        asyncio.run_coroutine_threadsafe(self._render(html_path, project_dir, slide_id), self._loop)
+
+    async def _get_browser(self):
+        async with self._browser_lock:
+            if self._browser is None or not self._browser.is_connected():
+                from playwright.async_api import async_playwright
+
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch()
+            return self._browser
+
+    async def _render(self, html_path: Path, project_dir: Path, slide_id: str) -> None:
+        from src.html_convert_office.html2pdf import create_pdf_from_html
+
+        partial: Optional[Path] = None
+        async with self._semaphore:
+            try:
+                html_content = html_path.read_text(encoding="utf-8")
+                target = cached_pdf_path(project_dir, slide_id, html_content)
+                if target.is_file():
+                    return
+                target.parent.mkdir(exist_ok=True)
+                partial = target.with_suffix(".part")
+                browser = await self._get_browser()
+                await asyncio.wait_for(
+                    create_pdf_from_html(browser, str(html_path), str(partial), timeout=RENDER_TIMEOUT),
+                    timeout=RENDER_TIMEOUT,
+                )
+                # 渲染期间页面被重新生成时丢弃结果，由新内容的渲染任务写入
+                if html_path.read_text(encoding="utf-8") != html_content:
+                    partial.unlink(missing_ok=True)
+                    return
+                os.replace(partial, target)
+                _remove_stale(target)
+                self.rendered += 1
+            except Exception as e:  # pylint: disable=broad-except
+                if partial is not None:
+                    partial.unlink(missing_ok=True)
+                self.failed += 1
+                logger.warning(f"提前渲染幻灯片 {slide_id} 的 PDF 失败，导出时将重新渲染: {type(e).__name__} - {e}")
+
+    def stats(self) -> dict:
+        return {"rendered": self.rendered, "failed": self.failed}
+
+
+_renderer: Optional[_EagerRenderer] = None
+_renderer_lock = threading.Lock()
+
+
+def schedule_render(html_save_dir: Path, slide_id: str) -> None:
+    """开启 PDF_EAGER_RENDER 时在后台渲染刚生成完成的页面，立即返回"""
+    global _renderer
+    if not is_enabled():
+        return
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = _EagerRenderer()
+    _renderer.submit(html_save_dir / f"{slide_id}.html", html_save_dir.parent, slide_id)
+
+
+def get_eager_render_stats() -> dict:
+    return {"enabled": is_enabled(), **(_renderer.stats() if _renderer is not None else {})}
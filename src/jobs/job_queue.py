@@ -0,0 +1,224 @@
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import config.base_config as base_config
+from config.logging_config import logger
+from src.agents.create_project import restart_slide_execute, restart_slides_execute
+from src.agents.create_project_async import (
+    run_create_project,
+    run_restart_project,
+    run_resume_project,
+)
+from src.html_convert_office.html2office import html2office
+from src.models.job_model import Job
+from src.models.outline_model import Outline
+from src.models.project_model import Status
+from src.repository import job_repo, outline_repo, project_repo
+from src.utils import cancellation, task_pool
+
+KIND_CREATE_PROJECT = "create_project"
+KIND_RESTART_PROJECT = "restart_project"
+KIND_RESTART_SLIDE = "restart_slide"
+KIND_RESTART_SLIDES = "restart_slides"
+KIND_EXPORT = "export"
+
+# 单页重新生成和导出是用户在等待的操作，优先于整份演示文稿的生成
+DEFAULT_PRIORITIES = {
+    KIND_RESTART_SLIDE: 20,
+    KIND_RESTART_SLIDES: 20,
+    KIND_EXPORT: 10,
+    KIND_CREATE_PROJECT: 0,
+    KIND_RESTART_PROJECT: 0,
+}
+
+# 单页（及批量）重新生成耗时短且有用户在等待，worker 的并发名额占满时仍可额外认领
+INTERACTIVE_KINDS = (KIND_RESTART_SLIDE, KIND_RESTART_SLIDES)
+
+# 等待其他 worker 进程中被取消的任务退出时的轮询间隔
+STOP_POLL_INTERVAL = 0.5
+
+# 有新任务入队时唤醒本进程内的 worker，其他进程的 worker 依靠轮询发现
+job_available = threading.Event()
+
+
+def enqueue(
+    kind: str, project_id: str, payload: Optional[dict] = None, priority: Optional[int] = None
+) -> Optional[int]:
+    """新增一个持久化任务，返回任务 ID，写入数据库失败时返回 None"""
+    job = Job(
+        kind=kind,
+        project_id=project_id,
+        payload=payload or {},
+        priority=DEFAULT_PRIORITIES.get(kind, 0) if priority is None else priority,
+        max_attempts=max(int(base_config.JOB_MAX_ATTEMPTS), 1),
+    )
+    job_id = job_repo.db_add_job(job)
+    if job_id is not None:
+        job_available.set()
+    return job_id
+
+
+def _priority_class(job: Job) -> str:
+    """幻灯片任务在全局任务池中的优先级，默认为 deck，启动时自动续传等批量任务为 bulk"""
+    return task_pool.normalize_priority(job.payload.get("priority_class"))
+
+
+def _run_create_project(job: Job) -> None:
+    # 上一次尝试已经写入了大纲时，从中断处续传
+    if job.attempts > 1 and outline_repo.db_get_outline(job.project_id) is not None:
+        logger.info(f"项目 {job.project_id} 第 {job.attempts} 次尝试，续传未完成的页面")
+        run_resume_project(job.project_id, _priority_class(job))
+        return
+    payload = {key: value for key, value in job.payload.items() if key != "priority_class"}
+    run_create_project(Outline(**payload), _priority_class(job))
+
+
+def _run_restart_project(job: Job) -> None:
+    project_repo.db_update_project(job.project_id, Status.generating)
+    if job.payload.get("resume"):
+        run_resume_project(job.project_id, _priority_class(job))
+    else:
+        run_restart_project(job.project_id, _priority_class(job))
+
+
+def _run_restart_slide(job: Job) -> None:
+    restart_slide_execute(job.project_id, job.payload["slide_id"])
+
+
+def _run_restart_slides(job: Job) -> None:
+    restart_slides_execute(job.project_id, job.payload["slide_ids"])
+
+
+def _run_export(job: Job) -> None:
+    html2office(
+        project_id=job.project_id,
+        to_pdf=job.payload.get("to_pdf", True),
+        to_pptx=job.payload.get("to_pptx", False),
+    )
+
+
+HANDLERS: Dict[str, Callable[[Job], None]] = {
+    KIND_CREATE_PROJECT: _run_create_project,
+    KIND_RESTART_PROJECT: _run_restart_project,
+    KIND_RESTART_SLIDE: _run_restart_slide,
+    KIND_RESTART_SLIDES: _run_restart_slides,
+    KIND_EXPORT: _run_export,
+}
+
+
+def run_job(job: Job) -> None:
+    handler = HANDLERS.get(job.kind)
+    if handler is None:
+        raise ValueError(f"未知的任务类型: {job.kind}")
+    handler(job)
+
+
+def on_job_failed(job: Job) -> None:
+    """任务最终失败（不再重试）时，把对应的项目 / 幻灯片 / 导出状态标记为失败，避免一直停留在生成中"""
+    if job.kind in (KIND_CREATE_PROJECT, KIND_RESTART_PROJECT):
+        project_repo.db_update_project(job.project_id, new_status=Status.failed)
+    elif job.kind == KIND_RESTART_SLIDE:
+        outline_repo.db_update_outline_slide(
+            project_id=job.project_id,
+            slide_id=job.payload.get("slide_id", ""),
+            new_status=Status.failed,
+        )
+    elif job.kind == KIND_RESTART_SLIDES:
+        # 逐页更新，某一页已不存在时不影响其他页面
+        for slide_id in job.payload.get("slide_ids", []):
+            outline_repo.db_update_outline_slide(
+                project_id=job.project_id, slide_id=slide_id, new_status=Status.failed
+            )
+    elif job.kind == KIND_EXPORT:
+        project_repo.db_update_project(
+            job.project_id,
+            new_pdf_status=Status.failed,
+            new_pptx_status=Status.failed if job.payload.get("to_pptx") else "",
+        )
+
+
+def cancel_project(
+    project_id: str, reason: str = "", update_status: bool = True, wait: bool = False
+) -> dict:
+    """
+    取消项目所有排队中和执行中的任务：本进程内的任务立即在下一个检查点停止，
+    其他 worker 进程中的任务在下一次续租失败时停止。
+    update_status 为 True 时把停留在生成中的项目、导出和幻灯片状态改为失败，
+    正在重新生成且已有旧内容的幻灯片恢复为已完成。
+    取消是协作式的，wait 为 True 时等待任务真正退出（见 wait_for_stopped），结果中的 stopped 表示是否已全部退出
+    """
+    in_process = cancellation.cancel_project(project_id, reason)
+    cancelled_jobs = job_repo.db_cancel_jobs(project_id)
+    result = {"cancelled_jobs": cancelled_jobs, "cancelled_in_process": in_process}
+    if wait:
+        result["stopped"] = wait_for_stopped(project_id)
+    if update_status:
+        _mark_cancelled(project_id)
+    return result
+
+
+def wait_for_stopped(project_id: str, timeout: Optional[float] = None) -> bool:
+    """
+    等待项目被取消的任务退出：本进程内的任务等待其取消作用域结束（包括恢复文件等清理），
+    其他 worker 进程中的任务等待其释放租约或租约过期。timeout 默认为 JOB_LEASE_SECONDS，超时返回 False
+    """
+    if timeout is None:
+        timeout = max(int(base_config.JOB_LEASE_SECONDS), 10)
+    deadline = time.monotonic() + timeout
+    if not cancellation.wait_for_project(project_id, timeout):
+        return False
+    while job_repo.db_count_stopping_jobs(project_id):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(STOP_POLL_INTERVAL)
+    return True
+
+
+def _mark_cancelled(project_id: str) -> None:
+    project = project_repo.db_get_project(project_id)
+    if project is None:
+        return
+    project_repo.db_update_project(
+        project_id,
+        new_status=Status.failed if project.status in (Status.pending, Status.generating) else "",
+        new_pdf_status=Status.failed if project.pdf_status == Status.generating else "",
+        new_pptx_status=Status.failed if project.pptx_status == Status.generating else "",
+    )
+    for slide in outline_repo.db_list_outline_slides(project_id):
+        if slide.status != Status.generating:
+            continue
+        outline_repo.db_update_outline_slide(
+            project_id=project_id,
+            slide_id=slide.slide_id,
+            new_status=Status.completed if slide.html_content else Status.failed,
+        )
+
+
+def requeue_expired_jobs() -> None:
+    """将租约过期的任务重新排队，已达到最大尝试次数的任务标记为失败"""
+    for job in job_repo.db_requeue_expired_jobs():
+        on_job_failed(job)
+
+
+def resume_interrupted_projects() -> list[str]:
+    """
+    为停留在生成中、但没有排队中或执行中任务的项目创建续传任务（例如任务已失败或由旧版本创建），
+    执行中的任务由租约过期机制接管。返回创建了续传任务的项目 ID
+    """
+    active = job_repo.db_active_project_ids()
+    resumed = []
+    for project in project_repo.db_list_projects():
+        if project.status != Status.generating or project.project_id in active:
+            continue
+        payload = {"resume": True, "priority_class": task_pool.PRIORITY_BULK}
+        if enqueue(KIND_RESTART_PROJECT, project.project_id, payload) is not None:
+            resumed.append(project.project_id)
+    if resumed:
+        logger.info(f"已为 {len(resumed)} 个中断的项目创建续传任务: {resumed}")
+    return resumed
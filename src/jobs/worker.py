@@ -0,0 +1,230 @@
+"""
+持久化任务的 worker：从数据库认领任务并执行，执行期间定期续租，失败后按退避时间重试
+
+Web 服务默认在进程内启动一个 worker（JOB_WORKER_IN_PROCESS=1），也可以单独启动多个 worker 进程:
+    python -m src.jobs.worker --concurrency 2
+"""
+
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+import traceback
+import uuid
+from pathlib import Path
+from typing import Optional
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import config.base_config as base_config
+from config.logging_config import logger
+from src.jobs import job_queue
+from src.models.job_model import Job, JobStatus
+from src.repository import job_repo
+from src.repository.db_utils import init_db
+from src.utils import cancellation
+
+POLL_INTERVAL = 1.0
+MAX_RETRY_DELAY = 300
+
+
+def _retry_delay(attempts: int) -> float:
+    return min(5 * 2 ** max(attempts - 1, 0), MAX_RETRY_DELAY)
+
+
+class JobWorker:
+    """
+    同时执行最多 concurrency 个任务；名额占满时还可以再认领 concurrency 个单页重新生成任务，
+    避免用户等待的操作排在整份演示文稿之后（实际的 LLM 并发由全局任务池限制）。
+    每隔一段时间将租约过期的任务重新排队，因此任意一个存活的 worker 都能接管崩溃 worker 留下的任务
+    """
+
+    def __init__(self, concurrency: int, worker_id: Optional[str] = None):
+        self.concurrency = max(int(concurrency), 1)
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._slots = threading.Semaphore(self.concurrency)
+        self._interactive_slots = threading.Semaphore(self.concurrency)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._running = 0
+        self._executed = 0
+        self._lock = threading.Lock()
+
+    @property
+    def lease_seconds(self) -> int:
+        return max(int(base_config.JOB_LEASE_SECONDS), 10)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.run_forever, name="ezppt-job-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """停止认领新任务；正在执行的任务不会被中断，进程退出后由租约过期机制重新排队"""
+        self._stop.set()
+        job_queue.job_available.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run_forever(self) -> None:
+        logger.info(f"任务 worker {self.worker_id} 已启动，并发数 {self.concurrency}")
+        next_requeue = 0.0
+        while not self._stop.is_set():
+            if time.monotonic() >= next_requeue:
+                job_queue.requeue_expired_jobs()
+                next_requeue = time.monotonic() + self.lease_seconds / 2
+            slots, kinds = self._slots, None
+            if not slots.acquire(blocking=False):
+                slots, kinds = self._interactive_slots, job_queue.INTERACTIVE_KINDS
+                if not slots.acquire(blocking=False):
+                    job_queue.job_available.clear()
+                    job_queue.job_available.wait(POLL_INTERVAL)
+                    continue
+            job = None
+            try:
+                job_queue.job_available.clear()
+                job = job_repo.db_claim_job(self.worker_id, self.lease_seconds, kinds)
+            finally:
+                if job is None:
+                    slots.release()
+            if job is None:
+                job_queue.job_available.wait(POLL_INTERVAL)
+                continue
+            threading.Thread(
+                target=self._execute, args=(job, slots), name=f"ezppt-job-{job.id}", daemon=True
+            ).start()
+        logger.info(f"任务 worker {self.worker_id} 已停止认领新任务")
+
+    def _heartbeat(
+        self,
+        job: Job,
+        done: threading.Event,
+        token: cancellation.CancellationToken,
+        expired: threading.Event,
+    ) -> None:
+        """
+        租约丢失说明任务已被取消或被其他 worker 接管，此时取消本地执行；
+        续租出错（例如数据库暂时被锁定）时只记录日志并在下一次重试，直到上一次成功续租的租约也已过期
+        """
+        renewed_at = time.monotonic()
+        while not done.wait(self.lease_seconds / 3):
+            renewed = job_repo.db_heartbeat_job(job.id, self.worker_id, self.lease_seconds)
+            if renewed:
+                renewed_at = time.monotonic()
+                continue
+            if renewed is None and time.monotonic() - renewed_at < self.lease_seconds:
+                logger.warning(f"任务 {job.id} 续租出错，将在下一次心跳时重试")
+                continue
+            if renewed is None:
+                # 任务没有被取消，停止后保持执行中，由租约过期机制重新排队
+                expired.set()
+            reason = "租约已丢失（已取消或被其他 worker 接管）" if renewed is False else "续租持续失败，租约已过期"
+            logger.warning(f"任务 {job.id} 的{reason}，停止执行")
+            token.cancel(f"任务 {job.id} 的{reason}")
+            return
+
+    def _execute(self, job: Job, slots: threading.Semaphore) -> None:
+        with self._lock:
+            self._running += 1
+        done = threading.Event()
+        expired = threading.Event()
+        logger.info(f"开始执行任务 {job.id}: {job.kind} (项目 {job.project_id}, 第 {job.attempts} 次尝试)")
+        try:
+            with cancellation.cancellation_scope(job.project_id) as token:
+                threading.Thread(
+                    target=self._heartbeat,
+                    args=(job, done, token, expired),
+                    name=f"ezppt-job-{job.id}-heartbeat",
+                    daemon=True,
+                ).start()
+                job_queue.run_job(job)
+        except cancellation.GenerationCancelled as e:
+            if expired.is_set():
+                logger.warning(f"任务 {job.id} 因租约过期停止执行，将由租约过期机制重新排队: {e}")
+            else:
+                job_repo.db_mark_job_cancelled(job.id, self.worker_id)
+                logger.info(f"任务 {job.id} 已取消: {e}")
+        except Exception as e:
+            logger.error(traceback.format_exc())
+            status = job_repo.db_fail_job(
+                job.id, self.worker_id, f"{type(e).__name__}: {e}", _retry_delay(job.attempts)
+            )
+            if status == JobStatus.failed:
+                logger.error(f"任务 {job.id} 已达到最大尝试次数，不再重试: {e}")
+                job_queue.on_job_failed(job)
+            else:
+                logger.warning(f"任务 {job.id} 执行失败，稍后重试: {e}")
+                job_queue.job_available.set()
+        else:
+            job_repo.db_complete_job(job.id, self.worker_id)
+            logger.info(f"任务 {job.id} 执行完成")
+        finally:
+            done.set()
+            job_repo.db_release_job_lease(job.id, self.worker_id)
+            with self._lock:
+                self._running -= 1
+                self._executed += 1
+            slots.release()
+            job_queue.job_available.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "worker_id": self.worker_id,
+                "concurrency": self.concurrency,
+                "running": self._running,
+                "executed": self._executed,
+            }
+
+
+_in_process_worker: Optional[JobWorker] = None
+
+
+def start_in_process_worker() -> Optional[JobWorker]:
+    """JOB_WORKER_IN_PROCESS 开启时在 Web 服务进程内启动 worker"""
+    global _in_process_worker
+    if not base_config.JOB_WORKER_IN_PROCESS:
+        logger.info("未启用进程内任务 worker，请使用 python -m src.jobs.worker 启动独立 worker")
+        return None
+    if _in_process_worker is None:
+        _in_process_worker = JobWorker(base_config.JOB_WORKER_CONCURRENCY)
+        _in_process_worker.start()
+    return _in_process_worker
+
+
+def stop_in_process_worker() -> None:
+    global _in_process_worker
+    if _in_process_worker is not None:
+        _in_process_worker.stop(timeout=5)
+        _in_process_worker = None
+
+
+def get_worker_stats() -> Optional[dict]:
+    return _in_process_worker.stats() if _in_process_worker is not None else None
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="EZPPT 持久化任务 worker")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=base_config.JOB_WORKER_CONCURRENCY,
+        help="同时执行的任务数，默认使用 JOB_WORKER_CONCURRENCY",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    init_db()
+    worker = JobWorker(args.concurrency)
+    try:
+        worker.run_forever()
+    except KeyboardInterrupt:
+        logger.info("收到中断信号，worker 退出，未完成的任务将在租约过期后重新排队")
+
+
+if __name__ == "__main__":
+    main()
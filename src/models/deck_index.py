@@ -0,0 +1,94 @@
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence
+
+
+@dataclass(frozen=True)
+class DeckSlide:
+    slide_id: str
+    chapter_id: str
+    chapter_index: int  # 所在章节在大纲中的位置
+    index_in_chapter: int  # 在章节内的位置
+    order: int  # 在整份演示文稿中的位置
+    data: Mapping  # 大纲中该页的原始数据（slide_topic、slide_content、visual_suggestion 等）
+    chapter: Mapping  # 所在章节的原始数据
+
+
+class DeckIndex:
+    """
+    大纲的幻灯片索引，每份大纲只构建一次：
+    按 slide_id 查找幻灯片、章节成员、页面顺序和同章节的前序页面都是 O(1)，
+    不再在每次查找时遍历 outline_json["chapters"][*]["slides"]。
+    slide_id 统一转换为字符串，重复的 slide_id 只保留第一次出现的页面
+    """
+
+    def __init__(self, outline_json: Mapping):
+        self.chapters: Sequence[Mapping] = outline_json.get("chapters") or ()
+        self._slides: Dict[str, DeckSlide] = {}
+        self._order: List[str] = []
+        # 按章节位置分组，章节 ID 重复时以第一个章节为准
+        self._chapter_slides: List[List[str]] = []
+        self._chapter_index_by_id: Dict[str, int] = {}
+        for chapter_index, chapter in enumerate(self.chapters):
+            chapter_id = str(chapter.get("chapter_id", ""))
+            self._chapter_index_by_id.setdefault(chapter_id, chapter_index)
+            slide_ids: List[str] = []
+            self._chapter_slides.append(slide_ids)
+            for slide in chapter.get("slides") or ():
+                slide_id = str(slide.get("slide_id", ""))
+                if not slide_id:
+                    continue
+                if slide_id in self._slides:
+                    continue
+                self._slides[slide_id] = DeckSlide(
+                    slide_id=slide_id,
+                    chapter_id=chapter_id,
+                    chapter_index=chapter_index,
+                    index_in_chapter=len(slide_ids),
+                    order=len(self._order),
+                    data=slide,
+                    chapter=chapter,
+                )
+                slide_ids.append(slide_id)
+                self._order.append(slide_id)
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __contains__(self, slide_id: object) -> bool:
+        return str(slide_id) in self._slides
+
+    def __iter__(self) -> Iterator[DeckSlide]:
+        return (self._slides[slide_id] for slide_id in self._order)
+
+    @property
+    def slide_ids(self) -> List[str]:
+        """按演示文稿顺序排列的全部 slide_id"""
+        return list(self._order)
+
+    def get(self, slide_id) -> Optional[DeckSlide]:
+        return self._slides.get(str(slide_id))
+
+    def chapter(self, chapter_id) -> Optional[Mapping]:
+        index = self._chapter_index_by_id.get(str(chapter_id))
+        return None if index is None else self.chapters[index]
+
+    def chapter_slide_ids(self, chapter_id) -> List[str]:
+        index = self._chapter_index_by_id.get(str(chapter_id))
+        return [] if index is None else list(self._chapter_slides[index])
+
+    def previous(self, slide_id, count: int = 1) -> List[str]:
+        """同一章节中紧邻在前的最多 count 页，按顺序排列"""
+        entry = self.get(slide_id)
+        if entry is None or count <= 0:
+            return []
+        siblings = self._chapter_slides[entry.chapter_index]
+        return siblings[max(entry.index_in_chapter - count, 0):entry.index_in_chapter]
+
+    def neighbours(self, slide_id) -> tuple[Optional[str], Optional[str]]:
+        """整份演示文稿中的上一页和下一页，不存在时为 None"""
+        entry = self.get(slide_id)
+        if entry is None:
+            return None, None
+        previous_id = self._order[entry.order - 1] if entry.order > 0 else None
+        next_id = self._order[entry.order + 1] if entry.order + 1 < len(self._order) else None
+        return previous_id, next_id
@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlmodel import JSON, Field, SQLModel
+
+
+class JobStatus:
+    queued = "queued"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+    cancelled = "cancelled"
+
+
+class Job(SQLModel, table=True):
+    """持久化的后台任务，由 worker 认领（租约）后执行，租约过期未续期的任务会重新排队"""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    kind: str  # "create_project", "restart_project", "restart_slide", "restart_slides", "export"
+    project_id: str = Field(index=True)
+    payload: dict = Field(default_factory=dict, sa_type=JSON)
+
+    # ===== 调度 =====
+    status: str = Field(default=JobStatus.queued, index=True)
+    priority: int = 0  # 越大越先执行
+    available_time: datetime = Field(default_factory=datetime.now)  # 重试退避期间不会被认领
+    attempts: int = 0
+    max_attempts: int = 3
+
+    # ===== 租约 =====
+    worker_id: str = ""
+    lease_until: Optional[datetime] = None
+    heartbeat_time: Optional[datetime] = None
+
+    error: str = ""
+    create_time: datetime = Field(default_factory=datetime.now)
+    start_time: Optional[datetime] = None
+    finish_time: Optional[datetime] = None
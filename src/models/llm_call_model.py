@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+
+
+class LLMCall(SQLModel, table=True):
+    """每次成功的 LLM 请求记录一行，用于按项目 / 幻灯片统计用量与耗时"""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    project_id: str = Field(index=True)
+    slide_id: str = ""  # 大纲、布局等项目级调用为空
+    stage: str = ""  # "outline", "layout", "pic", "html"
+    model: str = ""
+
+    # ===== 用量 =====
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+
+    # ===== 耗时（毫秒）=====
+    latency_ms: int = 0
+    ttfb_ms: int = 0
+    queue_ms: int = 0
+    retry_count: int = 0
+    # 1 表示复用了其他调用进行中的相同请求（single-flight 跟随者），用量与耗时记为 0，不计入平均耗时
+    coalesced: int = 0
+
+    create_time: datetime = Field(default_factory=datetime.now)
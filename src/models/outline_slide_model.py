@@ -33,5 +33,10 @@ class OutlineSlide(SQLModel, table=True):
         sa_type=JSON
     )
     
+    # ===== 模型用量（最近一次生成 HTML 的请求）=====
+    prompt_tokens: int = 0
+    cached_tokens: int = 0  # 命中服务商提示词缓存的 token 数
+    completion_tokens: int = 0
+
     # ===== 状态追踪 =====
     status: str = "pending"  # "pending", "generating", "completed", "failed"
\ No newline at end of file
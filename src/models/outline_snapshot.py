@@ -0,0 +1,63 @@
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
+
+from src.models.deck_index import DeckIndex
+from src.models.outline_model import Outline
+from src.utils import outline_cache
+
+
+def freeze(value: Any) -> Any:
+    """递归地把 dict 转换为只读的 MappingProxyType，list 转换为 tuple"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+_EMPTY: Mapping = MappingProxyType({})
+
+
+@dataclass(frozen=True)
+class OutlineSnapshot:
+    """
+    生成幻灯片时所有页面任务共享的只读大纲，每份演示文稿只创建一次，
+    页面任务之间不复制大纲、布局和视觉建议；每页自己的数据（配图）通过 with_slide_images 得到只包含该页图片的新快照，
+    其余字段仍与原快照共享。已生成页面的 HTML 由调度器以参考页的形式传入，不写回大纲。
+    deck 为大纲的幻灯片索引，outline_version 为大纲内容的哈希（用于缓存大纲文本），都随快照构建一次并在所有页面任务间共享
+    """
+
+    project_id: str
+    enable_img_search: bool = False
+    outline_json: Mapping = _EMPTY
+    outline_layout: Mapping = _EMPTY
+    global_visual_suggestion: Mapping = _EMPTY
+    images: Mapping = field(default=_EMPTY)
+    deck: Optional[DeckIndex] = field(default=None, compare=False, repr=False)
+    outline_version: str = field(default="", compare=False, repr=False)
+
+    def __post_init__(self):
+        if self.deck is None:
+            object.__setattr__(self, "deck", DeckIndex(self.outline_json))
+        if not self.outline_version:
+            object.__setattr__(self, "outline_version", outline_cache.outline_version(self.outline_json))
+
+    @property
+    def outline_text(self) -> str:
+        """parse_outline 渲染的大纲文本，按 outline_version 缓存"""
+        return outline_cache.render_outline(self.outline_json, self.outline_version)
+
+    @classmethod
+    def from_outline(cls, outline: Outline) -> "OutlineSnapshot":
+        return cls(
+            project_id=outline.project_id,
+            enable_img_search=bool(outline.enable_img_search),
+            outline_json=freeze(outline.outline_json or {}),
+            outline_layout=freeze(outline.outline_layout or {}),
+            global_visual_suggestion=freeze(outline.global_visual_suggestion or {}),
+            images=freeze(outline.images or {}),
+        )
+
+    def with_slide_images(self, slide_id: str, images: Mapping) -> "OutlineSnapshot":
+        return replace(self, images=MappingProxyType({slide_id: MappingProxyType(dict(images))}))
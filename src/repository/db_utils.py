@@ -2,6 +2,7 @@ from pathlib import Path
 import sys
 import json
 from typing import Optional
+from sqlalchemy import inspect, text
 from sqlalchemy.engine import Engine
 from sqlmodel import SQLModel, create_engine
 
@@ -9,6 +10,7 @@ project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 from config.logging_config import logger
+from src.utils import profiling
 
 DB_PATH = project_root / "data" / "ezppt.db"
 DB_PATH.parent.mkdir(parents=True, exist_ok=True)
@@ -23,9 +25,11 @@ def custom_serializer(obj):
 ENGINE: Engine = create_engine(
     SQLITE_URL,
     echo=False,
-    connect_args={"check_same_thread": False},
+    # Web 服务和独立 worker 进程会同时写库，写锁冲突时等待而不是立即报错
+    connect_args={"check_same_thread": False, "timeout": 30},
     json_serializer=custom_serializer,
 )
+profiling.instrument_engine(ENGINE)
 
 
 def init_db(engine: Optional[Engine] = None) -> str:
@@ -35,12 +39,43 @@ def init_db(engine: Optional[Engine] = None) -> str:
     need_init = not DB_PATH.exists()
 
     SQLModel.metadata.create_all(target_engine)
+    _add_missing_columns(target_engine)
+    # WAL 模式下读写互不阻塞，多个 worker 进程轮询任务表时不会卡住 Web 服务；该设置持久保存在数据库文件中
+    with target_engine.begin() as conn:
+        conn.execute(text("PRAGMA journal_mode=WAL"))
 
     if need_init:
         logger.info("数据库初始化完成")
     return str(DB_PATH)
 
 
+def _add_missing_columns(engine: Engine) -> None:
+    """
+    create_all 不会修改已存在的表，这里为旧数据库补齐模型中新增的列
+    新增列必须有默认值，已有记录使用该默认值
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                default = column.default.arg if column.default is not None else None
+                ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+                if isinstance(default, (int, float)) and not isinstance(default, bool):
+                    ddl += f" NOT NULL DEFAULT {default}"
+                elif isinstance(default, str):
+                    escaped = default.replace("'", "''")
+                    ddl += f" NOT NULL DEFAULT '{escaped}'"
+                conn.execute(text(ddl))
+                logger.info(f"数据库表 {table.name} 新增列 {column.name}")
+
+
 def get_engine() -> Engine:
     """获取全局数据库引擎实例"""
     return ENGINE
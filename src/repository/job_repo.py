@@ -0,0 +1,344 @@
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, and_, func, select, update
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.repository.db_utils import get_engine
+from src.models.job_model import Job, JobStatus
+from config.logging_config import logger
+
+# 多个 worker 同时认领同一个任务时，失败的一方换下一个任务重试的次数
+CLAIM_RETRIES = 5
+
+
+def db_add_job(job: Job, *, engine: Optional[Engine] = None) -> Optional[int]:
+    engine = engine or get_engine()
+    try:
+        with Session(engine) as sess:
+            sess.add(job)
+            sess.commit()
+            sess.refresh(job)
+            logger.info(f"已新增任务 {job.id}: {job.kind} (项目 {job.project_id})")
+            return job.id
+    except Exception as exc:
+        logger.error(f"新增任务时出错: {exc}")
+        return None
+
+
+def db_get_job(job_id: int, *, engine: Optional[Engine] = None) -> Optional[Job]:
+    engine = engine or get_engine()
+    try:
+        with Session(engine) as sess:
+            return sess.get(Job, job_id)
+    except Exception as exc:
+        logger.error(f"查询任务 {job_id} 时出错: {exc}")
+        return None
+
+
+def db_claim_job(
+    worker_id: str,
+    lease_seconds: int,
+    kinds: Optional[Sequence[str]] = None,
+    *,
+    engine: Optional[Engine] = None,
+) -> Optional[Job]:
+    """
+    认领一个可执行的任务（按优先级、入队顺序），并设置租约，kinds 不为空时只认领这些类型
+    先查询候选任务再带条件更新，更新行数为 0 说明已被其他 worker 认领
+    """
+    engine = engine or get_engine()
+    try:
+        with Session(engine) as sess:
+            for _ in range(CLAIM_RETRIES):
+                now = datetime.now()
+                stmt = select(Job.id).where(
+                    and_(
+                        Job.status == JobStatus.queued,
+                        Job.available_time <= now,
+                    )
+                )
+                if kinds:
+                    stmt = stmt.where(Job.kind.in_(list(kinds)))
+                candidate = sess.exec(
+                    stmt.order_by(Job.priority.desc(), Job.id).limit(1)
+                ).first()
+                if candidate is None:
+                    return None
+                result = sess.exec(
+                    update(Job)
+                    .where(and_(Job.id == candidate, Job.status == JobStatus.queued))
+                    .values(
+                        status=JobStatus.running,
+                        worker_id=worker_id,
+                        attempts=Job.attempts + 1,
+                        lease_until=now + timedelta(seconds=lease_seconds),
+                        heartbeat_time=now,
+                        start_time=now,
+                    )
+                )
+                sess.commit()
+                if result.rowcount > 0:
+                    return sess.get(Job, candidate, populate_existing=True)
+            return None
+    except Exception as exc:
+        logger.error(f"认领任务时出错: {exc}")
+        return None
+
+
+def db_heartbeat_job(
+    job_id: int, worker_id: str, lease_seconds: int, *, engine: Optional[Engine] = None
+) -> Optional[bool]:
+    """
+    续租，返回 True 表示续租成功，False 表示租约已丢失（已取消、过期后被重新排队或被其他 worker 认领），
+    None 表示续租时出错（例如数据库暂时被锁定），租约状态未知
+    """
+    engine = engine or get_engine()
+    try:
+        with Session(engine) as sess:
+            now = datetime.now()
+            result = sess.exec(
+                update(Job)
+                .where(
+                    and_(
+                        Job.id == job_id,
+                        Job.worker_id == worker_id,
+                        Job.status == JobStatus.running,
+                    )
+                )
+                .values(
+                    lease_until=now + timedelta(seconds=lease_seconds),
+                    heartbeat_time=now,
+                )
+            )
+            sess.commit()
+            return result.rowcount > 0
+    except Exception as exc:
+        logger.error(f"任务 {job_id} 续租时出错: {exc}")
+        return None
+
+
+def db_complete_job(job_id: int, worker_id: str, *, engine: Optional[Engine] = None) -> bool:
+    engine = engine or get_engine()
+    try:
+        with Session(engine) as sess:
+            result = sess.exec(
+                update(Job)
+                .where(
+                    and_(
+                        Job.id == job_id,
+                        Job.worker_id == worker_id,
+                        Job.status == JobStatus.running,
+                    )
+                )
+                .values(status=JobStatus.completed, lease_until=None, finish_time=datetime.now())
+            )
+            sess.commit()
+            return result.rowcount > 0
+    except Exception as exc:
+        logger.error(f"更新任务 {job_id} 为完成时出错: {exc}")
+        return False
+
+
+def db_fail_job(
+    job_id: int,
+    worker_id: str,
+    error: str,
+    retry_delay: float,
+    *,
+    engine: Optional[Engine] = None,
+) -> Optional[str]:
+    """
+    记录任务失败：未超过最大尝试次数时在 retry_delay 秒后重新排队，否则标记为失败
+    返回任务的新状态，租约已丢失时返回 None
+    """
+    engine = engine or get_engine()
+    try:
+        with Session(engine) as sess:
+            job = sess.get(Job, job_id)
+            if job is None or job.worker_id != worker_id or job.status != JobStatus.running:
+                return None
+            now = datetime.now()
+            job.error = error[:2000]
+            job.lease_until = None
+            if job.attempts < job.max_attempts:
+                job.status = JobStatus.queued
+                job.available_time = now + timedelta(seconds=retry_delay)
+            else:
+                job.status = JobStatus.failed
+                job.finish_time = now
+            sess.add(job)
+            sess.commit()
+            return job.status
+    except Exception as exc:
+        logger.error(f"更新任务 {job_id} 为失败时出错: {exc}")
+        return None
+
+
+def db_cancel_jobs(project_id: str, *, engine: Optional[Engine] = None) -> int:
+    """
+    取消项目所有排队中和执行中的任务，返回被取消的任务数
+    其他进程中执行的任务会在下一次续租失败时发现并停止；执行中的任务保留租约，
+    直到 worker 退出时通过 db_release_job_lease 释放，db_count_stopping_jobs 据此判断任务是否已经停止
+    """
+    engine = engine or get_engine()
+    try:
+        with Session(engine) as sess:
+            now = datetime.now()
+            queued = sess.exec(
+                update(Job)
+                .where(and_(Job.project_id == project_id, Job.status == JobStatus.queued))
+                .values(status=JobStatus.cancelled, lease_until=None, finish_time=now)
+            )
+            running = sess.exec(
+                update(Job)
+                .where(and_(Job.project_id == project_id, Job.status == JobStatus.running))
+                .values(status=JobStatus.cancelled, finish_time=now)
+            )
+            sess.commit()
+            return queued.rowcount + running.rowcount
+    except Exception as exc:
+        logger.error(f"取消项目 {project_id} 的任务时出错: {exc}")
+        return 0
+
+
+def db_mark_job_cancelled(job_id: int, worker_id: str, *, engine: Optional[Engine] = None) -> bool:
+    """执行中的任务因取消而退出时记录为已取消（已被 db_cancel_jobs 取消时不做修改）"""
+    engine = engine or get_engine()
+    try:
+        with Session(engine) as sess:
+            result = sess.exec(
+                update(Job)
+                .where(
+                    and_(
+                        Job.id == job_id,
+                        Job.worker_id == worker_id,
+                        Job.status == JobStatus.running,
+                    )
+                )
+                .values(status=JobStatus.cancelled, lease_until=None, finish_time=datetime.now())
+            )
+            sess.commit()
+            return result.rowcount > 0
+    except Exception as exc:
+        logger.error(f"更新任务 {job_id} 为已取消时出错: {exc}")
+        return False
+
+
+def db_release_job_lease(job_id: int, worker_id: str, *, engine: Optional[Engine] = None) -> bool:
+    """worker 退出已被取消的任务时释放其租约，表示该任务已经停止写入"""
+    engine = engine or get_engine()
+    try:
+        with Session(engine) as sess:
+            result = sess.exec(
+                update(Job)
+                .where(
+                    and_(
+                        Job.id == job_id,
+                        Job.worker_id == worker_id,
+                        Job.status == JobStatus.cancelled,
+                        Job.lease_until.is_not(None),
+                    )
+                )
+                .values(lease_until=None)
+            )
+            sess.commit()
+            return result.rowcount > 0
+    except Exception as exc:
+        logger.error(f"释放任务 {job_id} 的租约时出错: {exc}")
+        return False
+
+
+def db_count_stopping_jobs(project_id: str, *, engine: Optional[Engine] = None) -> int:
+    """已被取消但 worker 还没有退出的任务数（租约未释放且未过期，过期说明 worker 已经不在了）"""
+    engine = engine or get_engine()
+    try:
+        with Session(engine) as sess:
+            stmt = select(func.count(Job.id)).where(
+                and_(
+                    Job.project_id == project_id,
+                    Job.status == JobStatus.cancelled,
+                    Job.lease_until > datetime.now(),
+                )
+            )
+            return sess.exec(stmt).one()
+    except Exception as exc:
+        logger.error(f"查询项目 {project_id} 停止中的任务时出错: {exc}")
+        return 0
+
+
+def db_requeue_expired_jobs(*, engine: Optional[Engine] = None) -> List[Job]:
+    """
+    租约过期的运行中任务（worker 崩溃或进程重启）重新排队，已达到最大尝试次数的标记为失败
+    返回被标记为失败的任务
+    """
+    engine = engine or get_engine()
+    try:
+        with Session(engine) as sess:
+            now = datetime.now()
+            expired = sess.exec(
+                select(Job).where(and_(Job.status == JobStatus.running, Job.lease_until < now))
+            ).all()
+            failed = []
+            for job in expired:
+                job.lease_until = None
+                if job.attempts < job.max_attempts:
+                    job.status = JobStatus.queued
+                    job.available_time = now
+                    logger.warning(f"任务 {job.id} ({job.kind}) 的租约已过期，重新排队")
+                else:
+                    job.status = JobStatus.failed
+                    job.error = "租约过期且已达到最大尝试次数"
+                    job.finish_time = now
+                    failed.append(job)
+                    logger.error(f"任务 {job.id} ({job.kind}) 的租约已过期且已达到最大尝试次数")
+                sess.add(job)
+            sess.commit()
+            for job in failed:
+                sess.refresh(job)
+            return failed
+    except Exception as exc:
+        logger.error(f"重新排队过期任务时出错: {exc}")
+        return []
+
+
+def db_list_jobs(project_id: str, *, engine: Optional[Engine] = None) -> List[Job]:
+    engine = engine or get_engine()
+    try:
+        with Session(engine) as sess:
+            stmt = select(Job).where(Job.project_id == project_id).order_by(Job.id)
+            return list(sess.exec(stmt).all())
+    except Exception as exc:
+        logger.error(f"获取项目 {project_id} 的任务列表时出错: {exc}")
+        return []
+
+
+def db_active_project_ids(*, engine: Optional[Engine] = None) -> Set[str]:
+    """有排队中或执行中任务的项目 ID"""
+    engine = engine or get_engine()
+    try:
+        with Session(engine) as sess:
+            stmt = select(Job.project_id).where(
+                Job.status.in_([JobStatus.queued, JobStatus.running])
+            )
+            return set(sess.exec(stmt).all())
+    except Exception as exc:
+        logger.error(f"查询有待执行任务的项目时出错: {exc}")
+        return set()
+
+
+def db_count_jobs(*, engine: Optional[Engine] = None) -> Dict[str, int]:
+    """按状态统计任务数"""
+    engine = engine or get_engine()
+    try:
+        with Session(engine) as sess:
+            rows = sess.exec(select(Job.status, func.count(Job.id)).group_by(Job.status)).all()
+            return {status: count for status, count in rows}
+    except Exception as exc:
+        logger.error(f"统计任务数时出错: {exc}")
+        return {}
@@ -0,0 +1,73 @@
+import sys
+from pathlib import Path
+from typing import Dict, Optional
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, func, select
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.repository.db_utils import get_engine
+from src.models.llm_call_model import LLMCall
+from config.logging_config import logger
+
+_SUM_FIELDS = (
+    "prompt_tokens",
+    "cached_tokens",
+    "completion_tokens",
+    "latency_ms",
+    "queue_ms",
+    "retry_count",
+    "coalesced",
+)
+
+
+def db_add_llm_call(call: LLMCall, *, engine: Optional[Engine] = None) -> bool:
+    engine = engine or get_engine()
+    try:
+        with Session(engine) as sess:
+            sess.add(call)
+            sess.commit()
+            return True
+    except Exception as exc:
+        logger.error(f"记录 LLM 调用时出错: {exc}")
+        return False
+
+
+def _summary_row(row) -> Dict[str, int]:
+    summary = {"calls": row[0] or 0}
+    for field, value in zip(_SUM_FIELDS, row[1:]):
+        summary[field] = int(value or 0)
+    requested = summary["calls"] - summary["coalesced"]
+    summary["avg_latency_ms"] = summary["latency_ms"] // requested if requested else 0
+    return summary
+
+
+def db_get_llm_usage(project_id: str, *, engine: Optional[Engine] = None) -> dict:
+    """
+    汇总项目的 LLM 用量与耗时（包含重新生成产生的调用）
+    返回 {"total": {...}, "by_stage": {stage: {...}}, "by_slide": {slide_id: {...}}}
+    """
+    engine = engine or get_engine()
+    columns = [func.count(LLMCall.id)] + [
+        func.sum(getattr(LLMCall, field)) for field in _SUM_FIELDS
+    ]
+    usage = {"total": _summary_row([0] * (len(_SUM_FIELDS) + 1)), "by_stage": {}, "by_slide": {}}
+    try:
+        with Session(engine) as sess:
+            condition = LLMCall.project_id == project_id
+            usage["total"] = _summary_row(sess.exec(select(*columns).where(condition)).one())
+            for row in sess.exec(
+                select(LLMCall.stage, *columns).where(condition).group_by(LLMCall.stage)
+            ).all():
+                usage["by_stage"][row[0]] = _summary_row(row[1:])
+            for row in sess.exec(
+                select(LLMCall.slide_id, *columns)
+                .where(condition, LLMCall.slide_id != "")
+                .group_by(LLMCall.slide_id)
+            ).all():
+                usage["by_slide"][row[0]] = _summary_row(row[1:])
+    except Exception as exc:
+        logger.error(f"统计项目 {project_id} 的 LLM 用量时出错: {exc}")
+    return usage
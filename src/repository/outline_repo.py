@@ -10,6 +10,7 @@ project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 from src.repository.db_utils import get_engine
+from src.models.deck_index import DeckIndex
 from src.models.outline_model import Outline
 from src.models.outline_slide_model import OutlineSlide
 from src.models.project_model import Status
@@ -78,59 +79,43 @@ def db_add_outline_slides(project_id: str, *, engine: Optional[Engine] = None) -
             outline_config = db_get_outline(project_id=project_id, engine=engine)
             if not outline_config:
                 return False
-            outline_json = outline_config.outline_json
-            chapters = outline_json.get("chapters", [])
-
-            if chapters:
-                for chapter in chapters:
-                    chapter_id = int(chapter.get("chapter_id", ""))
-                    chapter_title = chapter.get("chapter_title") or chapter.get(
-                        "chapter_topic", ""
-                    )
-                    slides = chapter.get("slides", [])
-
-                    if chapter_id and slides:
-                        for slide in slides:
-                            slide_id = slide.get("slide_id", "")
-                            slide_content = str(slide.get("slide_content", []))
-                            slide_order = int(
-                                slide_id.split(".")[-1] if slide_id else ""
-                            )
-                            slide_topic = slide.get("slide_topic", "")
-                            visual_suggestion = slide.get("visual_suggestion", {})
-
-                            # logger.info(
-                            #     f"project_id: {project_id}, slide_id: {slide_id}, "
-                            #     f"chapter_id: {chapter_id}, slide_content: {slide_content}, "
-                            #     f"chapter_title: {chapter_title}, slide_order: {slide_order}, "
-                            #     f"slide_topic: {slide_topic}, visual_suggestion: {visual_suggestion}"
-                            # )
-
-                            if slide_id and slide_content and slide_order:
-                                try:
-                                    outline_slide = OutlineSlide(
-                                        project_id=project_id,
-                                        slide_id=slide_id,
-                                        chapter_id=chapter_id,
-                                        slide_content=slide_content,
-                                        chapter_title=chapter_title,
-                                        slide_order=slide_order,
-                                        slide_topic=slide_topic,
-                                        visual_suggestion=visual_suggestion,
-                                        status=Status.pending,
-                                    )
-
-                                    sess.add(outline_slide)
-                                    sess.commit()
-                                    success_count += 1
-
-                                except Exception as e:
-                                    sess.rollback()
-                                    fail_count += 1
-                                    logger.warning(
-                                        f"插入幻灯片 {slide_id} 失败: {e}，继续处理下一张"
-                                    )
-                                    continue
+            for entry in DeckIndex(outline_config.outline_json):
+                chapter_id = int(entry.chapter_id)
+                chapter_title = entry.chapter.get("chapter_title") or entry.chapter.get(
+                    "chapter_topic", ""
+                )
+                slide = entry.data
+                slide_id = entry.slide_id
+                slide_content = str(slide.get("slide_content", []))
+                slide_order = int(slide_id.split(".")[-1])
+                slide_topic = slide.get("slide_topic", "")
+                visual_suggestion = slide.get("visual_suggestion", {})
+
+                if chapter_id and slide_content and slide_order:
+                    try:
+                        outline_slide = OutlineSlide(
+                            project_id=project_id,
+                            slide_id=slide_id,
+                            chapter_id=chapter_id,
+                            slide_content=slide_content,
+                            chapter_title=chapter_title,
+                            slide_order=slide_order,
+                            slide_topic=slide_topic,
+                            visual_suggestion=visual_suggestion,
+                            status=Status.pending,
+                        )
+
+                        sess.add(outline_slide)
+                        sess.commit()
+                        success_count += 1
+
+                    except Exception as e:
+                        sess.rollback()
+                        fail_count += 1
+                        logger.warning(
+                            f"插入幻灯片 {slide_id} 失败: {e}，继续处理下一张"
+                        )
+                        continue
 
             logger.info(
                 f"项目 {project_id} 幻灯片处理完成：成功 {success_count} 张，失败 {fail_count} 张"
@@ -244,9 +229,10 @@ def db_update_outline_slide(
     *,
     new_status: str = "",
     html_content: str = "",
+    usage: Optional[dict] = None,
     engine: Optional[Engine] = None,
 ) -> bool:
-    """更新某个幻灯片的字段"""
+    """更新某个幻灯片的字段，usage 为生成该页 HTML 的模型用量"""
     engine = engine or get_engine()
     try:
         with Session(engine) as sess:
@@ -256,6 +242,10 @@ def db_update_outline_slide(
                 update_values["status"] = new_status
             if html_content:
                 update_values["html_content"] = html_content
+            if usage is not None:
+                update_values["prompt_tokens"] = usage.get("prompt_tokens", 0)
+                update_values["cached_tokens"] = usage.get("cached_tokens", 0)
+                update_values["completion_tokens"] = usage.get("completion_tokens", 0)
 
             # 如果没有要更新的内容，直接返回
             if not update_values:
@@ -284,3 +274,52 @@ def db_update_outline_slide(
     except Exception as exc:
         logger.error(f"更新项目 {project_id} 的幻灯片 {slide_id} 状态时出错: {exc}")
         return False
+
+
+def db_update_outline_slides(
+    project_id: str,
+    updates: Dict[str, dict],
+    *,
+    engine: Optional[Engine] = None,
+) -> bool:
+    """
+    在一个事务中更新多个幻灯片，updates 为 {slide_id: 字段}，字段与 db_update_outline_slide 的参数相同
+    （new_status、html_content、usage）；任意一页不存在或写入失败时全部回滚并返回 False
+    """
+    engine = engine or get_engine()
+    try:
+        with Session(engine) as sess:
+            for slide_id, fields in updates.items():
+                update_values = {}
+                if fields.get("new_status"):
+                    update_values["status"] = fields["new_status"]
+                if fields.get("html_content"):
+                    update_values["html_content"] = fields["html_content"]
+                usage = fields.get("usage")
+                if usage is not None:
+                    update_values["prompt_tokens"] = usage.get("prompt_tokens", 0)
+                    update_values["cached_tokens"] = usage.get("cached_tokens", 0)
+                    update_values["completion_tokens"] = usage.get("completion_tokens", 0)
+                if not update_values:
+                    continue
+
+                stmt = (
+                    update(OutlineSlide)
+                    .where(
+                        and_(
+                            OutlineSlide.project_id == project_id,
+                            OutlineSlide.slide_id == slide_id,
+                        )
+                    )
+                    .values(**update_values)
+                )
+                result = sess.exec(stmt)
+                if result.rowcount == 0:
+                    sess.rollback()
+                    logger.error(f"未找到项目 {project_id} 的幻灯片 {slide_id}，批量更新已回滚")
+                    return False
+            sess.commit()
+            return True
+    except Exception as exc:
+        logger.error(f"批量更新项目 {project_id} 的幻灯片时出错: {exc}")
+        return False
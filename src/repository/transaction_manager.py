@@ -8,6 +8,8 @@ from config.logging_config import logger
 from src.models.project_model import Project
 from src.models.outline_model import Outline
 from src.models.outline_slide_model import OutlineSlide
+from src.models.llm_call_model import LLMCall
+from src.models.job_model import Job
 from src.repository.db_utils import get_engine
 
 
@@ -45,6 +47,8 @@ def delete_project_with_related(
                 delete(OutlineSlide).where(OutlineSlide.project_id == project_id)
             )
             session.exec(delete(Outline).where(Outline.project_id == project_id))
+            session.exec(delete(LLMCall).where(LLMCall.project_id == project_id))
+            session.exec(delete(Job).where(Job.project_id == project_id))
             session.delete(project)
 
         logger.info("项目 %s 及关联数据已删除", project_id)
@@ -0,0 +1,60 @@
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import config.base_config as base_config
+from src.models.llm_call_model import LLMCall
+from src.repository import llm_call_repo
+
+# 当前 LLM 调用所属的项目、幻灯片与阶段，由生成流程设置，chat 层据此记录用量
+_call_context: ContextVar[dict] = ContextVar("llm_call_context", default={})
+
+
+@contextmanager
+def llm_call_context(**fields):
+    """
+    在 with 代码块内为 LLM 调用附加 project_id / slide_id / stage，未传入的字段沿用外层上下文
+    线程池中的任务不会继承上下文，需要在任务内部重新设置（run_blocking 会自动带上）
+    """
+    token = _call_context.set({**_call_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _call_context.reset(token)
+
+
+def get_call_context() -> dict:
+    return _call_context.get()
+
+
+def record_llm_call(llm_config: base_config.LLMConfig, response, *, coalesced: bool = False) -> None:
+    """
+    将带有用量信息的回复记录到数据库，不在项目上下文中的调用（如配置测试）不记录
+    coalesced 为 True 表示复用了其他调用进行中的相同请求：用量已记在发出请求的调用名下，
+    这里只记录一行用量为 0 的调用，使每个项目 / 幻灯片的调用次数保持完整
+    """
+    context = _call_context.get()
+    if not context.get("project_id") or not hasattr(response, "usage"):
+        return
+    call = LLMCall(
+        project_id=context["project_id"],
+        slide_id=context.get("slide_id", ""),
+        stage=context.get("stage", ""),
+        model=llm_config.name,
+    )
+    if coalesced:
+        call.coalesced = 1
+    else:
+        usage = response.usage
+        call.prompt_tokens = usage.get("prompt_tokens", 0)
+        call.cached_tokens = usage.get("cached_tokens", 0)
+        call.completion_tokens = usage.get("completion_tokens", 0)
+        call.latency_ms = response.latency_ms
+        call.ttfb_ms = response.ttfb_ms
+        call.queue_ms = response.queue_ms
+        call.retry_count = response.retry_count
+    llm_call_repo.db_add_llm_call(call)
@@ -1,43 +1,206 @@
 import sys
 from pathlib import Path
+from typing import Callable, Optional
 
 # 将项目根目录添加到 Python 路径
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-from src.services.chat.gemini_provider import chat_gemini
-from src.services.chat.openai_provider import chat_openai
+from src.services.chat.gemini_provider import chat_gemini, chat_gemini_stream
+from src.services.chat.openai_provider import chat_openai, chat_openai_stream
+from src.services.chat import completion_cache, load_balancer
+from src.services.chat.call_context import record_llm_call
+from src.utils import cancellation, single_flight
+from src.utils.help_utils import StreamHandler
+from src.utils.async_utils import run_blocking
 from config.base_config import LLMConfig
+from config.logging_config import logger
 import config.base_config as base_config
 
-def pic_understand(images_base64: list[str], prompt: str, llm_config:LLMConfig = base_config.PIC_LLM_CONFIG) -> str:
+
+_llm_flights = single_flight.get_group("llm")
+
+
+def _with_cache(
+    llm_config: LLMConfig,
+    prompt: str,
+    images_base64: list[str] | None,
+    use_cache: bool,
+    request: Callable[[LLMConfig], str],
+    on_hit: Optional[Callable[[str], None]] = None,
+    cacheable: Optional[Callable[[], bool]] = None,
+) -> str:
+    """
+    开启 LLM_CACHE_ENABLED 且未绕过缓存时，命中则直接返回缓存内容，否则请求后写入缓存
+    相同提示词的并发调用只发出一次请求，其余调用等待并复用其结果（同样通过 on_hit 交给调用方）
+    实际发出的请求由负载均衡选择端点，并按当前调用上下文记录用量与耗时；复用结果的调用记录一行用量为 0 的合并调用
+    cacheable 返回 False 时不写入缓存（例如被中途取消、内容不完整的回复）
+    use_cache 为 False 时既不读写缓存，也不与其他调用合并
+    缓存键按主配置的模型计算，端点使用了不同模型的角色不能共用同一个键，因此也不读写缓存、不合并
+    """
+    if use_cache and load_balancer.mixed_models(llm_config):
+        use_cache = False
+    key = completion_cache.make_key(llm_config, prompt, images_base64) if use_cache else None
+    if key and completion_cache.is_enabled():
+        cached = completion_cache.get(key)
+        if cached is not None:
+            logger.info(f"命中 LLM 缓存: {llm_config.name}")
+            if on_hit:
+                on_hit(cached)
+            return cached
+
+    def send() -> tuple[str, bool]:
+        endpoint_config, response = load_balancer.balanced_call(llm_config, request)
+        record_llm_call(endpoint_config, response)
+        complete = cacheable is None or cacheable()
+        if key and complete and completion_cache.is_enabled():
+            completion_cache.put(key, llm_config.name, response)
+        return response, complete
+
+    if not key:
+        return send()[0]
+    try:
+        (response, complete), shared = _llm_flights.do(key, send)
+    except cancellation.GenerationCancelled:
+        # 合并到的请求属于已被取消的任务；自己没有被取消时重新请求
+        cancellation.check()
+        return send()[0]
+    if not shared:
+        return response
+    if not complete:
+        # 被合并的请求中途取消，内容不完整，自己重新请求
+        return send()[0]
+    logger.info(f"复用进行中的相同 LLM 请求结果: {llm_config.name}")
+    record_llm_call(llm_config, response, coalesced=True)
+    if on_hit:
+        on_hit(response)
+    return response
+
+
+def pic_understand(
+    images_base64: list[str],
+    prompt: str,
+    llm_config: LLMConfig = base_config.PIC_LLM_CONFIG,
+    use_cache: bool = True,
+) -> str:
     """
     调用大模型API进行视觉理解,支持传入多个图片
     Args:
         images_base64 (list[str]): base64编码的图片列表
         prompt (str): 用户的文本提示
         llm_config (LLMConfig): LLM配置对象，默认使用PIC_LLM_CONFIG
+        use_cache (bool): 为 False 时绕过 LLM 缓存和相同请求合并
     
     Returns:
         str: AI的回复内容
     """
-    
-    if llm_config.api_type.lower() == "gemini":
-        return chat_gemini(images_base64=images_base64, prompt=prompt, llm_config=llm_config)
-    else:
-        return chat_openai(images_base64=images_base64, prompt=prompt, llm_config=llm_config)
-    
-def text_chat(prompt: str, llm_config:LLMConfig = base_config.OUTLINE_LLM_CONFIG) -> str:
+
+    def request(endpoint_config: LLMConfig) -> str:
+        if endpoint_config.api_type.lower() == "gemini":
+            return chat_gemini(images_base64=images_base64, prompt=prompt, llm_config=endpoint_config)
+        else:
+            return chat_openai(images_base64=images_base64, prompt=prompt, llm_config=endpoint_config)
+
+    return _with_cache(llm_config, prompt, images_base64, use_cache, request)
+
+
+def text_chat(
+    prompt: str,
+    llm_config: LLMConfig = base_config.OUTLINE_LLM_CONFIG,
+    use_cache: bool = True,
+) -> str:
     """
     调用大模型API进行纯文本对话
     Args:
         prompt (str): 用户的文本提示
         llm_config (LLMConfig): LLM配置对象，默认使用OUTLINE_LLM_CONFIG
+        use_cache (bool): 为 False 时绕过 LLM 缓存和相同请求合并
     
     Returns:
         str: AI的回复内容
     """
-    if llm_config.api_type.lower() == "gemini":
-        return chat_gemini(prompt=prompt, llm_config=llm_config)
-    else:
-        return chat_openai(prompt=prompt, llm_config=llm_config)
+
+    def request(endpoint_config: LLMConfig) -> str:
+        if endpoint_config.api_type.lower() == "gemini":
+            return chat_gemini(prompt=prompt, llm_config=endpoint_config)
+        else:
+            return chat_openai(prompt=prompt, llm_config=endpoint_config)
+
+    return _with_cache(llm_config, prompt, None, use_cache, request)
+
+
+def text_chat_stream(
+    prompt: str,
+    llm_config: LLMConfig = base_config.OUTLINE_LLM_CONFIG,
+    stream_handler: StreamHandler | None = None,
+    use_cache: bool = True,
+) -> str:
+    """
+    以流式方式调用大模型API进行纯文本对话
+    Args:
+        prompt (str): 用户的文本提示
+        llm_config (LLMConfig): LLM配置对象，默认使用OUTLINE_LLM_CONFIG
+        stream_handler (StreamHandler): 增量回调，feed() 返回 True 时提前结束生成
+        use_cache (bool): 为 False 时绕过 LLM 缓存和相同请求合并；命中缓存时整段内容一次性交给 stream_handler
+
+    Returns:
+        str: 截至流结束时AI的回复内容
+    """
+
+    def request(endpoint_config: LLMConfig) -> str:
+        if endpoint_config.api_type.lower() == "gemini":
+            return chat_gemini_stream(prompt=prompt, llm_config=endpoint_config, stream_handler=stream_handler)
+        else:
+            return chat_openai_stream(prompt=prompt, llm_config=endpoint_config, stream_handler=stream_handler)
+
+    def replay(cached: str) -> None:
+        if stream_handler:
+            stream_handler.reset()
+            stream_handler.feed(cached)
+
+    def cacheable() -> bool:
+        cancelled = getattr(stream_handler, "cancelled", None)
+        return cancelled is None or not cancelled.is_set()
+
+    return _with_cache(
+        llm_config, prompt, None, use_cache, request, on_hit=replay, cacheable=cacheable
+    )
+
+
+async def pic_understand_async(
+    images_base64: list[str],
+    prompt: str,
+    llm_config: LLMConfig = base_config.PIC_LLM_CONFIG,
+    use_cache: bool = True,
+) -> str:
+    """pic_understand 的异步版本，阻塞的 HTTP 请求在共享 I/O 线程池中执行"""
+    return await run_blocking(
+        pic_understand,
+        images_base64=images_base64,
+        prompt=prompt,
+        llm_config=llm_config,
+        use_cache=use_cache,
+    )
+
+
+async def text_chat_async(
+    prompt: str, llm_config: LLMConfig = base_config.OUTLINE_LLM_CONFIG, use_cache: bool = True
+) -> str:
+    """text_chat 的异步版本"""
+    return await run_blocking(text_chat, prompt=prompt, llm_config=llm_config, use_cache=use_cache)
+
+
+async def text_chat_stream_async(
+    prompt: str,
+    llm_config: LLMConfig = base_config.OUTLINE_LLM_CONFIG,
+    stream_handler: StreamHandler | None = None,
+    use_cache: bool = True,
+) -> str:
+    """text_chat_stream 的异步版本"""
+    return await run_blocking(
+        text_chat_stream,
+        prompt=prompt,
+        llm_config=llm_config,
+        stream_handler=stream_handler,
+        use_cache=use_cache,
+    )
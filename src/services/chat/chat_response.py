@@ -0,0 +1,55 @@
+from typing import Optional
+
+
+class ChatResponse(str):
+    """
+    带有用量和耗时信息的模型回复，可以当作普通字符串使用
+    usage 字段: prompt_tokens, completion_tokens, cached_tokens（命中服务商提示词缓存的 token 数）
+    latency_ms: 成功那次请求的总耗时；ttfb_ms: 收到首个字节（流式为首段内容）的耗时
+    queue_ms: 在限流器上排队的时间；retry_count: 成功前失败重试的次数
+    """
+
+    def __new__(
+        cls,
+        content: str = "",
+        usage: Optional[dict] = None,
+        latency_ms: int = 0,
+        ttfb_ms: int = 0,
+        queue_ms: int = 0,
+        retry_count: int = 0,
+    ):
+        obj = super().__new__(cls, content)
+        obj.usage = usage or {}
+        obj.latency_ms = latency_ms
+        obj.ttfb_ms = ttfb_ms
+        obj.queue_ms = queue_ms
+        obj.retry_count = retry_count
+        return obj
+
+
+def get_usage(response) -> dict:
+    """读取回复中的用量信息，普通字符串（如命中本地缓存的回复）返回空字典"""
+    return getattr(response, "usage", None) or {}
+
+
+def parse_openai_usage(usage: Optional[dict]) -> dict:
+    if not usage:
+        return {}
+    details = usage.get("prompt_tokens_details") or {}
+    # DeepSeek 等兼容接口使用 prompt_cache_hit_tokens 表示缓存命中
+    cached_tokens = details.get("cached_tokens") or usage.get("prompt_cache_hit_tokens") or 0
+    return {
+        "prompt_tokens": usage.get("prompt_tokens") or 0,
+        "completion_tokens": usage.get("completion_tokens") or 0,
+        "cached_tokens": cached_tokens,
+    }
+
+
+def parse_gemini_usage(usage_metadata: Optional[dict]) -> dict:
+    if not usage_metadata:
+        return {}
+    return {
+        "prompt_tokens": usage_metadata.get("promptTokenCount") or 0,
+        "completion_tokens": usage_metadata.get("candidatesTokenCount") or 0,
+        "cached_tokens": usage_metadata.get("cachedContentTokenCount") or 0,
+    }
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import config.base_config as base_config
+from config.logging_config import logger
+
+CACHE_DB_PATH = project_root / "data" / "llm_cache.db"
+
+_conn: Optional[sqlite3.Connection] = None
+_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+
+def is_enabled() -> bool:
+    return bool(base_config.LLM_CACHE_ENABLED)
+
+
+def make_key(
+    llm_config: base_config.LLMConfig, prompt: str, images_base64: list[str] | None = None
+) -> str:
+    """按 api_type、模型、提示词和图片内容哈希计算缓存键"""
+    image_hashes = [
+        hashlib.sha256(image.encode("utf-8")).hexdigest() for image in images_base64 or []
+    ]
+    payload = json.dumps(
+        {
+            "api_type": llm_config.api_type.lower(),
+            "model": llm_config.name,
+            "prompt": prompt,
+            "images": image_hashes,
+        },
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        CACHE_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+        _conn = sqlite3.connect(str(CACHE_DB_PATH), check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS completion_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        _conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_completion_cache_last_access "
+            "ON completion_cache (last_access)"
+        )
+        _conn.commit()
+    return _conn
+
+
+def get(key: str) -> Optional[str]:
+    """读取缓存，过期或不存在时返回 None"""
+    global _hits, _misses
+    now = time.time()
+    ttl_seconds = base_config.LLM_CACHE_TTL_HOURS * 3600
+    try:
+        with _lock:
+            conn = _get_conn()
+            row = conn.execute(
+                "SELECT response, created_at FROM completion_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                _misses += 1
+                return None
+            response, created_at = row
+            if ttl_seconds > 0 and now - created_at > ttl_seconds:
+                conn.execute("DELETE FROM completion_cache WHERE key = ?", (key,))
+                conn.commit()
+                _misses += 1
+                return None
+            conn.execute(
+                "UPDATE completion_cache SET last_access = ? WHERE key = ?", (now, key)
+            )
+            conn.commit()
+            _hits += 1
+            return response
+    except sqlite3.Error as e:
+        logger.warning(f"读取 LLM 缓存失败: {e}")
+        return None
+
+
+def _evict(conn: sqlite3.Connection) -> None:
+    """按最近访问时间淘汰，直到缓存总大小不超过 LLM_CACHE_MAX_MB"""
+    max_bytes = base_config.LLM_CACHE_MAX_MB * 1024 * 1024
+    if max_bytes <= 0:
+        return
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM completion_cache").fetchone()[0]
+    if total <= max_bytes:
+        return
+    removed = 0
+    for key, size in conn.execute(
+        "SELECT key, size FROM completion_cache ORDER BY last_access"
+    ).fetchall():
+        if total <= max_bytes:
+            break
+        conn.execute("DELETE FROM completion_cache WHERE key = ?", (key,))
+        total -= size
+        removed += 1
+    logger.info(f"LLM 缓存超出上限，已淘汰 {removed} 条记录")
+
+
+def put(key: str, model: str, response: str) -> None:
+    if not response:
+        return
+    now = time.time()
+    try:
+        with _lock:
+            conn = _get_conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO completion_cache "
+                "(key, model, response, size, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, str(response), len(response.encode("utf-8")), now, now),
+            )
+            _evict(conn)
+            conn.commit()
+    except sqlite3.Error as e:
+        logger.warning(f"写入 LLM 缓存失败: {e}")
+
+
+def get_cache_stats() -> dict:
+    stats = {
+        "enabled": is_enabled(),
+        "hits": _hits,
+        "misses": _misses,
+        "entries": 0,
+        "size_bytes": 0,
+    }
+    if not CACHE_DB_PATH.exists():
+        return stats
+    try:
+        with _lock:
+            entries, size = _get_conn().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completion_cache"
+            ).fetchone()
+        stats["entries"] = entries
+        stats["size_bytes"] = size
+    except sqlite3.Error as e:
+        logger.warning(f"读取 LLM 缓存统计失败: {e}")
+    return stats
@@ -1,31 +1,35 @@
-import requests
+import json
 import sys
+import time
 from pathlib import Path
 import traceback
+from typing import Optional
 
 project_root = Path(__file__).parent.parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 import config.base_config as base_config
 from config.logging_config import logger
-from src.utils.help_utils import retry_on_failure
+from src.utils.help_utils import retry_on_failure, StreamHandler
+from src.services.chat.http_client import get_timeout, use_session
+from src.services.chat.rate_limiter import estimate_tokens, rate_limited
+from src.services.chat.chat_response import ChatResponse, parse_gemini_usage
+from src.utils.retry_policy import http_error
 
 
-@retry_on_failure(max_attempts=3, delay=1, description="调用Gemini格式LLM")
-def chat_gemini(
-    images_base64: list[str] = [],
-    prompt: str = "",
-    llm_config: base_config.LLMConfig = base_config.PIC_LLM_CONFIG,
-) -> str:
-    api_key = llm_config.api_key
-    model = llm_config.name
+def _endpoint(llm_config: base_config.LLMConfig, **_) -> str:
+    """熔断按 API 地址 + 模型 + Key 区分"""
+    return llm_config.endpoint_id
+
+
+def _build_request_body(images_base64: list[str], prompt: str) -> dict:
     parts = []
     parts.append({"text": prompt})
 
     for image_base64 in images_base64:
         parts.append({"inline_data": {"mime_type": "image/jpeg", "data": image_base64}})
     # 构建请求体
-    request_body = {
+    return {
         "contents": [{"parts": parts, "role": "user"}],
         # "generationConfig": {
         #     "thinkingConfig": {"thinkingBudget": 0},
@@ -39,22 +43,125 @@ def chat_gemini(
         ],
     }
 
+
+@retry_on_failure(max_attempts=3, delay=1, description="调用Gemini格式LLM", endpoint=_endpoint)
+def chat_gemini(
+    images_base64: list[str] = [],
+    prompt: str = "",
+    llm_config: base_config.LLMConfig = base_config.PIC_LLM_CONFIG,
+) -> str:
+    api_key = llm_config.api_key
+    model = llm_config.name
+    request_body = _build_request_body(images_base64, prompt)
+
     headers = {"Content-Type": "application/json"}
     completions_url = f"{llm_config.api_url}/v1beta/models/{model}:generateContent?key={api_key}"
     response = None
     try:
-        response = requests.post(completions_url, headers=headers, json=request_body, timeout=600)
+        with (
+            rate_limited(llm_config, estimate_tokens(prompt, images_base64)) as waited,
+            use_session(llm_config) as session,
+        ):
+            started = time.monotonic()
+            response = session.post(
+                completions_url, headers=headers, json=request_body, timeout=get_timeout()
+            )
         response.raise_for_status()
-        return response.json()["candidates"][0]["content"]["parts"][0]["text"]
+        result = response.json()
+        return ChatResponse(
+            result["candidates"][0]["content"]["parts"][0]["text"],
+            usage=parse_gemini_usage(result.get("usageMetadata")),
+            latency_ms=int((time.monotonic() - started) * 1000),
+            ttfb_ms=int(response.elapsed.total_seconds() * 1000),
+            queue_ms=int(waited * 1000),
+        )
     except Exception as e:
         # logger.error(f"API调用失败: {response.status_code} - {response.text}")
-        raise Exception(f"API调用失败: {response.status_code if response else 'None'} - 响应内容: {response.text if response else 'None'} - 错误信息{e}")
+        raise http_error(
+            response,
+            f"API调用失败: {response.status_code if response is not None else 'None'} - 响应内容: {response.text if response is not None else 'None'} - 错误信息{e}",
+        ) from e
 
         # traceback.print_exc()
     # print("返回的内容为",response.content)
     # print("返回的内容为",response.json())
 
 
+@retry_on_failure(max_attempts=3, delay=1, description="流式调用Gemini格式LLM", endpoint=_endpoint)
+def chat_gemini_stream(
+    images_base64: list[str] = [],
+    prompt: str = "",
+    llm_config: base_config.LLMConfig = base_config.PIC_LLM_CONFIG,
+    stream_handler: Optional[StreamHandler] = None,
+) -> str:
+    """
+    通过 streamGenerateContent (SSE) 流式调用Gemini API
+    stream_handler 的用法与 chat_openai_stream 相同
+    """
+    api_key = llm_config.api_key
+    model = llm_config.name
+    request_body = _build_request_body(images_base64, prompt)
+
+    headers = {"Content-Type": "application/json"}
+    completions_url = f"{llm_config.api_url}/v1beta/models/{model}:streamGenerateContent?alt=sse&key={api_key}"
+    response = None
+    chunks = []
+    usage = {}
+    ttfb = 0.0
+    if stream_handler:
+        stream_handler.reset()
+    try:
+        with (
+            rate_limited(llm_config, estimate_tokens(prompt, images_base64)) as waited,
+            use_session(llm_config) as session,
+        ):
+            started = time.monotonic()
+            response = session.post(
+                completions_url,
+                headers=headers,
+                json=request_body,
+                timeout=get_timeout(),
+                stream=True,
+            )
+            response.raise_for_status()
+            response.encoding = "utf-8"
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                event = json.loads(line[len("data:"):].strip())
+                # 每个数据块都带有截至当前的 usageMetadata
+                if event.get("usageMetadata"):
+                    usage = parse_gemini_usage(event["usageMetadata"])
+                candidates = event.get("candidates") or []
+                if not candidates:
+                    continue
+                parts = (candidates[0].get("content") or {}).get("parts") or []
+                delta = "".join(part.get("text", "") for part in parts)
+                if not delta:
+                    continue
+                if not chunks:
+                    ttfb = time.monotonic() - started
+                chunks.append(delta)
+                if stream_handler and stream_handler.feed(delta):
+                    logger.info("已提前关闭 LLM 流式响应")
+                    break
+        return ChatResponse(
+            "".join(chunks),
+            usage=usage,
+            latency_ms=int((time.monotonic() - started) * 1000),
+            ttfb_ms=int(ttfb * 1000),
+            queue_ms=int(waited * 1000),
+        )
+    except Exception as e:
+        raise http_error(
+            response,
+            f"API调用失败: {response.status_code if response is not None else 'None'} - 已接收内容长度: {sum(len(c) for c in chunks)} - 错误信息{e}",
+        ) from e
+    finally:
+        if response is not None:
+            response.close()
+
+
 if __name__ == "__main__":
     # 测试代码
     test_prompt = "泥嚎鸭"
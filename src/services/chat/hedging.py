@@ -0,0 +1,277 @@
+import asyncio
+import contextvars
+import math
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, Optional, TypeVar
+
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import config.base_config as base_config
+from config.logging_config import logger
+from src.utils import cancellation
+
+T = TypeVar("T")
+
+# 每个端点保留最近多少次成功调用的耗时用于计算分位数
+LATENCY_WINDOW = 200
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+class LatencyTracker:
+    """记录端点最近的调用耗时，并统计对冲请求的触发与获胜次数"""
+
+    def __init__(self, key: str):
+        self.key = key
+        self._lock = threading.Lock()
+        self._samples: deque = deque(maxlen=LATENCY_WINDOW)
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.fallbacks = 0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def incr(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(max(math.ceil(len(samples) * percent / 100) - 1, 0), len(samples) - 1)
+        return samples[index]
+
+    def hedge_delay(self) -> Optional[float]:
+        """样本不足 PPT_HEDGE_MIN_SAMPLES 时返回 None（不对冲），否则返回触发对冲的等待时间"""
+        with self._lock:
+            count = len(self._samples)
+        if count < max(base_config.PPT_HEDGE_MIN_SAMPLES, 1):
+            return None
+        threshold = self.percentile(base_config.PPT_HEDGE_PERCENTILE)
+        return max(threshold, base_config.PPT_HEDGE_MIN_DELAY)
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = len(self._samples)
+            hedged, hedge_wins, fallbacks = self.hedged, self.hedge_wins, self.fallbacks
+        threshold = self.percentile(base_config.PPT_HEDGE_PERCENTILE)
+        return {
+            "endpoint": self.key,
+            "samples": count,
+            "percentile": base_config.PPT_HEDGE_PERCENTILE,
+            "threshold_seconds": round(threshold, 2) if threshold is not None else None,
+            "hedged": hedged,
+            "hedge_wins": hedge_wins,
+            "fallbacks": fallbacks,
+        }
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def get_tracker(key: str) -> LatencyTracker:
+    with _trackers_lock:
+        tracker = _trackers.get(key)
+        if tracker is None:
+            tracker = LatencyTracker(key)
+            _trackers[key] = tracker
+        return tracker
+
+
+def get_hedge_stats() -> list[dict]:
+    with _trackers_lock:
+        trackers = list(_trackers.values())
+    return [tracker.stats() for tracker in trackers]
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # 每个生成任务最多同时占用两个线程（原请求 + 对冲请求）
+            max_workers = (
+                max(base_config.PPT_API_LIMIT, base_config.ASYNC_ENGINE_MAX_LLM_CALLS, 1) * 2
+            )
+            _executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="hedge"
+            )
+        return _executor
+
+
+def _timed(fn: Callable[[threading.Event], T], cancelled: threading.Event):
+    start = time.monotonic()
+    result = fn(cancelled)
+    return result, time.monotonic() - start
+
+
+class _HedgedCall:
+    """
+    一次对冲调用的状态，同步（run_hedged）和异步（run_hedged_async）版本共用，二者只在等待方式上不同：
+    primary / backup 都在 hedge 线程池中执行，异步版本通过 asyncio.wrap_future 等待，不额外占用线程
+    """
+
+    def __init__(
+        self,
+        primary_key: str,
+        primary: Callable[[threading.Event], T],
+        backup_key: str,
+        backup: Callable[[threading.Event], T],
+        hedge: bool,
+        fallback_on_failure: bool,
+    ):
+        self.primary_key = primary_key
+        self.backup_key = backup_key
+        self.backup = backup
+        self.fallback_on_failure = fallback_on_failure
+        self.tracker = get_tracker(primary_key)
+        self.delay = self.tracker.hedge_delay() if hedge else None
+        self.executor = _get_executor()
+        self.pending: Dict[Future, tuple] = {}
+        self.backup_launched = False
+        self.hedged = False
+        self.deadline = time.monotonic() + self.delay if self.delay is not None else None
+        self.result: Optional[T] = None
+        self.error: Optional[Exception] = None
+        self.launch("primary", primary_key, primary)
+
+    def launch(self, label: str, key: str, fn: Callable[[threading.Event], T]) -> None:
+        cancelled = threading.Event()
+        # 线程池中的任务不会继承上下文，手动带上以便记录用量时能拿到项目和幻灯片信息
+        context = contextvars.copy_context()
+        future = self.executor.submit(context.run, _timed, fn, cancelled)
+        self.pending[future] = (label, key, cancelled)
+
+    def timeout(self) -> Optional[float]:
+        """距离发起对冲请求还需等待的时间，不需要再对冲时返回 None"""
+        if self.backup_launched or self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0)
+
+    def start_hedge(self) -> None:
+        logger.info(
+            f"{self.primary_key} 请求超过 {self.delay:.1f} 秒未返回，向 {self.backup_key} 发起对冲请求"
+        )
+        self.tracker.incr("hedged")
+        self.launch("backup", self.backup_key, self.backup)
+        self.backup_launched = self.hedged = True
+
+    def collect(self, done) -> tuple[bool, Optional[T]]:
+        """处理已完成的请求，返回 (是否已得到有效结果, 结果)"""
+        for future in done:
+            label, key, _ = self.pending.pop(future)
+            try:
+                value, elapsed = future.result()
+            except Exception as e:
+                # 任务已取消时不再发起备用请求
+                cancellation.check()
+                logger.warning(f"{key} 请求失败: {e}")
+                self.error = e
+                continue
+            if not value:
+                self.result = value
+                continue
+            get_tracker(key).record(elapsed)
+            if label == "backup" and self.hedged:
+                self.tracker.incr("hedge_wins")
+            return True, value
+        if not self.pending and not self.backup_launched and self.fallback_on_failure:
+            logger.warning(f"{self.primary_key} 未返回有效结果，改用 {self.backup_key}")
+            self.tracker.incr("fallbacks")
+            self.launch("backup", self.backup_key, self.backup)
+            self.backup_launched = True
+        return False, None
+
+    def close(self) -> None:
+        for _, _, cancelled in self.pending.values():
+            cancelled.set()
+
+    def outcome(self) -> T:
+        if self.result is None and self.error is not None:
+            raise self.error
+        return self.result
+
+
+def run_hedged(
+    primary_key: str,
+    primary: Callable[[threading.Event], T],
+    backup_key: str,
+    backup: Callable[[threading.Event], T],
+    *,
+    hedge: bool = True,
+    fallback_on_failure: bool = True,
+) -> T:
+    """
+    执行 primary，超过该端点最近耗时的分位数（PPT_HEDGE_PERCENTILE）仍未返回时再发起 backup，
+    先返回有效（非空）结果的一方获胜，另一方的 cancelled 事件会被置位以便尽早结束。
+    primary 失败或返回空结果且尚未发起 backup 时，fallback_on_failure 为 True 则立即改用 backup。
+
+    Args:
+        primary_key / backup_key: 端点标识，用于统计各自的耗时分布
+        primary / backup: 接收一个 threading.Event，被置位时应尽快放弃请求
+        hedge: 是否按耗时分位数发起对冲请求
+        fallback_on_failure: primary 失败时是否改用 backup
+    """
+    call = _HedgedCall(primary_key, primary, backup_key, backup, hedge, fallback_on_failure)
+    try:
+        while call.pending:
+            done, _ = wait(list(call.pending), timeout=call.timeout(), return_when=FIRST_COMPLETED)
+            if not done:
+                call.start_hedge()
+                continue
+            won, value = call.collect(done)
+            if won:
+                return value
+    finally:
+        call.close()
+    return call.outcome()
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    if not future.cancelled():
+        future.exception()
+
+
+async def run_hedged_async(
+    primary_key: str,
+    primary: Callable[[threading.Event], T],
+    backup_key: str,
+    backup: Callable[[threading.Event], T],
+    *,
+    hedge: bool = True,
+    fallback_on_failure: bool = True,
+) -> T:
+    """run_hedged 的异步版本，参数相同；等待期间不占用 I/O 线程池，协程被取消时两个请求都会被要求尽快结束"""
+    call = _HedgedCall(primary_key, primary, backup_key, backup, hedge, fallback_on_failure)
+    wrapped: Dict[Future, asyncio.Future] = {}
+    try:
+        while call.pending:
+            for future in call.pending:
+                if future not in wrapped:
+                    wrapped[future] = asyncio.wrap_future(future)
+                    # 结果和异常由 collect 从原 Future 读取，落败请求可能在返回后才失败，避免事件循环报告未读取的异常
+                    wrapped[future].add_done_callback(_consume_exception)
+            waiting = {wrapped[future]: future for future in call.pending}
+            done, _ = await asyncio.wait(
+                waiting, timeout=call.timeout(), return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                call.start_hedge()
+                continue
+            won, value = call.collect([waiting[task] for task in done])
+            if won:
+                return value
+    finally:
+        call.close()
+    return call.outcome()
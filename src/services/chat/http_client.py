@@ -0,0 +1,118 @@
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import config.base_config as base_config
+from config.logging_config import logger
+
+
+
+class _PooledSession:
+    """共享 Session 及其使用计数，被替换后等最后一个进行中的请求结束再关闭"""
+
+    def __init__(self, pool_size: int):
+        self.pool_size = pool_size
+        self.session = _build_session(pool_size)
+        self.in_use = 0
+        self.retired = False
+
+
+# (api_type, api_url) -> _PooledSession
+_sessions: Dict[Tuple[str, str], _PooledSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def _get_pool_size() -> int:
+    """连接池大小，未单独配置时与 PPT 并发数保持一致"""
+    pool_size = base_config.LLM_HTTP_POOL_SIZE or base_config.PPT_API_LIMIT
+    return max(int(pool_size), 1)
+
+
+def _build_session(pool_size: int) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+@contextmanager
+def use_session(llm_config: base_config.LLMConfig) -> Iterator[requests.Session]:
+    """
+    在 with 代码块内使用 LLMConfig 对应的共享连接池 Session（线程安全），流式请求需在代码块内读完响应
+    同一 api_url 的请求复用 TCP/TLS 连接，连接池大小变化时重建 Session，
+    旧 Session 在仍在使用它的请求全部结束后关闭，释放其中的连接
+    """
+    key = (llm_config.api_type.lower(), llm_config.api_url.rstrip("/"))
+    pool_size = _get_pool_size()
+    with _sessions_lock:
+        pooled = _sessions.get(key)
+        if pooled is None or pooled.pool_size != pool_size:
+            if pooled is not None:
+                logger.info(f"LLM 连接池大小变化 {pooled.pool_size} -> {pool_size}，重建连接池: {key[1]}")
+                _retire(pooled)
+            pooled = _PooledSession(pool_size)
+            _sessions[key] = pooled
+        pooled.in_use += 1
+    try:
+        yield pooled.session
+    finally:
+        with _sessions_lock:
+            pooled.in_use -= 1
+            if pooled.retired and pooled.in_use == 0:
+                pooled.session.close()
+
+
+def _retire(pooled: _PooledSession) -> None:
+    """标记 Session 已被替换，没有进行中的请求时立即关闭（需持有 _sessions_lock）"""
+    pooled.retired = True
+    if pooled.in_use == 0:
+        pooled.session.close()
+
+
+def get_timeout() -> Tuple[int, int]:
+    """返回 (连接超时, 读取超时)，单位秒"""
+    return base_config.LLM_CONNECT_TIMEOUT, base_config.LLM_READ_TIMEOUT
+
+
+def get_pool_stats() -> list[dict]:
+    """
+    统计各连接池的命中情况
+    misses 为新建连接次数，hits 为复用已有连接的请求次数
+    """
+    with _sessions_lock:
+        items = list(_sessions.items())
+    stats = []
+    for (api_type, api_url), pooled in items:
+        pool_size, session = pooled.pool_size, pooled.session
+        total_requests = 0
+        new_connections = 0
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for pool_key in list(pools.keys()):
+                pool = pools.get(pool_key)
+                if pool is None:
+                    continue
+                total_requests += pool.num_requests
+                new_connections += pool.num_connections
+        hits = max(total_requests - new_connections, 0)
+        stats.append(
+            {
+                "api_type": api_type,
+                "api_url": api_url,
+                "pool_size": pool_size,
+                "requests": total_requests,
+                "hits": hits,
+                "misses": new_connections,
+                "hit_rate": round(hits / total_requests, 4) if total_requests else 0.0,
+            }
+        )
+    return stats
@@ -0,0 +1,210 @@
+import json
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import config.base_config as base_config
+from config.logging_config import logger
+from src.utils import retry_policy
+
+# 支持配置多个端点的模型角色，对应 base_config 中的 <ROLE>_ENDPOINTS
+BALANCED_ROLES = ("OUTLINE", "PPT", "PIC")
+STRATEGY_LEAST_OUTSTANDING = "least_outstanding"
+STRATEGY_WEIGHTED_ROUND_ROBIN = "weighted_round_robin"
+
+
+def parse_endpoints(raw: str, primary: base_config.LLMConfig) -> list[Tuple[base_config.LLMConfig, int]]:
+    """
+    解析 <ROLE>_ENDPOINTS 配置（JSON 列表），未填写的字段沿用该角色的主配置
+    例如 [{"api_key": "sk-2", "weight": 2}, {"api_url": "https://proxy/v1", "model": "m"}]
+    返回 [(LLMConfig, weight)]，格式错误时抛出 ValueError
+    """
+    if not raw or not raw.strip():
+        return []
+    try:
+        items = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"端点列表不是合法的 JSON: {e}") from e
+    if not isinstance(items, list):
+        raise ValueError("端点列表需要为 JSON 数组")
+    endpoints = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError("端点列表中的每一项需要为 JSON 对象")
+        try:
+            weight = int(item.get("weight", 1))
+        except (TypeError, ValueError) as e:
+            raise ValueError("端点权重需要为整数") from e
+        config = base_config.LLMConfig(
+            name=str(item.get("model") or primary.name),
+            api_key=str(item.get("api_key") or primary.api_key),
+            api_url=str(item.get("api_url") or primary.api_url),
+            api_type=str(item.get("api_type") or primary.api_type),
+        )
+        endpoints.append((config, max(weight, 1)))
+    return endpoints
+
+
+class Endpoint:
+    def __init__(self, role: str, config: base_config.LLMConfig, weight: int):
+        self.role = role
+        self.config = config
+        self.weight = weight
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.total_latency_ms = 0
+        # 平滑加权轮询的当前权重
+        self.current_weight = 0
+
+    @property
+    def healthy(self) -> bool:
+        return retry_policy.get_breaker(self.config.endpoint_id).is_available()
+
+    def stats(self) -> dict:
+        succeeded = self.requests - self.outstanding - self.failures
+        return {
+            "role": self.role,
+            "endpoint": self.config.endpoint_id,
+            "model": self.config.name,
+            "weight": self.weight,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "avg_latency_ms": self.total_latency_ms // succeeded if succeeded > 0 else 0,
+        }
+
+
+class EndpointPool:
+    """
+    同一角色的多个端点，按 LLM_BALANCE_STRATEGY 选择：
+    least_outstanding 选择进行中请求数 / 权重最小的端点，weighted_round_robin 按权重平滑轮询。
+    熔断中的端点会被摘除，全部熔断时仍按策略选择，由熔断器决定快速失败还是放行试探请求
+    """
+
+    def __init__(self, role: str, endpoints: list[Tuple[base_config.LLMConfig, int]]):
+        self.role = role
+        self._lock = threading.Lock()
+        merged: Dict[str, Endpoint] = {}
+        for config, weight in endpoints:
+            endpoint = merged.get(config.endpoint_id)
+            if endpoint is None:
+                merged[config.endpoint_id] = Endpoint(role, config, weight)
+            else:
+                endpoint.weight += weight
+        self.endpoints = list(merged.values())
+        # 端点使用了不同的模型时，不同端点的回复不能互相替代
+        self.mixed_models = (
+            len({(endpoint.config.api_type.lower(), endpoint.config.name) for endpoint in self.endpoints}) > 1
+        )
+
+    def _select_round_robin(self, candidates: list[Endpoint]) -> Endpoint:
+        total = sum(endpoint.weight for endpoint in candidates)
+        for endpoint in candidates:
+            endpoint.current_weight += endpoint.weight
+        chosen = max(candidates, key=lambda endpoint: endpoint.current_weight)
+        chosen.current_weight -= total
+        return chosen
+
+    def pick(self) -> Endpoint:
+        with self._lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint.healthy]
+            if not candidates:
+                candidates = self.endpoints
+            if base_config.LLM_BALANCE_STRATEGY == STRATEGY_WEIGHTED_ROUND_ROBIN:
+                chosen = self._select_round_robin(candidates)
+            else:
+                chosen = min(
+                    candidates,
+                    key=lambda endpoint: (
+                        endpoint.outstanding / endpoint.weight,
+                        endpoint.requests / endpoint.weight,
+                    ),
+                )
+            chosen.outstanding += 1
+            chosen.requests += 1
+            return chosen
+
+    def release(self, endpoint: Endpoint, response) -> None:
+        with self._lock:
+            endpoint.outstanding -= 1
+            if response:
+                endpoint.total_latency_ms += getattr(response, "latency_ms", 0)
+            else:
+                endpoint.failures += 1
+
+    def stats(self) -> list[dict]:
+        with self._lock:
+            return [endpoint.stats() for endpoint in self.endpoints]
+
+
+_pools: Dict[str, Tuple[tuple, EndpointPool]] = {}
+_pools_lock = threading.Lock()
+
+
+def _role_of(llm_config: base_config.LLMConfig) -> Optional[str]:
+    for role in BALANCED_ROLES:
+        if base_config.LLM_CONFIG_OBJECTS[role] is llm_config:
+            return role
+    return None
+
+
+def get_pool(llm_config: base_config.LLMConfig) -> Optional[EndpointPool]:
+    """llm_config 为某个角色的主配置且该角色配置了额外端点时返回端点池，否则返回 None"""
+    role = _role_of(llm_config)
+    if role is None:
+        return None
+    raw = getattr(base_config, f"{role}_ENDPOINTS", "")
+    if not raw:
+        return None
+    # 配置在运行时可能被修改，主配置或端点列表变化后重建端点池
+    signature = (raw, llm_config.endpoint_id, llm_config.api_type)
+    with _pools_lock:
+        cached = _pools.get(role)
+        if cached and cached[0] == signature:
+            return cached[1]
+        try:
+            extra = parse_endpoints(raw, llm_config)
+        except ValueError as e:
+            logger.error(f"{role}_ENDPOINTS 配置无效，仅使用主配置: {e}")
+            extra = []
+        pool = EndpointPool(role, [(llm_config, 1)] + extra)
+        _pools[role] = (signature, pool)
+        logger.info(f"{role} 模型共 {len(pool.endpoints)} 个端点参与负载均衡")
+        if pool.mixed_models:
+            logger.warning(f"{role} 的端点使用了不同的模型，该角色不使用 LLM 缓存，也不合并相同的请求")
+        return pool
+
+
+def mixed_models(llm_config: base_config.LLMConfig) -> bool:
+    """llm_config 所属角色的端点是否使用了不同的模型（api_type 或 model 不同）"""
+    pool = get_pool(llm_config)
+    return pool is not None and pool.mixed_models
+
+
+def balanced_call(
+    llm_config: base_config.LLMConfig,
+    request: Callable[[base_config.LLMConfig], str],
+) -> Tuple[base_config.LLMConfig, str]:
+    """选择一个端点执行 request，返回 (实际使用的端点配置, 回复)"""
+    pool = get_pool(llm_config)
+    if pool is None:
+        return llm_config, request(llm_config)
+    endpoint = pool.pick()
+    response = ""
+    try:
+        response = request(endpoint.config)
+        return endpoint.config, response
+    finally:
+        pool.release(endpoint, response)
+
+
+def get_endpoint_stats() -> list[dict]:
+    """已配置额外端点的角色中各端点的负载与健康状态"""
+    pools = [get_pool(base_config.LLM_CONFIG_OBJECTS[role]) for role in BALANCED_ROLES]
+    return [stats for pool in pools if pool is not None for stats in pool.stats()]
@@ -1,37 +1,30 @@
-import requests
+import json
 import sys
+import time
 from pathlib import Path
+from typing import Optional
 
 project_root = Path(__file__).parent.parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 import config.base_config as base_config
 from config.logging_config import logger
-from src.utils.help_utils import retry_on_failure
+from src.utils.help_utils import retry_on_failure, StreamHandler
+from src.services.chat.http_client import get_timeout, use_session
+from src.services.chat.rate_limiter import estimate_tokens, rate_limited
+from src.services.chat.chat_response import ChatResponse, parse_openai_usage
+from src.utils.retry_policy import http_error
 
+# 提前结束流式响应后，为了拿到最后的 usage 数据块，最多再读取的字符数
+STREAM_USAGE_DRAIN_CHARS = 64
 
-@retry_on_failure(max_attempts=3, delay=1, description="调用OpenAI格式LLM")
-def chat_openai(
-    images_base64: list[str] = [],
-    prompt: str = "",
-    llm_config: base_config.LLMConfig = base_config.OUTLINE_LLM_CONFIG,
-) -> str:
-    """
-    调用OpenAI对话API，支持传入多个图片
 
-    Args:
-        api_key (str): OpenAI API密钥
-        base64_images (list): base64编码的图片列表
-        prompt (str): 用户的文本提示
-        model (str): 使用的模型名称
+def _endpoint(llm_config: base_config.LLMConfig, **_) -> str:
+    """熔断按 API 地址 + 模型 + Key 区分"""
+    return llm_config.endpoint_id
 
-    Returns:
-        str: AI的回复内容
-    """
-    model = llm_config.name
-    api_key = llm_config.api_key
-    api_url = llm_config.api_url
 
+def _build_payload(images_base64: list[str], prompt: str, model: str) -> dict:
     if images_base64:
         # 构建消息内容
         content = []
@@ -49,32 +42,157 @@ def chat_openai(
             )
 
         # 构建请求载荷
-        payload = {
+        return {
             "model": model,
             "messages": [{"role": "user", "content": content}],
         }
-    else:
-        # 构建请求载荷
-        payload = {
-            "model": model,
-            "messages": [{"role": "user", "content": prompt}],
-        }
+    # 构建请求载荷
+    return {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+
+
+@retry_on_failure(max_attempts=3, delay=1, description="调用OpenAI格式LLM", endpoint=_endpoint)
+def chat_openai(
+    images_base64: list[str] = [],
+    prompt: str = "",
+    llm_config: base_config.LLMConfig = base_config.OUTLINE_LLM_CONFIG,
+) -> str:
+    """
+    调用OpenAI对话API，支持传入多个图片
+
+    Args:
+        api_key (str): OpenAI API密钥
+        base64_images (list): base64编码的图片列表
+        prompt (str): 用户的文本提示
+        model (str): 使用的模型名称
+
+    Returns:
+        str: AI的回复内容
+    """
+    payload = _build_payload(images_base64, prompt, llm_config.name)
     # print(payload)
     # 设置请求头
-    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"}
-    completions_url = f"{api_url}/chat/completions"
+    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {llm_config.api_key}"}
+    completions_url = f"{llm_config.api_url}/chat/completions"
     response = None
     try:
-        # 发送请求
-        response = requests.post(
-            completions_url, headers=headers, json=payload, timeout=600
-        )
+        # 发送请求，超出端点限额时在限流器上排队等待
+        with (
+            rate_limited(llm_config, estimate_tokens(prompt, images_base64)) as waited,
+            use_session(llm_config) as session,
+        ):
+            started = time.monotonic()
+            response = session.post(
+                completions_url, headers=headers, json=payload, timeout=get_timeout()
+            )
         response.raise_for_status()
         result = response.json()
-        return result["choices"][0]["message"]["content"]
+        return ChatResponse(
+            result["choices"][0]["message"]["content"],
+            usage=parse_openai_usage(result.get("usage")),
+            latency_ms=int((time.monotonic() - started) * 1000),
+            ttfb_ms=int(response.elapsed.total_seconds() * 1000),
+            queue_ms=int(waited * 1000),
+        )
     except Exception as e:
         # logger.info(f"API调用失败: {response.status_code} - {response.text}")
-        raise Exception(f"API调用失败: {response.status_code if response else 'None'} - 响应内容: {response.text if response else 'None'} - 错误信息{e}")
+        raise http_error(
+            response,
+            f"API调用失败: {response.status_code if response is not None else 'None'} - 响应内容: {response.text if response is not None else 'None'} - 错误信息{e}",
+        ) from e
+
+
+@retry_on_failure(max_attempts=3, delay=1, description="流式调用OpenAI格式LLM", endpoint=_endpoint)
+def chat_openai_stream(
+    images_base64: list[str] = [],
+    prompt: str = "",
+    llm_config: base_config.LLMConfig = base_config.OUTLINE_LLM_CONFIG,
+    stream_handler: Optional[StreamHandler] = None,
+) -> str:
+    """
+    以 SSE 流式调用OpenAI对话API
+
+    Args:
+        stream_handler (StreamHandler): 每次请求开始时调用 reset()，每收到一段增量文本调用 feed()，
+            feed() 返回 True 后不再接收内容，仅在剩余内容很短时继续读取以获得 usage
+
+    Returns:
+        ChatResponse: 截至流结束（或被提前关闭）时收到的全部回复内容
+    """
+    payload = _build_payload(images_base64, prompt, llm_config.name)
+    payload["stream"] = True
+    # 在最后一个数据块中返回 usage
+    payload["stream_options"] = {"include_usage": True}
+    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {llm_config.api_key}"}
+    completions_url = f"{llm_config.api_url}/chat/completions"
+    response = None
+    chunks = []
+    usage = {}
+    ttfb = 0.0
+    if stream_handler:
+        stream_handler.reset()
+    try:
+        # 流式请求在整个读取过程中占用一个进行中名额
+        with (
+            rate_limited(llm_config, estimate_tokens(prompt, images_base64)) as waited,
+            use_session(llm_config) as session,
+        ):
+            started = time.monotonic()
+            response = session.post(
+                completions_url,
+                headers=headers,
+                json=payload,
+                timeout=get_timeout(),
+                stream=True,
+            )
+            response.raise_for_status()
+            # SSE 响应通常不带 charset，requests 会按 ISO-8859-1 解码
+            response.encoding = "utf-8"
+            drained_chars = -1
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                event = json.loads(data)
+                if event.get("usage"):
+                    usage = parse_openai_usage(event["usage"])
+                choices = event.get("choices") or []
+                if not choices:
+                    continue
+                delta = (choices[0].get("delta") or {}).get("content") or ""
+                if not delta:
+                    continue
+                if drained_chars >= 0:
+                    # 已经拿到所需内容，只等待 usage，剩余内容过长时直接关闭
+                    drained_chars += len(delta)
+                    if drained_chars > STREAM_USAGE_DRAIN_CHARS:
+                        logger.info("已提前关闭 LLM 流式响应")
+                        break
+                    continue
+                if not chunks:
+                    ttfb = time.monotonic() - started
+                chunks.append(delta)
+                if stream_handler and stream_handler.feed(delta):
+                    drained_chars = 0
+        return ChatResponse(
+            "".join(chunks),
+            usage=usage,
+            latency_ms=int((time.monotonic() - started) * 1000),
+            ttfb_ms=int(ttfb * 1000),
+            queue_ms=int(waited * 1000),
+        )
+    except Exception as e:
+        raise http_error(
+            response,
+            f"API调用失败: {response.status_code if response is not None else 'None'} - 已接收内容长度: {sum(len(c) for c in chunks)} - 错误信息{e}",
+        ) from e
+    finally:
+        if response is not None:
+            response.close()
 
 
 if __name__ == "__main__":
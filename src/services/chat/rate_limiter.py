@@ -0,0 +1,149 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict
+
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import config.base_config as base_config
+from config.logging_config import logger
+
+# 单张图片按固定 token 数估算
+IMAGE_TOKEN_ESTIMATE = 1000
+
+
+def estimate_tokens(prompt: str, images_base64: list[str] | None = None) -> int:
+    """粗略估算请求消耗的 token 数（中文约 1 字 1 token，英文约 4 字符 1 token，取折中值）"""
+    return len(prompt) // 2 + IMAGE_TOKEN_ESTIMATE * len(images_base64 or [])
+
+
+class EndpointRateLimiter:
+    """
+    单个 LLM 端点（api_url + model + api_key）的令牌桶限流器，线程安全
+    同时限制每分钟请求数、每分钟 token 数和同时进行中的请求数，限额为 0 表示不限制
+    """
+
+    def __init__(self, llm_config: base_config.LLMConfig):
+        self.key = llm_config.endpoint_id
+        self.api_url = llm_config.api_url.rstrip("/")
+        self.model = llm_config.name
+        self._cond = threading.Condition()
+        now = time.monotonic()
+        self._request_tokens = float(base_config.LLM_RPM_LIMIT)
+        self._token_tokens = float(base_config.LLM_TPM_LIMIT)
+        self._last_refill = now
+        self._in_flight = 0
+        self._waiting = 0
+        self._acquired = 0
+        self._waited = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _refill(self, rpm: int, tpm: int) -> None:
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if rpm > 0:
+            self._request_tokens = min(rpm, self._request_tokens + elapsed * rpm / 60)
+        if tpm > 0:
+            self._token_tokens = min(tpm, self._token_tokens + elapsed * tpm / 60)
+
+    def _wait_seconds(self, rpm: int, tpm: int, max_in_flight: int, tokens: int) -> float:
+        """返回还需等待的秒数，0 表示可以立即发出请求"""
+        if max_in_flight > 0 and self._in_flight >= max_in_flight:
+            # 等待其他请求完成时被唤醒
+            return 1.0
+        wait = 0.0
+        if rpm > 0 and self._request_tokens < 1:
+            wait = max(wait, (1 - self._request_tokens) * 60 / rpm)
+        if tpm > 0:
+            # 单次请求超过桶容量时按满桶计算，避免永远等待
+            needed = min(tokens, tpm)
+            if self._token_tokens < needed:
+                wait = max(wait, (needed - self._token_tokens) * 60 / tpm)
+        return wait
+
+    def acquire(self, tokens: int) -> float:
+        """阻塞直到允许发出请求，返回等待时长（秒）"""
+        started = time.monotonic()
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    rpm = base_config.LLM_RPM_LIMIT
+                    tpm = base_config.LLM_TPM_LIMIT
+                    max_in_flight = base_config.LLM_MAX_IN_FLIGHT
+                    self._refill(rpm, tpm)
+                    wait = self._wait_seconds(rpm, tpm, max_in_flight, tokens)
+                    if wait <= 0:
+                        break
+                    self._cond.wait(timeout=wait)
+            finally:
+                self._waiting -= 1
+            if base_config.LLM_RPM_LIMIT > 0:
+                self._request_tokens -= 1
+            if base_config.LLM_TPM_LIMIT > 0:
+                self._token_tokens -= tokens
+            self._in_flight += 1
+            waited = time.monotonic() - started
+            self._acquired += 1
+            if waited > 0.001:
+                self._waited += 1
+                self._total_wait += waited
+                self._max_wait = max(self._max_wait, waited)
+        if waited > 1:
+            logger.info(f"LLM 请求限流等待 {waited:.1f} 秒: {self.api_url} ({self.model})")
+        return waited
+
+    def release(self) -> None:
+        with self._cond:
+            self._in_flight = max(self._in_flight - 1, 0)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "endpoint": self.key,
+                "api_url": self.api_url,
+                "model": self.model,
+                "queue_depth": self._waiting,
+                "in_flight": self._in_flight,
+                "acquired": self._acquired,
+                "waited": self._waited,
+                "avg_wait_seconds": round(self._total_wait / self._waited, 3) if self._waited else 0.0,
+                "max_wait_seconds": round(self._max_wait, 3),
+            }
+
+
+_limiters: Dict[str, EndpointRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(llm_config: base_config.LLMConfig) -> EndpointRateLimiter:
+    key = llm_config.endpoint_id
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = EndpointRateLimiter(llm_config)
+            _limiters[key] = limiter
+        return limiter
+
+
+@contextmanager
+def rate_limited(llm_config: base_config.LLMConfig, tokens: int):
+    """在进程级限流器上排队，获得许可后执行请求，as 目标为排队等待的秒数"""
+    limiter = get_limiter(llm_config)
+    waited = limiter.acquire(tokens)
+    try:
+        yield waited
+    finally:
+        limiter.release()
+
+
+def get_limiter_stats() -> list[dict]:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [limiter.stats() for limiter in limiters]
@@ -1,4 +1,5 @@
 import base64
+import copy
 import os
 from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
@@ -14,6 +15,7 @@ project_root = Path(__file__).parent.parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 from services.search.searxng_provider import search_searxng
+from src.utils import single_flight
 from src.utils.help_utils import download_image
 from config.logging_config import logger
 import config.base_config as base_config
@@ -21,6 +23,9 @@ import config.base_config as base_config
 MAX_RETRIES = 3
 IMG_PATH = "data/images"
 
+_search_flights = single_flight.get_group("searxng")
+_image_search_flights = single_flight.get_group("image_search")
+
 
 class ImageInfo:
     """图片信息类"""
@@ -126,7 +131,7 @@ def image_search(
     img_base_path: str = str(project_root / "data" / "images"),
 ) -> dict:
     """
-    图片搜索主函数
+    图片搜索主函数，参数相同的并发调用只执行一次
 
     Args:
         query: 搜索关键词
@@ -136,6 +141,17 @@ def image_search(
     Returns:
         dict: 包含图片信息的字典
     """
+    key = (query, pic_num_limit, tuple(time_page), img_base_path)
+    img_info_dict, shared = _image_search_flights.do(
+        key, lambda: _image_search(query, pic_num_limit, time_page, img_base_path)
+    )
+    if shared:
+        # 调用方会写入图片描述，复用的结果需要各自持有一份
+        return {path: copy.copy(info) for path, info in img_info_dict.items()}
+    return img_info_dict
+
+
+def _image_search(query, pic_num_limit, time_page, img_base_path) -> dict:
     os.makedirs(IMG_PATH, exist_ok=True)
     img_info_dict_temp = {}
     img_info_dict = {}
@@ -143,7 +159,10 @@ def image_search(
     # 需要排除的域名列表
     BLOCKED_DOMAINS = {"www.artic.edu"}
 
-    results = search_searxng(query=query, images_search=True)
+    # 不同项目搜索相同关键词时共用一次 SearXNG 请求
+    results, _ = _search_flights.do(
+        query, lambda: search_searxng(query=query, images_search=True)
+    )
     results = results[:pic_num_limit]
 
     for i, result in enumerate(results):
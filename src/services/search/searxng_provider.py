@@ -11,9 +11,15 @@ sys.path.insert(0, str(project_root))
 import config.base_config as base_config
 from config.logging_config import logger
 from src.utils.help_utils import retry_on_failure
+from src.utils.retry_policy import http_error
 
 
-@retry_on_failure(max_attempts=3, delay=2, description="进行Searxng搜索")
+@retry_on_failure(
+    max_attempts=3,
+    delay=2,
+    description="进行Searxng搜索",
+    endpoint=lambda **_: base_config.SEARXNG_URL,
+)
 def search_searxng(
     query, language="zh-cn", time_page=[0, 0, 0], images_search=False
 ) -> list:
@@ -68,9 +74,10 @@ def search_searxng(
 
     except Exception as e:
         logger.debug(f"搜索关键词 '{query}' 时发生错误: {str(e)}. ")
-        raise Exception(
-            f"搜索关键词 '{query}' 时发生错误: {str(e)}. 响应内容: {response.text if response else 'None'} 错误信息: {e}"
-        )
+        raise http_error(
+            response,
+            f"搜索关键词 '{query}' 时发生错误: {str(e)}. 响应内容: {response.text if response is not None else 'None'} 错误信息: {e}",
+        ) from e
 
 
 # 当脚本直接运行时执行测试代码
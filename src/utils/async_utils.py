@@ -0,0 +1,121 @@
+import asyncio
+import contextvars
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Coroutine, Optional
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import config.base_config as base_config
+from config.logging_config import logger
+
+_io_executor: Optional[ThreadPoolExecutor] = None
+_io_executor_size = 0
+_io_executor_lock = threading.Lock()
+
+_engine_loop: Optional[asyncio.AbstractEventLoop] = None
+_engine_loop_lock = threading.Lock()
+
+
+def _get_io_executor() -> ThreadPoolExecutor:
+    """
+    进程内共享的阻塞 I/O 线程池，大小由 ASYNC_ENGINE_MAX_LLM_CALLS 决定。
+    LLM 与搜索请求仍是阻塞的 HTTP 调用，每个进行中的请求占用一个线程，因此异步引擎的实际并发受该线程数限制；
+    对冲请求（run_hedged_async）在 hedge 线程池中执行并由事件循环直接等待，不占用这里的线程。
+    """
+    global _io_executor, _io_executor_size
+    size = max(int(base_config.ASYNC_ENGINE_MAX_LLM_CALLS), 1)
+    with _io_executor_lock:
+        if _io_executor is None or _io_executor_size != size:
+            if _io_executor is not None:
+                _io_executor.shutdown(wait=False)
+            _io_executor = ThreadPoolExecutor(
+                max_workers=size, thread_name_prefix="ezppt-io"
+            )
+            _io_executor_size = size
+        return _io_executor
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """在共享 I/O 线程池中执行阻塞函数，并带上当前协程的 contextvars（如 LLM 调用上下文）"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _get_io_executor(), partial(context.run, func, *args, **kwargs)
+    )
+
+
+def _run_engine_loop(loop: asyncio.AbstractEventLoop) -> None:
+    asyncio.set_event_loop(loop)
+    loop.run_forever()
+
+
+def get_engine_loop() -> asyncio.AbstractEventLoop:
+    """获取（必要时启动）后台常驻的生成引擎事件循环，所有异步项目共用这一个循环"""
+    global _engine_loop
+    with _engine_loop_lock:
+        if _engine_loop is None or _engine_loop.is_closed():
+            _engine_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_run_engine_loop,
+                args=(_engine_loop,),
+                name="ezppt-engine-loop",
+                daemon=True,
+            ).start()
+            logger.info("异步生成引擎事件循环已启动")
+        return _engine_loop
+
+
+async def to_thread_shielded(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    与 asyncio.to_thread 相同，但协程被取消时先等待线程中的调用执行完再抛出 CancelledError，
+    用于写文件、写数据库等操作：取消只会中断 await，线程仍会继续执行，不等待的话任务结束后还可能发生写入
+    """
+    task = asyncio.ensure_future(asyncio.to_thread(func, *args, **kwargs))
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        await asyncio.wait({task})
+        raise
+
+
+async def _run_in_context(
+    coro: Coroutine, context: contextvars.Context, finished: threading.Event
+) -> Any:
+    """在引擎事件循环的任务中恢复提交方的 contextvars（如取消令牌）后执行协程，结束（包括被取消）后置位 finished"""
+    try:
+        for var, value in context.items():
+            var.set(value)
+        return await coro
+    finally:
+        finished.set()
+
+
+def submit_to_engine(coro: Coroutine, description: str = ""):
+    """
+    将协程提交到生成引擎事件循环，立即返回 concurrent.futures.Future
+    协程在提交方的 contextvars 中运行，取消返回的 Future 会取消协程。
+    取消后 Future 立即完成，协程仍在执行取消后的清理，返回的 Future 带有 finished 属性（threading.Event），
+    协程真正结束时置位
+    """
+    finished = threading.Event()
+    future = asyncio.run_coroutine_threadsafe(
+        _run_in_context(coro, contextvars.copy_context(), finished), get_engine_loop()
+    )
+    future.finished = finished
+
+    def _log_result(fut):
+        if fut.cancelled():
+            logger.info(f"{description} 异步任务已取消")
+            return
+        try:
+            fut.result()
+        except Exception as e:  # pylint: disable=broad-except
+            logger.error(f"{description} 异步任务失败: {e}")
+
+    future.add_done_callback(_log_result)
+    return future
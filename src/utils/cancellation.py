@@ -0,0 +1,160 @@
+"""
+生成与导出任务的协作式取消
+
+每个任务执行时通过 cancellation_scope 创建一个取消令牌并放入 contextvars，
+全局任务池、对冲请求和异步引擎都会带上提交方的上下文，因此同一任务派生出的线程和协程共用这个令牌。
+代码在幻灯片之间、各阶段之间、LLM 重试之前以及流式输出的每个片段处调用 check()，
+令牌被取消后抛出 GenerationCancelled，尽快停止消耗 token 和 CPU。
+"""
+
+import asyncio
+import contextvars
+import sys
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterator, Optional, Set, TypeVar
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from config.logging_config import logger
+
+T = TypeVar("T")
+
+
+class GenerationCancelled(Exception):
+    """任务已被取消（项目被删除、重新生成、手动取消或 worker 失去租约）"""
+
+
+class CancellationToken:
+    def __init__(self, project_id: str = ""):
+        self.project_id = project_id
+        self.reason = ""
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: list[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "") -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning(f"执行取消回调时出错: {exc}")
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise GenerationCancelled(self.reason or f"项目 {self.project_id} 的任务已取消")
+
+    def add_callback(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """取消时调用 callback（已取消则立即调用），返回用于移除回调的函数"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove_callback(callback)
+        callback()
+        return lambda: None
+
+    def _remove_callback(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+_current: contextvars.ContextVar[Optional[CancellationToken]] = contextvars.ContextVar(
+    "ezppt_cancellation_token", default=None
+)
+_tokens: Dict[str, Set[CancellationToken]] = defaultdict(set)
+_tokens_lock = threading.Lock()
+# 取消作用域结束时通知等待任务退出的一方（删除、重新生成项目）
+_scope_exited = threading.Condition(_tokens_lock)
+
+
+@contextmanager
+def cancellation_scope(project_id: str) -> Iterator[CancellationToken]:
+    """为一次任务执行创建取消令牌，作用域内（及其派生的任务）可以通过 check() 检查"""
+    token = CancellationToken(project_id)
+    with _tokens_lock:
+        _tokens[project_id].add(token)
+    reset = _current.set(token)
+    try:
+        yield token
+    finally:
+        _current.reset(reset)
+        with _tokens_lock:
+            _tokens[project_id].discard(token)
+            if not _tokens[project_id]:
+                del _tokens[project_id]
+            _scope_exited.notify_all()
+
+
+def current_token() -> Optional[CancellationToken]:
+    return _current.get()
+
+
+def check() -> None:
+    """当前任务已被取消时抛出 GenerationCancelled，不在任务中调用时什么都不做"""
+    token = _current.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+def on_cancel(callback: Callable[[], None]) -> Callable[[], None]:
+    """当前任务被取消时调用 callback，返回用于移除回调的函数"""
+    token = _current.get()
+    if token is None:
+        return lambda: None
+    return token.add_callback(callback)
+
+
+def cancel_project(project_id: str, reason: str = "") -> int:
+    """取消本进程内该项目所有正在执行的任务，返回被取消的任务数"""
+    with _tokens_lock:
+        tokens = list(_tokens.get(project_id, ()))
+    for token in tokens:
+        token.cancel(reason or f"项目 {project_id} 的任务已取消")
+    if tokens:
+        logger.info(f"已取消项目 {project_id} 正在执行的 {len(tokens)} 个任务: {reason}")
+    return len(tokens)
+
+
+def wait_for_project(project_id: str, timeout: Optional[float] = None) -> bool:
+    """等待本进程内该项目的所有任务退出取消作用域（包括取消后的清理），超时返回 False"""
+    with _scope_exited:
+        return _scope_exited.wait_for(lambda: project_id not in _tokens, timeout)
+
+
+def find_cancelled(exc: Optional[BaseException]) -> Optional[GenerationCancelled]:
+    """在异常链中查找 GenerationCancelled（调用方可能把它包装成了其他异常）"""
+    while exc is not None:
+        if isinstance(exc, GenerationCancelled):
+            return exc
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+async def cancellable(awaitable: Awaitable[T]) -> T:
+    """在当前事件循环中等待 awaitable，任务被取消时立即取消它并抛出 GenerationCancelled"""
+    task = asyncio.ensure_future(awaitable)
+    loop = asyncio.get_running_loop()
+    remove = on_cancel(lambda: loop.call_soon_threadsafe(task.cancel))
+    try:
+        return await task
+    except asyncio.CancelledError:
+        token = _current.get()
+        if token is not None and token.cancelled:
+            token.raise_if_cancelled()
+        raise
+    finally:
+        remove()
@@ -1,9 +1,12 @@
 from functools import wraps
+import inspect
 import json
+from typing import Callable, Optional, Protocol
 import os
 from pathlib import Path
 import re
 import sys
+import threading
 from urllib.parse import urlparse
 from PIL import Image
 from io import BytesIO
@@ -16,6 +19,7 @@ project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 from config.logging_config import logger
+from src.utils import cancellation, retry_policy
 
 MAX_IMAGE_LEN = 100 * 1024 * 1024
 
@@ -68,54 +72,6 @@ def img2base64(filename_result: str) -> str:
         return ""
 
 
-def download_image(url: str, filename: str, url_bak: str = ""):
-    """
-    下载图片并返回文件名（如果文件已存在则不下载）
-    """
-    # 检查文件是否已存在
-    if os.path.exists(filename):
-        logger.info(f"文件已存在，跳过下载: {filename}")
-        return filename
-
-    referer_url = urlparse(str(url)).netloc
-    user_agents = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36 Edg/91.0.864.59"
-    file_size = 0
-    headers = {
-        "User-Agent": user_agents,
-        "Accept": "image/webp,image/apng,image/*,*/*;q=0.8",
-        "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-        "Referer": referer_url,
-        "Connection": "keep-alive",
-    }
-    try:
-        response = requests.get(url, headers=headers, timeout=15, stream=True)
-        content_length = response.headers.get("Content-Length")
-        if content_length:
-            file_size = int(content_length)
-        if file_size <= MAX_IMAGE_LEN:
-            response.raise_for_status()
-            with open(filename, "wb") as f:
-                downloaded_size = 0
-                for chunk in response.iter_content(chunk_size=819200):
-                    if downloaded_size <= MAX_IMAGE_LEN:
-                        downloaded_size += len(chunk)
-                        f.write(chunk)
-                    else:
-                        logger.info(f" {url} 文件过大,已停止下载")
-                        return None
-            logger.info(f"从 {url} 下载成功: {filename}")
-        else:
-            logger.info(f" {url} 文件过大,不进行下载")
-            return None
-    except requests.exceptions.RequestException as e:
-        logger.error(f"下载图片失败: {url} - 错误: {str(e)}")
-        if url_bak:
-            logger.info(f"尝试使用备用 URL: {url_bak}")
-            return download_image(url_bak, filename)
-        return None
-    return filename
-
-
 def response2list(llm_output: str) -> list:
     """
     从任意 LLM 输出中提取最长的 JSON 数组（支持嵌套）。
@@ -274,53 +230,286 @@ def extract_html(html_content: str) -> str:
     return html_content.strip()
 
 
+class StreamHandler(Protocol):
+    """流式 LLM 调用的增量回调协议"""
+
+    def reset(self) -> None:
+        """每次（重新）发起请求前调用，清空已接收的内容"""
+
+    def feed(self, chunk: str) -> bool:
+        """接收一段增量文本，返回 True 表示可以立即关闭流"""
+
+
+class HtmlStreamExtractor:
+    """
+    从流式输出中增量提取 HTML，在收到完整 HTML 文档的 </html> 时通知关闭流。
+    起始位置识别规则与 extract_html 一致：```html 代码块、<!DOCTYPE html> 或 <html 标签。
+    """
+
+    _START_MARKERS = ("```html", "<!doctype html", "<html")
+    _END_MARKER = "</html>"
+
+    def __init__(
+        self,
+        on_partial: Optional[Callable[[str], None]] = None,
+        partial_interval: float = 0.5,
+        cancelled: Optional[threading.Event] = None,
+    ):
+        """
+        Args:
+            on_partial: 收到新内容时回调当前已生成的部分 HTML（按 partial_interval 节流）
+            partial_interval: 两次 on_partial 回调之间的最小间隔（秒）
+            cancelled: 被置位后不再回调 on_partial，并通知关闭流（对冲请求中落败的一方）
+        """
+        self.on_partial = on_partial
+        self.partial_interval = partial_interval
+        self.cancelled = cancelled
+        self.reset()
+
+    def reset(self) -> None:
+        self._buffer = ""
+        self._scan_pos = 0
+        self._start = -1
+        self._end = -1
+        self._last_partial_time = 0.0
+
+    @property
+    def text(self) -> str:
+        """已接收的完整原始文本"""
+        return self._buffer
+
+    @property
+    def done(self) -> bool:
+        return self._end != -1
+
+    @property
+    def html(self) -> str:
+        """已提取的 HTML（未完成时为目前收到的部分）"""
+        if self._start == -1:
+            return ""
+        end = self._end if self._end != -1 else len(self._buffer)
+        content = self._buffer[self._start:end]
+        if self._end == -1:
+            # 去掉末尾尚未完整到达的代码块围栏
+            fence_pos = content.find("```")
+            if fence_pos != -1:
+                content = content[:fence_pos]
+        return content.strip()
+
+    def _locate_start(self, window_start: int) -> None:
+        lowered = self._buffer[window_start:].lower()
+        candidates = []
+        for marker in self._START_MARKERS:
+            idx = lowered.find(marker)
+            if idx != -1:
+                candidates.append((idx, marker))
+        if not candidates:
+            return
+        idx, marker = min(candidates)
+        start = window_start + idx
+        if marker == "```html":
+            # 跳过围栏本身，等待换行到达后再确定正文起点
+            newline_pos = self._buffer.find("\n", start)
+            if newline_pos == -1:
+                return
+            start = newline_pos + 1
+        self._start = start
+
+    def feed(self, chunk: str) -> bool:
+        # 所属任务被取消时抛出异常以中断流式请求，不再为没人需要的内容付费
+        cancellation.check()
+        if self.done or (self.cancelled is not None and self.cancelled.is_set()):
+            return True
+        self._buffer += chunk
+        # 标记可能跨越两段增量，回退一个标记长度重新扫描
+        window_start = max(self._scan_pos - len("<!doctype html"), 0)
+        if self._start == -1:
+            self._locate_start(window_start)
+        if self._start != -1:
+            search_from = max(window_start, self._start)
+            idx = self._buffer[search_from:].lower().find(self._END_MARKER)
+            if idx != -1:
+                self._end = search_from + idx + len(self._END_MARKER)
+        self._scan_pos = len(self._buffer)
+
+        if self.on_partial and self._start != -1:
+            now = time.monotonic()
+            if self.done or now - self._last_partial_time >= self.partial_interval:
+                self._last_partial_time = now
+                self.on_partial(self.html)
+        return self.done
+
+
 def time_name() -> str:
     # ts_str = datetime.now().strftime("%Y%m%d")  # 例如 20250907
     ts_str = datetime.now().strftime("%Y%m%d_%H%M%S")  # 例如 20250907_202903
     return ts_str
 
 
-def retry_on_failure(max_attempts=3, delay=1, description="", return_empty_on_fail=True):
+def _empty_value(func):
+    """根据函数的返回类型注解返回对应的空值"""
+    return_type = func.__annotations__.get('return', None)
+    if return_type == list or return_type == 'list':
+        return []
+    elif return_type == dict:
+        return {}
+    elif return_type == str:
+        return ""
+    elif return_type == tuple:
+        return ()
+    elif return_type == set:
+        return set()
+    elif return_type in (int, float):
+        return 0
+    elif return_type == bool:
+        return False
+    else:
+        # 默认返回 None
+        return None
+
+
+def retry_on_failure(
+    max_attempts=3,
+    delay=1,
+    description="",
+    return_empty_on_fail=True,
+    endpoint: Optional[Callable[..., str]] = None,
+):
+    """
+    失败重试装饰器，重试策略见 src/utils/retry_policy.py:
+    - 以 delay 为基数指数退避并加随机抖动，429/503 带 Retry-After 时按其等待
+    - 400/401/403/404 等不可重试的错误直接失败
+    - 传入 endpoint 时按其返回值（参数与被装饰函数相同）做熔断，熔断期间直接失败
+    - 所属任务被取消时不再重试，直接抛出 GenerationCancelled（即使 return_empty_on_fail 为 True）
+    """
+
     def decorator(func):
+        signature = inspect.signature(func)
+
         @wraps(func)
         def wrapper(*args, **kwargs):
+            breaker = None
+            if endpoint is not None:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                breaker = retry_policy.get_breaker(endpoint(**bound.arguments))
             for attempt in range(max_attempts):
+                cancellation.check()
+                probing = False
                 try:
-                    return func(*args, **kwargs)
+                    if breaker:
+                        probing = breaker.before_call()
+                    result = func(*args, **kwargs)
+                    if breaker:
+                        breaker.record_success()
+                    # 带有 retry_count 属性的返回值（如 ChatResponse）记录成功前的重试次数
+                    if attempt and hasattr(result, "retry_count"):
+                        result.retry_count = attempt
+                    return result
                 except Exception as e:
-                    if attempt < max_attempts - 1:
+                    cancelled = cancellation.find_cancelled(e)
+                    if cancelled is not None:
+                        # 被取消的试探请求没有结果，不释放的话端点会一直停留在等待试探结果的状态
+                        if probing:
+                            breaker.abort_probe()
+                        raise cancelled
+                    retryable = retry_policy.is_retryable(e)
+                    if breaker and not isinstance(e, retry_policy.CircuitOpenError):
+                        # 只有连接失败、超时、5xx/429 计入熔断，其余错误说明端点本身可以响应
+                        if retry_policy.is_endpoint_failure(e):
+                            breaker.record_failure()
+                        else:
+                            breaker.record_success()
+                    wait = retry_policy.backoff_delay(attempt, delay, e)
+                    if retryable and wait > retry_policy.MAX_RETRY_AFTER_SECONDS:
+                        logger.warning(f"{description} 服务端要求 {wait:.0f} 秒后重试，等待时间过长，不再重试")
+                        retryable = False
+                    if retryable and attempt < max_attempts - 1:
                         logger.warning(
-                            f"{description} 第 {attempt + 1} 次调用失败，{delay}秒后重试... 错误详情: {e}"
+                            f"{description} 第 {attempt + 1} 次调用失败，{wait:.1f}秒后重试... 错误详情: {e}"
                         )
-                        time.sleep(delay)
-                    else:
+                        time.sleep(wait)
+                        continue
+                    if retryable:
                         logger.error(
                             f"{description} 达到最大重试次数，调用失败，错误原因: {e}"
                         )
-                        if not return_empty_on_fail:
-                            raise e
-                        # 尝试从函数的类型注解中获取返回类型
-                        return_type = func.__annotations__.get('return', None)
-                        
-                        # 根据返回类型返回对应的空值
-                        if return_type == list or return_type == 'list':
-                            return []
-                        elif return_type == dict:
-                            return {}
-                        elif return_type == str:
-                            return ""
-                        elif return_type == tuple:
-                            return ()
-                        elif return_type == set:
-                            return set()
-                        elif return_type in (int, float):
-                            return 0
-                        elif return_type == bool:
-                            return False
-                        else:
-                            # 默认返回 None
-                            return None
+                    else:
+                        logger.error(f"{description} 调用失败且不可重试，错误原因: {e}")
+                    if not return_empty_on_fail:
+                        raise e
+                    return _empty_value(func)
 
         return wrapper
 
     return decorator
+
+
+def _image_host(url: str, **_) -> str:
+    """图片下载按域名熔断"""
+    return f"image:{urlparse(str(url)).netloc}"
+
+
+@retry_on_failure(
+    max_attempts=2,
+    delay=1,
+    description="下载图片",
+    return_empty_on_fail=False,
+    endpoint=_image_host,
+)
+def _fetch_image(url: str, filename: str):
+    """下载单个图片，失败时抛出异常；文件过大返回 None"""
+    referer_url = urlparse(str(url)).netloc
+    user_agents = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36 Edg/91.0.864.59"
+    file_size = 0
+    headers = {
+        "User-Agent": user_agents,
+        "Accept": "image/webp,image/apng,image/*,*/*;q=0.8",
+        "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+        "Referer": referer_url,
+        "Connection": "keep-alive",
+    }
+    response = None
+    try:
+        response = requests.get(url, headers=headers, timeout=15, stream=True)
+        content_length = response.headers.get("Content-Length")
+        if content_length:
+            file_size = int(content_length)
+        if file_size <= MAX_IMAGE_LEN:
+            response.raise_for_status()
+            with open(filename, "wb") as f:
+                downloaded_size = 0
+                for chunk in response.iter_content(chunk_size=819200):
+                    if downloaded_size <= MAX_IMAGE_LEN:
+                        downloaded_size += len(chunk)
+                        f.write(chunk)
+                    else:
+                        logger.info(f" {url} 文件过大,已停止下载")
+                        return None
+            logger.info(f"从 {url} 下载成功: {filename}")
+        else:
+            logger.info(f" {url} 文件过大,不进行下载")
+            return None
+    except requests.exceptions.RequestException as e:
+        raise retry_policy.http_error(response, f"下载图片失败: {url} - 错误: {str(e)}") from e
+    return filename
+
+
+def download_image(url: str, filename: str, url_bak: str = ""):
+    """
+    下载图片并返回文件名（如果文件已存在则不下载）
+    可重试的错误（超时、5xx、429）会退避重试，同一域名连续失败后熔断
+    """
+    # 检查文件是否已存在
+    if os.path.exists(filename):
+        logger.info(f"文件已存在，跳过下载: {filename}")
+        return filename
+
+    try:
+        return _fetch_image(url, filename)
+    except Exception as e:
+        logger.error(f"下载图片失败: {url} - 错误: {str(e)}")
+        if url_bak:
+            logger.info(f"尝试使用备用 URL: {url_bak}")
+            return download_image(url_bak, filename)
+        return None
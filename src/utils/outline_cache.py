@@ -0,0 +1,74 @@
+"""
+大纲文本（parse_outline 的结果）的进程内缓存
+
+布局规划和每一页 HTML 的提示词都包含同一份大纲文本，这里按大纲内容的哈希缓存渲染结果：
+大纲内容不变时直接复用，内容变化（重新生成大纲）后哈希随之变化，旧的条目按 LRU 淘汰。
+只读的 OutlineSnapshot 在创建时计算一次哈希，页面任务无需重复计算。
+"""
+
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Mapping, Optional, Tuple
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.utils.help_utils import parse_outline
+
+# 同时缓存的大纲数量，足够覆盖同时生成的所有项目
+MAX_ENTRIES = 64
+
+# {版本号: (大纲文本, 渲染耗时)}
+_cache: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+_lock = threading.Lock()
+_hits = 0
+_misses = 0
+_render_seconds = 0.0
+_saved_seconds = 0.0
+
+
+def outline_version(outline_json: Mapping) -> str:
+    """大纲内容的哈希，内容相同（与键顺序无关）的大纲得到相同的版本号"""
+    canonical = json.dumps(outline_json, ensure_ascii=False, sort_keys=True, default=dict)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def render_outline(outline_json: Mapping, version: Optional[str] = None) -> str:
+    """返回 parse_outline(outline_json)，version 为 outline_version 的结果，未提供时现场计算"""
+    global _hits, _misses, _render_seconds, _saved_seconds
+    key = version or outline_version(outline_json)
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _cache.move_to_end(key)
+            _hits += 1
+            _saved_seconds += entry[1]
+            return entry[0]
+    start = time.perf_counter()
+    text = parse_outline(outline_json)
+    elapsed = time.perf_counter() - start
+    with _lock:
+        _misses += 1
+        _render_seconds += elapsed
+        _cache[key] = (text, elapsed)
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return text
+
+
+def get_outline_cache_stats() -> dict:
+    """命中次数、渲染次数和耗时，saved_s 为每次命中的条目当初渲染耗时之和，即缓存节省的时间"""
+    with _lock:
+        return {
+            "hits": _hits,
+            "misses": _misses,
+            "entries": len(_cache),
+            "render_s": round(_render_seconds, 6),
+            "saved_s": round(_saved_seconds, 6),
+        }
@@ -0,0 +1,118 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+# 流水线各阶段的名称，与 /api/stats 和基准测试报告中的键一致
+STAGE_OUTLINE = "outline"
+STAGE_LAYOUT = "plan_layout"
+STAGE_IMAGE_SEARCH = "image_search"
+STAGE_VISION = "vision"
+STAGE_HTML = "html"
+STAGE_PDF = "pdf"
+STAGE_PPTX = "pptx"
+STAGE_DB = "db"
+
+
+class StageTimer:
+    """
+    累计某个阶段的耗时。阶段可能在多个线程 / 协程中并发执行，
+    total_s 为各次耗时之和，span_s 为第一次开始到最后一次结束的墙钟时间
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.errors = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.first_start: Optional[float] = None
+        self.last_end: Optional[float] = None
+
+    def record(self, start: float, end: float, failed: bool = False) -> None:
+        elapsed = end - start
+        self.count += 1
+        self.errors += int(failed)
+        self.total_s += elapsed
+        self.max_s = max(self.max_s, elapsed)
+        if self.first_start is None or start < self.first_start:
+            self.first_start = start
+        if self.last_end is None or end > self.last_end:
+            self.last_end = end
+
+    def stats(self) -> dict:
+        span = (self.last_end - self.first_start) if self.count else 0.0
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total_s": round(self.total_s, 4),
+            "avg_s": round(self.total_s / self.count, 4) if self.count else 0.0,
+            "max_s": round(self.max_s, 4),
+            "span_s": round(span, 4),
+        }
+
+
+_timers: Dict[str, StageTimer] = {}
+_timers_lock = threading.Lock()
+
+
+def record(name: str, start: float, end: float, failed: bool = False) -> None:
+    """记录一次阶段耗时，start / end 为 time.perf_counter() 的读数"""
+    with _timers_lock:
+        timer = _timers.get(name)
+        if timer is None:
+            timer = StageTimer(name)
+            _timers[name] = timer
+        timer.record(start, end, failed)
+
+
+@contextmanager
+def stage(name: str):
+    """统计代码块的耗时，同步和异步代码中均可使用（with 块内可以 await）"""
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        record(name, start, time.perf_counter(), failed)
+
+
+def instrument_engine(engine) -> None:
+    """为 SQLAlchemy 引擎挂载 SQL 执行计时，结果记入 db 阶段"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("profiling_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("profiling_start")
+        if starts:
+            record(STAGE_DB, starts.pop(), time.perf_counter())
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        starts = conn.info.get("profiling_start") if conn is not None else None
+        if starts:
+            record(STAGE_DB, starts.pop(), time.perf_counter(), failed=True)
+
+
+def get_stage_stats() -> Dict[str, dict]:
+    with _timers_lock:
+        return {name: timer.stats() for name, timer in _timers.items()}
+
+
+def reset() -> None:
+    """清空所有阶段的统计，基准测试在每轮开始前调用"""
+    with _timers_lock:
+        _timers.clear()
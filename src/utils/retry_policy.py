@@ -0,0 +1,190 @@
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+import requests
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import config.base_config as base_config
+from config.logging_config import logger
+
+# 这些状态码说明服务端暂时不可用，值得重试；其余 4xx 重试也不会成功
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+# Retry-After 超过该值时不再等待，直接失败
+MAX_RETRY_AFTER_SECONDS = 120
+
+
+class HTTPStatusError(Exception):
+    """携带状态码和 Retry-After 的 HTTP 错误，供重试策略判断是否值得重试"""
+
+    def __init__(self, message: str, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """端点熔断中，快速失败"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 头，支持秒数和 HTTP 日期两种格式"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def http_error(response, message: str) -> Exception:
+    """
+    根据响应构造异常：收到错误状态码时返回 HTTPStatusError，否则（网络错误、解析失败等）返回普通 Exception
+    """
+    if response is not None and response.status_code >= 400:
+        return HTTPStatusError(
+            message,
+            status_code=response.status_code,
+            retry_after=parse_retry_after(response.headers.get("Retry-After")),
+        )
+    return Exception(message)
+
+
+def is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, HTTPStatusError):
+        return exc.status_code in RETRYABLE_STATUS_CODES or exc.status_code >= 500
+    return True
+
+
+def is_endpoint_failure(exc: Exception) -> bool:
+    """
+    是否说明端点本身不可用（连接失败、超时、5xx/429），用于熔断计数；
+    空结果、解析失败等端点能正常响应的错误不计入
+    """
+    while exc is not None:
+        if isinstance(exc, HTTPStatusError):
+            return is_retryable(exc)
+        if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def backoff_delay(attempt: int, base_delay: float, exc: Optional[Exception] = None) -> float:
+    """
+    第 attempt 次（从 0 开始）失败后的等待时间：指数退避加随机抖动，避免所有线程同时重试
+    429/503 带有 Retry-After 时以服务端要求为准
+    """
+    retry_after = getattr(exc, "retry_after", None)
+    if retry_after is not None:
+        return retry_after
+    delay = min(base_delay * (2**attempt), max(base_config.RETRY_MAX_BACKOFF, base_delay))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class CircuitBreaker:
+    """
+    连续失败 CIRCUIT_BREAKER_THRESHOLD 次后熔断 CIRCUIT_BREAKER_COOLDOWN 秒，期间直接失败；
+    冷却结束后放行一次试探请求，成功则恢复，失败则继续熔断
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at > 0
+
+    def is_available(self) -> bool:
+        """未熔断，或冷却已结束且没有试探请求在进行中"""
+        with self._lock:
+            if self._opened_at == 0:
+                return True
+            cooled = time.monotonic() - self._opened_at >= base_config.CIRCUIT_BREAKER_COOLDOWN
+            return cooled and not self._probing
+
+    def before_call(self) -> bool:
+        """熔断期间抛出 CircuitOpenError；返回本次调用是否为试探请求"""
+        with self._lock:
+            if self._opened_at == 0:
+                return False
+            if time.monotonic() - self._opened_at < base_config.CIRCUIT_BREAKER_COOLDOWN:
+                raise CircuitOpenError(f"{self.key} 已熔断，暂停请求")
+            if self._probing:
+                raise CircuitOpenError(f"{self.key} 已熔断，正在等待试探请求结果")
+            self._probing = True
+            return True
+
+    def abort_probe(self) -> None:
+        """试探请求未得出结果（例如任务被取消）时释放试探名额，熔断状态不变，下一个请求可以重新试探"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at:
+                logger.info(f"{self.key} 已恢复，解除熔断")
+            self._failures = 0
+            self._opened_at = 0.0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        threshold = base_config.CIRCUIT_BREAKER_THRESHOLD
+        with self._lock:
+            self._failures += 1
+            if self._probing or (threshold > 0 and self._failures >= threshold):
+                if not self._opened_at or self._probing:
+                    logger.warning(
+                        f"{self.key} 连续失败 {self._failures} 次，熔断 {base_config.CIRCUIT_BREAKER_COOLDOWN} 秒"
+                    )
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "endpoint": self.key,
+                "open": self._opened_at > 0,
+                "consecutive_failures": self._failures,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(key: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(key)
+            _breakers[key] = breaker
+        return breaker
+
+
+def get_breaker_stats() -> list[dict]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [breaker.stats() for breaker in breakers]
@@ -56,7 +56,7 @@ def outline_llm_test():
     try:
         logger.info("正在测试大纲大模型是否可用...")
         prompt = "hi"
-        response = text_chat(prompt, llm_config=base_config.OUTLINE_LLM_CONFIG)
+        response = text_chat(prompt, llm_config=base_config.OUTLINE_LLM_CONFIG, use_cache=False)
         logger.info(f"测试内容返回为: {response}")
         return response
     except Exception as e:
@@ -68,7 +68,7 @@ def ppt_llm_test():
     try:
         logger.info("正在测试PPT大模型是否可用...")
         prompt = "hi"
-        response = text_chat(prompt, llm_config=base_config.PPT_LLM_CONFIG)
+        response = text_chat(prompt, llm_config=base_config.PPT_LLM_CONFIG, use_cache=False)
         logger.info(f"测试内容返回为: {response}")
         return response
     except Exception as e:
@@ -85,6 +85,7 @@ def pic_llm_test():
             images_base64=images_base64,
             prompt=prompt,
             llm_config=base_config.PIC_LLM_CONFIG,
+            use_cache=False,
         )
         logger.info(f"测试内容返回为: {response}")
         return response
@@ -0,0 +1,83 @@
+import sys
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Tuple, TypeVar
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import config.base_config as base_config
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    合并相同参数的并发调用：同一个 key 同时只执行一次，其余调用等待并共享同一个结果（或异常）
+    调用结束后立即移除，之后的调用会重新执行（结果复用由 LLM 缓存负责）
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self._executed = 0
+        self._coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """返回 (结果, 是否复用了其他调用的结果)；LLM_SINGLE_FLIGHT_ENABLED 为 0 时直接执行"""
+        if not base_config.LLM_SINGLE_FLIGHT_ENABLED:
+            return fn(), False
+        with self._lock:
+            future = self._calls.get(key)
+            if future is None:
+                future = Future()
+                self._calls[key] = future
+                self._executed += 1
+                leader = True
+            else:
+                self._coalesced += 1
+                leader = False
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "in_flight": len(self._calls),
+                "executed": self._executed,
+                "coalesced": self._coalesced,
+            }
+
+
+_groups: Dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+
+def get_group(name: str) -> SingleFlight:
+    with _groups_lock:
+        group = _groups.get(name)
+        if group is None:
+            group = SingleFlight(name)
+            _groups[name] = group
+        return group
+
+
+def get_single_flight_stats() -> list[dict]:
+    with _groups_lock:
+        groups = list(_groups.values())
+    return [group.stats() for group in groups]
@@ -0,0 +1,192 @@
+import re
+import sys
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+
+from bs4 import BeautifulSoup, Tag
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.services.chat.rate_limiter import estimate_tokens
+
+CSS_VAR_RE = re.compile(r"(--[\w-]+)\s*:\s*([^;{}]+)")
+COLOR_RE = re.compile(r"#[0-9a-fA-F]{3,8}\b|rgba?\([^)]*\)|hsla?\([^)]*\)")
+FONT_FAMILY_RE = re.compile(r"font-family\s*:\s*([^;{}]+)", re.IGNORECASE)
+CSS_RULE_RE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+# 这些选择器决定了整套幻灯片的画布与背景，原样保留
+BASE_SELECTORS = {":root", "html", "body", "#canvas"}
+# 骨架中不展开子元素的标签
+LEAF_TAGS = {"svg", "canvas", "table", "ul", "ol"}
+SKELETON_MAX_DEPTH = 6
+MAX_COLORS = 16
+MAX_CLASSES = 80
+
+
+def _style_text(soup: BeautifulSoup) -> str:
+    return "\n".join(style.get_text() for style in soup.find_all("style"))
+
+
+def _inline_styles(soup: BeautifulSoup) -> list[str]:
+    return [tag["style"] for tag in soup.find_all(style=True)]
+
+
+def _signature(tag: Tag) -> str:
+    signature = tag.name
+    if tag.get("id"):
+        signature += f"#{tag['id']}"
+    classes = tag.get("class") or []
+    if classes:
+        signature += "." + ".".join(classes)
+    return signature
+
+
+def _skeleton(tag: Tag, depth: int = 0) -> list[str]:
+    """只保留标签、id 和 class 的 DOM 骨架，连续的同构兄弟节点合并为 ×N"""
+    lines = [f"{'  ' * depth}{_signature(tag)}"]
+    if depth >= SKELETON_MAX_DEPTH or tag.name in LEAF_TAGS:
+        return lines
+    children = [
+        _skeleton(child, depth + 1)
+        for child in tag.children
+        if isinstance(child, Tag) and child.name not in ("script", "style")
+    ]
+    index = 0
+    while index < len(children):
+        child_lines = list(children[index])
+        repeat = 1
+        while index + repeat < len(children) and children[index + repeat] == children[index]:
+            repeat += 1
+        if repeat > 1:
+            child_lines[0] += f" ×{repeat}"
+        lines.extend(child_lines)
+        index += repeat
+    return lines
+
+
+def _css_rules(style_text: str) -> tuple[list[str], list[str]]:
+    """将样式表压缩为单行规则，返回 (画布与全局规则, 组件规则)"""
+    base_rules, component_rules = [], []
+    for selectors, body in CSS_RULE_RE.findall(style_text):
+        names = [name.strip() for name in selectors.split(",") if name.strip()]
+        declarations = " ".join(body.split())
+        if not names or not declarations:
+            continue
+        rule = f"{', '.join(names)} {{ {declarations} }}"
+        if set(names) & BASE_SELECTORS:
+            base_rules.append(rule)
+        else:
+            component_rules.append(rule)
+    return base_rules, component_rules
+
+
+def _resources(soup: BeautifulSoup) -> list[str]:
+    resources = []
+    for tag in soup.find_all(["link", "script"]):
+        url = tag.get("href") if tag.name == "link" else tag.get("src")
+        if url and url not in resources:
+            resources.append(url)
+    return resources
+
+
+def _truncate(text: str, token_limit: int) -> str:
+    if token_limit <= 0 or estimate_tokens(text) <= token_limit:
+        return text
+    # estimate_tokens 按 2 个字符 1 个 token 估算
+    return text[: token_limit * 2].rstrip() + "\n..."
+
+
+@lru_cache(maxsize=256)
+def _build_digest(slides: tuple, token_limit: int) -> str:
+    soups = [(slide_id, BeautifulSoup(html, "lxml")) for slide_id, html in slides]
+    resources: list[str] = []
+    css_vars: dict = {}
+    base_rules: list[str] = []
+    component_rules: list[str] = []
+    colors: Counter = Counter()
+    fonts: list[str] = []
+    classes: Counter = Counter()
+    for _, soup in soups:
+        style_text = _style_text(soup)
+        all_styles = "\n".join([style_text] + _inline_styles(soup))
+        for url in _resources(soup):
+            if url not in resources:
+                resources.append(url)
+        for name, value in CSS_VAR_RE.findall(style_text):
+            css_vars.setdefault(name, " ".join(value.split()))
+        slide_base_rules, slide_component_rules = _css_rules(style_text)
+        for rule in slide_base_rules:
+            if rule not in base_rules:
+                base_rules.append(rule)
+        for rule in slide_component_rules:
+            if rule not in component_rules:
+                component_rules.append(rule)
+        colors.update(color.lower().replace(" ", "") for color in COLOR_RE.findall(all_styles))
+        for family in FONT_FAMILY_RE.findall(all_styles):
+            family = " ".join(family.split())
+            if family not in fonts:
+                fonts.append(family)
+        for tag in soup.find_all(class_=True):
+            classes.update(tag.get("class"))
+
+    sections = []
+    if resources:
+        sections.append("【外部资源】\n" + "\n".join(resources))
+    if base_rules:
+        sections.append("【画布与全局样式】\n" + "\n".join(base_rules))
+    if css_vars:
+        sections.append(
+            "【CSS 变量】\n" + "\n".join(f"{name}: {value}" for name, value in css_vars.items())
+        )
+    if colors:
+        sections.append(
+            "【配色（按使用次数）】\n"
+            + ", ".join(color for color, _ in colors.most_common(MAX_COLORS))
+        )
+    if fonts:
+        sections.append("【字体】\n" + "\n".join(fonts))
+    if classes:
+        sections.append(
+            "【常用 class】\n" + " ".join(name for name, _ in classes.most_common(MAX_CLASSES))
+        )
+    if component_rules:
+        sections.append("【组件样式】\n" + "\n".join(component_rules))
+
+    # 骨架放在最后，超出上限时优先截断
+    seen_skeletons = set()
+    skeletons = []
+    for slide_id, soup in soups:
+        root = soup.find(id="canvas") or soup.body
+        if root is None:
+            continue
+        skeleton = "\n".join(_skeleton(root))
+        if skeleton in seen_skeletons:
+            continue
+        seen_skeletons.add(skeleton)
+        skeletons.append(f"第 {slide_id} 节:\n{skeleton}")
+    if skeletons:
+        sections.append("【DOM 骨架】\n" + "\n\n".join(skeletons))
+
+    return _truncate("\n\n".join(sections), token_limit)
+
+
+def build_style_digest(slides: list, token_limit: int = 0) -> str:
+    """
+    从参考幻灯片中提取紧凑的风格摘要：外部资源、画布与全局样式、CSS 变量、配色、字体、常用 class、组件样式和 DOM 骨架
+    相同的参考页只解析一次，token_limit 为摘要的估算 token 上限（0 表示不限制）
+
+    Args:
+        slides (list): 包含 slide_id 与 html_content 的幻灯片字典列表
+        token_limit (int): 摘要的 token 上限
+    Returns:
+        str: 风格摘要，没有可参考的 HTML 时返回空字符串
+    """
+    key = tuple(
+        (slide["slide_id"], slide["html_content"])
+        for slide in slides
+        if slide.get("html_content")
+    )
+    if not key:
+        return ""
+    return _build_digest(key, token_limit)
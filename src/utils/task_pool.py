@@ -0,0 +1,267 @@
+"""
+进程内全局的幻灯片任务池：所有项目的幻灯片生成（包含图片搜索与图片理解）都提交到这里，
+同时执行的任务数由 TASK_POOL_WORKERS 限制，不再随项目数量增长。
+
+出队规则：
+1. 先按优先级：单页重新生成（interactive） > 新建演示文稿（deck） > 批量任务（bulk，如启动时的自动续传）
+2. 同一优先级内按项目公平分配：当前运行任务最少的项目先派发，数量相同时各项目轮流派发，
+   因此一份 100 页的演示文稿不会让其他项目一直排队
+
+异步引擎的全局 LLM 请求限制（FairAsyncGate）使用同样的规则。
+"""
+
+import asyncio
+import contextvars
+import sys
+import threading
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Optional, Tuple
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import config.base_config as base_config
+from config.logging_config import logger
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_DECK = "deck"
+PRIORITY_BULK = "bulk"
+# 按优先级从高到低排列
+PRIORITY_CLASSES = (PRIORITY_INTERACTIVE, PRIORITY_DECK, PRIORITY_BULK)
+
+
+def normalize_priority(priority: Optional[str]) -> str:
+    """未知或未填写的优先级按 deck 处理"""
+    return priority if priority in PRIORITY_CLASSES else PRIORITY_DECK
+
+
+class _FairQueue:
+    """按优先级和项目公平份额排队，不加锁，由调用方保证串行访问"""
+
+    def __init__(self):
+        # 每个优先级: {project_id: 该项目排队中的任务}，OrderedDict 的顺序即轮转顺序
+        self._queues = {priority: OrderedDict() for priority in PRIORITY_CLASSES}
+        self.running_by_project: Counter = Counter()
+        self.running_by_class: Counter = Counter()
+
+    def push(self, item: Any, project_id: str, priority: str) -> None:
+        self._queues[priority].setdefault(project_id, deque()).append(item)
+
+    def pop(self) -> Optional[Tuple[Any, str, str]]:
+        """取出下一个任务，返回 (任务, project_id, priority)，没有排队任务时返回 None"""
+        for priority, projects in self._queues.items():
+            if not projects:
+                continue
+            # min 在数量相同时返回最先遇到的项目，出队后该项目移到末尾，实现轮转
+            project_id = min(projects, key=lambda pid: self.running_by_project[pid])
+            items = projects.pop(project_id)
+            item = items.popleft()
+            if items:
+                projects[project_id] = items
+            return item, project_id, priority
+        return None
+
+    def remove(self, item: Any, project_id: str, priority: str) -> bool:
+        items = self._queues[priority].get(project_id)
+        if not items or item not in items:
+            return False
+        items.remove(item)
+        if not items:
+            del self._queues[priority][project_id]
+        return True
+
+    def start(self, project_id: str, priority: str) -> None:
+        self.running_by_project[project_id] += 1
+        self.running_by_class[priority] += 1
+
+    def finish(self, project_id: str, priority: str) -> None:
+        self.running_by_project[project_id] -= 1
+        if self.running_by_project[project_id] <= 0:
+            del self.running_by_project[project_id]
+        self.running_by_class[priority] -= 1
+
+    def empty(self) -> bool:
+        return not any(self._queues.values())
+
+    def stats(self) -> dict:
+        return {
+            "queued": {
+                priority: sum(len(items) for items in projects.values())
+                for priority, projects in self._queues.items()
+            },
+            "running": {priority: self.running_by_class[priority] for priority in PRIORITY_CLASSES},
+            "queued_projects": {
+                priority: len(projects) for priority, projects in self._queues.items()
+            },
+            "running_projects": len(self.running_by_project),
+        }
+
+
+class TaskPool:
+    """固定线程数的全局任务池，按 _FairQueue 的规则派发任务"""
+
+    def __init__(self, workers: int):
+        self.workers = max(int(workers), 1)
+        self._queue = _FairQueue()
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._completed = 0
+        for index in range(self.workers):
+            threading.Thread(
+                target=self._worker, name=f"ezppt-task-{index}", daemon=True
+            ).start()
+
+    def submit(
+        self,
+        fn: Callable[..., Any],
+        *args,
+        project_id: str = "",
+        priority: str = PRIORITY_DECK,
+        **kwargs,
+    ) -> Future:
+        """提交任务并立即返回 Future，任务在提交线程的 contextvars 中执行"""
+        future: Future = Future()
+        call = partial(contextvars.copy_context().run, fn, *args, **kwargs)
+        with self._cond:
+            self._queue.push((future, call), project_id, normalize_priority(priority))
+            self._cond.notify()
+        return future
+
+    def shutdown(self) -> None:
+        """不再接受唤醒，线程执行完已排队的任务后退出"""
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                entry = self._queue.pop()
+                while entry is None:
+                    if self._shutdown:
+                        return
+                    self._cond.wait()
+                    entry = self._queue.pop()
+                (future, call), project_id, priority = entry
+                self._queue.start(project_id, priority)
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(call())
+                    except BaseException as exc:  # pylint: disable=broad-except
+                        future.set_exception(exc)
+            finally:
+                with self._cond:
+                    self._queue.finish(project_id, priority)
+                    self._completed += 1
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"workers": self.workers, "completed": self._completed, **self._queue.stats()}
+
+
+class FairAsyncGate:
+    """
+    异步引擎的全局并发限制，替代普通信号量：名额释放时按优先级和项目公平份额唤醒等待者
+    只能在同一个事件循环中使用
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(int(limit), 1)
+        self._queue = _FairQueue()
+        self._active = 0
+
+    @asynccontextmanager
+    async def slot(self, project_id: str = "", priority: str = PRIORITY_DECK):
+        priority = normalize_priority(priority)
+        await self._acquire(project_id, priority)
+        try:
+            yield
+        finally:
+            self._release(project_id, priority)
+
+    async def _acquire(self, project_id: str, priority: str) -> None:
+        if self._active < self.limit and self._queue.empty():
+            self._active += 1
+            self._queue.start(project_id, priority)
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._queue.push(waiter, project_id, priority)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # 只有被 _release 设置了结果的等待者才分到了名额，需要交还；
+            # waiter 被取消时可能已经被 _release 跳过并移出队列，remove 返回 False 也不能据此交还名额
+            if waiter.done() and not waiter.cancelled():
+                self._release(project_id, priority)
+            else:
+                self._queue.remove(waiter, project_id, priority)
+            raise
+
+    def _release(self, project_id: str, priority: str) -> None:
+        self._queue.finish(project_id, priority)
+        self._active -= 1
+        while self._active < self.limit:
+            entry = self._queue.pop()
+            if entry is None:
+                return
+            waiter, waiter_project, waiter_priority = entry
+            if waiter.done():
+                continue
+            self._active += 1
+            self._queue.start(waiter_project, waiter_priority)
+            waiter.set_result(None)
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "active": self._active, **self._queue.stats()}
+
+
+_pool: Optional[TaskPool] = None
+_pool_lock = threading.Lock()
+_async_gate: Optional[FairAsyncGate] = None
+
+
+def get_task_pool() -> TaskPool:
+    """获取全局任务池，TASK_POOL_WORKERS 修改后重建（旧线程执行完已排队的任务后退出）"""
+    global _pool
+    size = max(int(base_config.TASK_POOL_WORKERS), 1)
+    with _pool_lock:
+        if _pool is None or _pool.workers != size:
+            if _pool is not None:
+                _pool.shutdown()
+            _pool = TaskPool(size)
+            logger.info(f"全局任务池已启动，线程数 {size}")
+        return _pool
+
+
+def submit(
+    fn: Callable[..., Any],
+    *args,
+    project_id: str = "",
+    priority: str = PRIORITY_DECK,
+    **kwargs,
+) -> Future:
+    return get_task_pool().submit(fn, *args, project_id=project_id, priority=priority, **kwargs)
+
+
+def get_async_gate() -> FairAsyncGate:
+    """异步引擎的全局 LLM 请求限制，需要在引擎事件循环内调用，ASYNC_ENGINE_MAX_LLM_CALLS 修改后重建"""
+    global _async_gate
+    size = max(int(base_config.ASYNC_ENGINE_MAX_LLM_CALLS), 1)
+    if _async_gate is None or _async_gate.limit != size:
+        _async_gate = FairAsyncGate(size)
+    return _async_gate
+
+
+def get_pool_stats() -> dict:
+    """各优先级的排队与运行任务数"""
+    with _pool_lock:
+        pool = _pool
+    return {
+        "thread_pool": pool.stats() if pool is not None else None,
+        "async_gate": _async_gate.stats() if _async_gate is not None else None,
+    }
@@ -13,12 +13,14 @@ document.addEventListener('DOMContentLoaded', () => {
             loaded: false,
             error: null,
         },
+        endpointStats: [],
     };
 
     const LIMITED_API_TYPE_KEYS = new Set([
         'OUTLINE_API_TYPE',
         'PPT_API_TYPE',
         'PIC_API_TYPE',
+        'PPT_FALLBACK_API_TYPE',
     ]);
 
     const API_TYPE_OPTIONS = ['openai', 'gemini'];
@@ -30,6 +32,12 @@ document.addEventListener('DOMContentLoaded', () => {
         '搜索': 'img_search',
     };
 
+    const ENDPOINT_ROLE_MAP = {
+        '大纲模型': 'OUTLINE',
+        'PPT 模型': 'PPT',
+        '图片模型': 'PIC',
+    };
+
     const DEFAULT_TEST_LABELS = {
         outline_llm: '大纲 LLM 检测',
         ppt_llm: 'PPT LLM 检测',
@@ -48,6 +56,7 @@ document.addEventListener('DOMContentLoaded', () => {
         testFooter: document.getElementById('config-test-footer'),
         testButton: document.getElementById('config-test-button'),
         testStatus: document.getElementById('config-test-status'),
+        endpointStats: document.getElementById('endpoint-stats'),
     };
 
     const showLoader = (visible) => {
@@ -196,6 +205,67 @@ document.addEventListener('DOMContentLoaded', () => {
         elements.form.appendChild(fragment);
         updateSaveButton();
         renderGroupTest(group);
+        renderEndpointStats(group);
+    };
+
+    function renderEndpointStats(group) {
+        const container = elements.endpointStats;
+        if (!container) return;
+        const role = ENDPOINT_ROLE_MAP[group] || null;
+        const rows = role ? state.endpointStats.filter((item) => item.role === role) : [];
+        if (!rows.length) {
+            container.classList.add('hidden');
+            container.innerHTML = '';
+            return;
+        }
+        const title = document.createElement('div');
+        title.className = 'endpoint-stats__title';
+        title.textContent = '端点负载';
+        const table = document.createElement('table');
+        const headers = ['端点', '权重', '状态', '进行中', '请求数', '失败数', '平均耗时(ms)'];
+        const thead = table.createTHead().insertRow();
+        headers.forEach((text) => {
+            const th = document.createElement('th');
+            th.textContent = text;
+            thead.appendChild(th);
+        });
+        const tbody = table.createTBody();
+        rows.forEach((item) => {
+            const row = tbody.insertRow();
+            const cells = [
+                item.endpoint,
+                item.weight,
+                item.healthy ? '正常' : '已摘除',
+                item.outstanding,
+                item.requests,
+                item.failures,
+                item.avg_latency_ms,
+            ];
+            cells.forEach((value, index) => {
+                const cell = row.insertCell();
+                cell.textContent = String(value);
+                if (index === 2 && !item.healthy) {
+                    cell.className = 'endpoint-stats__status--down';
+                }
+            });
+        });
+        container.innerHTML = '';
+        container.appendChild(title);
+        container.appendChild(table);
+        container.classList.remove('hidden');
+    }
+
+    const fetchEndpointStats = async () => {
+        try {
+            const res = await apiFetch('/api/stats');
+            if (!res.ok) throw new Error(`加载端点统计失败 (${res.status})`);
+            const data = await res.json();
+            state.endpointStats = Array.isArray(data?.llm_endpoints) ? data.llm_endpoints : [];
+        } catch (error) {
+            console.error(error);
+            state.endpointStats = [];
+        }
+        renderEndpointStats(state.currentGroup);
     };
 
     const formatTestDetail = (text) => {
@@ -353,7 +423,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 return;
             }
             const value = input.value.trim();
-            if (value === '') {
+            if (value === '' && !meta.clearable) {
                 return;
             }
             updates[key] = meta.type === 'number' ? Number(value) : value;
@@ -381,6 +451,7 @@ document.addEventListener('DOMContentLoaded', () => {
             state.meta = data.meta || state.meta;
             state.dirty.clear();
             renderForm(state.currentGroup);
+            fetchEndpointStats();
             showMessage('配置保存成功', 'success');
         } catch (error) {
             console.error(error);
@@ -397,6 +468,7 @@ document.addEventListener('DOMContentLoaded', () => {
     elements.reload?.addEventListener('click', () => {
         fetchConfig();
         fetchTests();
+        fetchEndpointStats();
     });
 
     elements.testButton?.addEventListener('click', () => {
@@ -418,4 +490,5 @@ document.addEventListener('DOMContentLoaded', () => {
 
     fetchConfig();
     fetchTests();
+    fetchEndpointStats();
 });